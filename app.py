@@ -1,14 +1,44 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-from growwapi import GrowwAPI
 import os
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, time as dtime, timedelta
+from quote_cache import QuoteCache
+from batch_fetch import BatchFetcher, fan_out
+from concurrent.futures import ThreadPoolExecutor
+from market_snapshot import FIELDS as SNAPSHOT_FIELDS, MarketSnapshot
+from price_stream import stream_prices
+from candle_store import CandleStore
+from shared_cache import SharedCache
+from last_known_good import LastKnownGood
+from market_calendar import IST, MarketCalendar
+from portfolio_cache import KINDS, PortfolioCache
+from metrics import InstrumentedClient, Metrics
+from upstream_guard import CRITICAL, GuardedClient, UpstreamGuard, parse_limits
+from token_manager import LazyGrowwClient, TokenManager
+from response_pipeline import FastJSONProvider, ResponseCompressor, make_etag, not_modified, with_etag
+from response_formats import COLUMNAR, ROWS, columns_response, parse_format
+from indicators import IndicatorEngine, parse_indicators
+from screener import METRICS as MOVER_METRICS, Screener
+import numpy as np
+from market_sim import MarketSimulator
+import time
+from instrument_search import SearchIndex
+from instruments import InstrumentMaster
+from option_chain_cache import EndOfDayCache, OptionChainCache, with_strikes
+from greeks import chain_greeks, leg_symbols, with_greeks
+from resample import (
+    FIELDS, INTERVAL_SECONDS, finer_intervals, normalize_interval, reduce_points,
+    resample, to_candles, to_columns,
+)
+import tempfile
+from array import array
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
 # ===== PUT YOUR GROWW API TOKEN HERE =====
@@ -28,51 +58,322 @@ def _looks_like_jwt(value: str) -> bool:
     return value.count(".") == 2 and value.startswith("ey")
 
 
-def _resolve_groww_token():
-    if API_AUTH_TOKEN and API_AUTH_TOKEN != "your_token_here":
-        return API_AUTH_TOKEN
+# The access token is cached on disk (0600) and shared by every worker and
+# restart; nothing here does network I/O at import, the client is built on
+# the first real call and the token is refreshed ahead of expiry
+token_manager = TokenManager(
+    os.getenv("GROWW_TOKEN_CACHE")
+    or os.path.join(os.path.expanduser("~"), ".cache", "groww_backend", "access_token.json"),
+    static_token=API_AUTH_TOKEN if API_AUTH_TOKEN and API_AUTH_TOKEN != "your_token_here" else None,
+    api_key=USER_API_KEY,
+    secret=USER_SECRET,
+    totp=USER_TOTP,
+    refresh_margin=float(os.getenv("GROWW_TOKEN_REFRESH_MARGIN", "600")),
+    logger=app.logger,
+)
+
+# GROWW_BACKEND=sim swaps in a seeded offline market that serves every
+# endpoint at production-like volumes. It's only ever used when asked for:
+# without credentials the routes that need Groww answer 503 instead
+GROWW_BACKEND = os.getenv("GROWW_BACKEND", "groww").lower()
+UPSTREAM_CONFIGURED = GROWW_BACKEND == "sim" or token_manager.configured
+
+
+def _state_path(name):
+    """Default location of a host-wide state file. The simulator gets its own
+    files, so simulated candles and quotes never reach the real backend"""
+    if GROWW_BACKEND == "sim":
+        root, ext = os.path.splitext(name)
+        name = f"{root}_sim{ext}"
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+if GROWW_BACKEND == "sim":
+    app.logger.warning("GROWW_BACKEND=sim — serving simulated market data and orders")
+    groww = MarketSimulator(
+        seed=int(os.getenv("GROWW_SIM_SEED", "42")),
+        latency_ms=os.getenv("GROWW_SIM_LATENCY_MS", "0"),
+        jitter_ms=os.getenv("GROWW_SIM_JITTER_MS", "0"),
+        error_rate=os.getenv("GROWW_SIM_ERROR_RATE", "0"),
+        throttle_rate=os.getenv("GROWW_SIM_THROTTLE_RATE", "0"),
+        strikes_per_side=int(os.getenv("GROWW_SIM_STRIKES", "40")),
+    )
+else:
+    if not token_manager.configured:
+        app.logger.error("No Groww credentials configured — upstream routes will answer 503")
+    groww = LazyGrowwClient(token_manager)
+    app.logger.info("GrowwAPI client will be built on first use")
+
+# Prometheus metrics; each worker writes its totals to METRICS_DIR and
+# /metrics merges them, so a scrape sees the whole host
+metrics = Metrics(
+    os.getenv("METRICS_DIR") or _state_path("groww_metrics"),
+    flush_interval=float(os.getenv("METRICS_FLUSH_INTERVAL", "5")),
+)
+metrics.histogram("http_request_duration_seconds", "Flask request latency by route")
+metrics.gauge("http_requests_in_flight", "Requests currently being handled")
+metrics.counter("http_response_bytes_total", "Response body bytes sent by route")
+metrics.counter("http_request_bytes_total", "Request body bytes received by route")
+metrics.histogram("groww_upstream_duration_seconds", "GrowwAPI call latency by method and outcome")
+metrics.counter("groww_upstream_errors_total", "GrowwAPI calls that raised, by method")
+metrics.gauge("groww_upstream_in_flight", "GrowwAPI calls currently waiting on Groww")
+metrics.counter("cache_hits_total", "Cache lookups served without loading")
+metrics.counter("cache_misses_total", "Cache lookups that had to load")
+metrics.ratio("cache_hit_ratio", "Hits / lookups, over all workers",
+              "cache_hits_total", ("cache_hits_total", "cache_misses_total"))
+
+# Every GrowwAPI call takes a token from host-wide per-method buckets and
+# goes through a per-method circuit breaker; order calls ride the critical
+# lane so market-data polling can't use up the last tokens
+ORDER_METHODS = ("place_order", "modify_order", "cancel_order")
+upstream_guard = UpstreamGuard(
+    os.getenv("GROWW_GUARD_PATH") or _state_path("groww_upstream_guard.sqlite3"),
+    limits=parse_limits(os.getenv(
+        "GROWW_RATE_LIMITS",
+        "get_ltp=10,get_ohlc=10,get_quote=10,get_option_chain=10,get_greeks=10,"
+        "place_order=10,modify_order=10,cancel_order=10,*=40"
+    )),
+    default_limit=parse_limits(f"x={os.getenv('GROWW_RATE_LIMIT_DEFAULT', '20')}")["x"],
+    lanes={method: CRITICAL for method in ORDER_METHODS},
+    reserve=float(os.getenv("GROWW_PRIORITY_RESERVE", "0.25")),
+    failure_threshold=int(os.getenv("GROWW_BREAKER_FAILURES", "5")),
+    cooldown=float(os.getenv("GROWW_BREAKER_COOLDOWN", "10")),
+)
+
+# The guard sits outside the metrics, so upstream latency and errors only
+# count calls that reached Groww: no limiter waits, no breaker rejections
+groww = GuardedClient(InstrumentedClient(groww, metrics), upstream_guard)
+
+
+def _route_labels():
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    return (("route", rule),)
+
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.metrics_route = _route_labels()
+    metrics.inc("http_requests_in_flight", g.metrics_route)
+    if request.content_length:
+        metrics.inc("http_request_bytes_total", g.metrics_route, request.content_length)
+
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.get("metrics_started")
+    if started is not None:
+        labels = g.metrics_route
+        metrics.observe(
+            "http_request_duration_seconds",
+            labels + (("method", request.method), ("status", str(response.status_code))),
+            time.perf_counter() - started,
+        )
+        # Streamed responses have no length up front and aren't counted
+        if response.content_length:
+            metrics.inc("http_response_bytes_total", labels, response.content_length)
+    return response
+
+
+# Routes that never call Groww keep working without credentials
+LOCAL_ENDPOINTS = {
+    "static", "health_check", "get_market_status", "get_cache_stats",
+    "get_upstream_stats", "get_metrics", "search_stock",
+}
 
-    if not USER_API_KEY:
+
+@app.before_request
+def _require_upstream():
+    if UPSTREAM_CONFIGURED or request.endpoint in LOCAL_ENDPOINTS:
         return None
+    return _upstream_unavailable("no Groww credentials configured (set GROWW_API_TOKEN or USER_API_KEY)")
+
+
+@app.teardown_request
+def _finish_request_metrics(exc=None):
+    labels = g.pop("metrics_route", None)
+    if labels is not None:
+        metrics.dec("http_requests_in_flight", labels)
+
+
+# Registered after the metrics hook so it runs first (after_request hooks
+# run in reverse) and response byte counts are what actually went out
+compressor = ResponseCompressor(
+    min_size=int(os.getenv("COMPRESS_MIN_SIZE", "1024")),
+    gzip_level=int(os.getenv("COMPRESS_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESS_BROTLI_QUALITY", "4")),
+)
+app.after_request(compressor)
+
+# Exchange sessions and holidays: outside trading hours nothing moves, so
+# market data fetched after the close is kept until the next pre-open
+market_calendar = MarketCalendar(
+    os.getenv("MARKET_HOLIDAYS_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_holidays.txt"),
+    pre_open=dtime.fromisoformat(os.getenv("MARKET_PRE_OPEN", "09:00")),
+    open=dtime.fromisoformat(os.getenv("MARKET_OPEN", "09:15")),
+    close=dtime.fromisoformat(os.getenv("MARKET_CLOSE", "15:30")),
+    settle=float(os.getenv("MARKET_SETTLE_SECONDS", "900")),
+    logger=app.logger,
+)
+
+# Short-lived quote cache shared by all request threads in this worker
+quote_cache = QuoteCache(
+    ttl=float(os.getenv("QUOTE_CACHE_TTL", "1.0")),
+    max_size=int(os.getenv("QUOTE_CACHE_MAX_SIZE", "5000")),
+    policy=market_calendar,
+)
+
+
+# Groww caps the number of symbols per LTP/OHLC call, so big lists are split
+batch_fetcher = BatchFetcher(
+    chunk_size=int(os.getenv("GROWW_MAX_SYMBOLS_PER_CALL", "50")),
+    max_workers=int(os.getenv("UPSTREAM_MAX_WORKERS", "8")),
+)
 
-    if USER_SECRET or USER_TOTP:
-        try:
-            totp = USER_TOTP if USER_TOTP else None
-            secret = None if USER_TOTP else USER_SECRET
-            return GrowwAPI.get_access_token(
-                api_key=USER_API_KEY,
-                totp=totp,
-                secret=secret,
-            )
-        except Exception:
-            app.logger.exception("Failed to exchange API key for access token")
-            return USER_API_KEY
 
-    return USER_API_KEY
+# One cache file per host shared by every worker, behind each worker's own
+# in-process caches, so adding workers doesn't multiply upstream calls
+shared_cache = SharedCache(
+    os.getenv("SHARED_CACHE_PATH") or _state_path("groww_shared_cache.sqlite3"),
+    lease_ttl=float(os.getenv("SHARED_CACHE_LEASE_TTL", "15")),
+)
+
+
+def _load_quotes(symbols):
+    """Fetch LTP + OHLC from Groww for a tuple of exchange_trading_symbols"""
+    ltp_data, ohlc_data, errors = batch_fetcher.fetch(groww, symbols)
+
+    # After a failed chunk a symbol with only one half would be cached (until
+    # the next open, off-hours) with zero OHLC or LTP: leave it out instead,
+    # so it's retried and the snapshot keeps its previous row
+    if errors:
+        have = lambda symbol: symbol in ltp_data and symbol in ohlc_data
+    else:
+        have = lambda symbol: symbol in ltp_data or symbol in ohlc_data
+    quotes = {
+        symbol: {"ltp": ltp_data.get(symbol, 0), "ohlc": ohlc_data.get(symbol, {})}
+        for symbol in symbols
+        if have(symbol)
+    }
+    return quotes, errors
+
+
+def fetch_quotes(symbols):
+    """Get ({symbol: {"ltp", "ohlc"}}, chunk errors) through the quote cache"""
+    return quote_cache.get_many(
+        symbols,
+        lambda keys: shared_cache.get_many("quotes", keys, market_calendar.ttl(quote_cache.ttl), _load_quotes)
+    )
+
+
+# Full quotes for /api/quotes: one upstream call per instrument, so they get
+# their own cache and a per-process cap on concurrent upstream calls
+full_quote_cache = QuoteCache(
+    ttl=float(os.getenv("FULL_QUOTE_TTL", "2.0")),
+    max_size=int(os.getenv("FULL_QUOTE_CACHE_SIZE", "5000")),
+    policy=market_calendar,
+)
+quote_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("QUOTE_MAX_CONCURRENCY", "8")),
+    thread_name_prefix="groww-quote",
+)
+QUOTES_MAX_ITEMS = int(os.getenv("QUOTES_MAX_ITEMS", "100"))
+
+
+def _load_full_quotes(keys):
+    """Fetch get_quote for (exchange, segment, symbol) keys concurrently"""
+    def fetch(key):
+        exchange, segment, symbol = key
+        return groww.get_quote(exchange=exchange, segment=segment, trading_symbol=symbol)
+
+    results, failures = fan_out(quote_executor, fetch, keys)
+    errors = [{"instrument": key, "error": error} for key, error in failures.items()]
+    return results, errors
+
+
+def fetch_full_quotes(instruments):
+    """({(exchange, segment, symbol): quote}, errors) through both cache layers"""
+    return full_quote_cache.get_many(
+        instruments,
+        lambda keys: shared_cache.get_many(
+            "full_quotes", keys, market_calendar.ttl(full_quote_cache.ttl), _load_full_quotes
+        )
+    )
+
 
+# Candles live on disk and are shared by every worker on this host
+candle_store = CandleStore(
+    os.getenv("CANDLE_STORE_PATH") or _state_path("groww_candles.sqlite3"),
+    max_rows=int(os.getenv("CANDLE_STORE_MAX_ROWS", "2000000")),
+    calendar=market_calendar,
+)
+
+
+def fetch_candles(exchange, symbol, interval, from_date, to_date):
+    """Get candles for a date range, only asking Groww for days we don't have"""
+    def fetch(start, end):
+        return groww.get_candles(
+            exchange=exchange,
+            segment=groww.SEGMENT_CASH,
+            trading_symbol=symbol,
+            from_date=start,
+            to_date=end,
+            interval=interval
+        )
+
+    # The store is already shared; the lease makes sure only one worker
+    # backfills a series while the others wait and then read it from disk
+    with shared_cache.lease("candles", f"{exchange}:{symbol}:{interval}"):
+        return candle_store.get_candles(exchange, symbol, interval, from_date, to_date, fetch)
 
-# Initialize Groww API (SAFE MODE)
-groww = None
-resolved_token = _resolve_groww_token()
 
-try:
-    if resolved_token:
-        groww = GrowwAPI(resolved_token)
-        app.logger.info("Initialized GrowwAPI with access token")
-except Exception as e:
-    app.logger.error(f"Groww API initialization failed: {e}")
+def load_candle_columns(exchange, symbol, interval, from_date, to_date):
+    """Candles as NumPy columns, resampled from a finer stored series when one
+    already covers the range so a new resolution doesn't cost a full download"""
+    interval = normalize_interval(interval)
+    stored = set(candle_store.covering_intervals(exchange, symbol, from_date, to_date))
+    for finer in finer_intervals(interval):
+        if finer in stored:
+            candles = fetch_candles(exchange, symbol, finer, from_date, to_date)
+            return resample(to_columns(candles), interval)
+    return to_columns(fetch_candles(exchange, symbol, interval, from_date, to_date))
 
-# If Groww API failed -> SAFE MOCK MODE (prevents deployment crash)
-if not groww:
-    app.logger.warning("GrowwAPI FAILED — backend running in SAFE MODE with mock responses")
 
-    class SafeGroww:
-        def __getattr__(self, name):
-            def fallback(*args, **kwargs):
-                return {}   # Always return empty data instead of crashing
-            return fallback
+# Last good chart per request shape; same stale-while-revalidate rules
+chart_lkg = LastKnownGood(
+    shared_cache, "chart_columns",
+    fresh_for=float(os.getenv("CHART_FRESH_SECONDS", "5")),
+    max_stale=float(os.getenv("CHART_MAX_STALE", "300")),
+    wait=float(os.getenv("STALE_REFRESH_WAIT", "0.5")),
+    logger=app.logger,
+    policy=market_calendar,
+)
+
+
+# Indicator state per (symbol, interval, indicator set); refreshes only feed
+# the bars that arrived since the last request
+indicator_engine = IndicatorEngine(
+    max_series=int(os.getenv("INDICATOR_MAX_SERIES", "512")),
+    max_points=int(os.getenv("INDICATOR_MAX_POINTS", "20000")),
+)
+
 
-    groww = SafeGroww()
+def _upstream_unavailable(error):
+    """503 for when Groww failed and no recent enough real data exists"""
+    response = jsonify({"success": False, "error": f"Upstream unavailable: {error}"})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+
+def _point_reduction_args():
+    """Read ?max_points=&downsample=lttb|minmax shared by the candle routes"""
+    max_points = request.args.get('max_points', type=int)
+    method = request.args.get('downsample', 'lttb')
+    if method not in ('lttb', 'minmax'):
+        raise ValueError("downsample must be 'lttb' or 'minmax'")
+    if max_points is not None and max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    return max_points, method
 
 # Extended list of 300+ popular stocks
 POPULAR_STOCKS = [
@@ -205,67 +506,306 @@ MAJOR_INDICES = [
     {"symbol": "MIDCPNIFTY", "exchange": "NSE", "name": "NIFTY MIDCAP"},
 ]
 
+def _symbol_key(item):
+    return f"{item['exchange']}_{item['symbol']}"
+
+
+# Background poller keeps the whole stock + index universe in memory, so the
+# list routes below never wait on Groww themselves; off-hours it polls every
+# SNAPSHOT_IDLE_INTERVAL seconds (answered from the quote cache anyway)
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "1.0"))
+SNAPSHOT_IDLE_INTERVAL = float(os.getenv("SNAPSHOT_IDLE_INTERVAL", "300"))
+market_snapshot = MarketSnapshot(
+    [_symbol_key(stock) for stock in POPULAR_STOCKS + MAJOR_INDICES],
+    loader=fetch_quotes,
+    interval=SNAPSHOT_INTERVAL,
+    logger=app.logger,
+    pace=lambda: market_calendar.poll_interval(SNAPSHOT_INTERVAL, SNAPSHOT_IDLE_INTERVAL),
+)
+
+# Sector codes for the snapshot rows, for /api/movers
+screener = Screener(market_snapshot.index, POPULAR_STOCKS, _symbol_key)
+
+
+# Option chains refresh constantly during market hours; expiries only daily
+option_chain_cache = OptionChainCache(
+    ttl=float(os.getenv("OPTION_CHAIN_TTL", "2.0")),
+    max_size=int(os.getenv("OPTION_CHAIN_CACHE_SIZE", "500")),
+    policy=market_calendar,
+)
+expiry_cache = EndOfDayCache()
+
+
+def fetch_expiries(exchange, underlying):
+    return expiry_cache.get(
+        (exchange, underlying),
+        lambda: groww.get_expiry_dates(exchange=exchange, underlying=underlying)
+    )
+
+
+# Last good chain per expiry, served stale (up to OPTION_CHAIN_MAX_STALE
+# seconds old) while Groww is slow or failing
+chain_lkg = LastKnownGood(
+    shared_cache, "option_chain",
+    fresh_for=option_chain_cache.ttl,
+    max_stale=float(os.getenv("OPTION_CHAIN_MAX_STALE", "60")),
+    wait=float(os.getenv("STALE_REFRESH_WAIT", "0.5")),
+    logger=app.logger,
+    policy=market_calendar,
+)
+
+
+def fetch_option_chain(exchange, underlying, expiry_date, since_version=None):
+    """(chain, version, delta, source_ms) from the option-chain cache"""
+    key = (exchange, underlying, expiry_date)
+
+    def load():
+        chain, stored_at = chain_lkg.get(
+            key,
+            lambda: groww.get_option_chain(
+                exchange=exchange,
+                underlying=underlying,
+                expiry_date=expiry_date
+            )
+        )
+        return chain, int(stored_at * 1000)
+
+    return option_chain_cache.get(key, load, since_version=since_version)
+
+
+RISK_FREE_RATE = float(os.getenv("RISK_FREE_RATE", "0.065"))
+# Seconds of time decay that option-chain Greeks (and their ETag) ignore
+GREEKS_TIME_BUCKET = float(os.getenv("GREEKS_TIME_BUCKET", "60"))
+
+
+def _underlying_spot(exchange, underlying, chain):
+    """Spot for Greeks: the chain's own underlying LTP, else the snapshot, else Groww"""
+    spot = (chain or {}).get('underlying_ltp')
+    if spot:
+        return float(spot)
+    key = f"{exchange}_{underlying}"
+    table = market_snapshot.current
+    i = table.index.get(key)
+    if i is not None and table.columns['ltp'][i]:
+        return table.columns['ltp'][i]
+    quotes, _ = fetch_quotes((key,))
+    spot = quotes.get(key, {}).get('ltp')
+    if not spot:
+        raise ValueError(f"No spot price available for {underlying}")
+    return float(spot)
+
+
+def _load_instrument_master():
+    """Broker instrument CSV (INSTRUMENTS_CSV) if configured, else POPULAR_STOCKS.
+
+    Sectors aren't in the broker CSV, so POPULAR_STOCKS supplies them.
+    """
+    csv_path = os.getenv("INSTRUMENTS_CSV")
+    if csv_path:
+        try:
+            return InstrumentMaster.load(
+                csv_path,
+                cache_path=os.getenv("INSTRUMENTS_CACHE"),
+                sectors={_symbol_key(s): s['sector'] for s in POPULAR_STOCKS},
+            )
+        except Exception as e:
+            app.logger.error(f"Failed to load instrument master {csv_path}: {e}")
+    return InstrumentMaster.from_records(POPULAR_STOCKS)
+
+
+instrument_master = _load_instrument_master()
+
+# Built once per worker; lookups don't scan the instrument list
+search_index = SearchIndex(instrument_master)
+
+
+def _popular_rows():
+    """Master rows of the snapshot's stock universe, in POPULAR_STOCKS order
+    (large caps first); stocks the master doesn't list are left out"""
+    rows = array('i')
+    for stock in POPULAR_STOCKS:
+        row = instrument_master.find(stock['exchange'], stock['symbol'])
+        if row is not None:
+            rows.append(row)
+    if len(rows) < len(POPULAR_STOCKS):
+        app.logger.warning(f"{len(POPULAR_STOCKS) - len(rows)} popular stocks missing from the instrument master")
+    return rows
+
+
+# /api/popular-stocks lists these; records come from the master on demand
+POPULAR_ROWS = _popular_rows()
+
+
+def _popular_in_sector(sector):
+    """Snapshot-universe stocks in a sector, via the master's sector index"""
+    stocks = []
+    for row in instrument_master.rows_for('sector', sector):
+        stock = instrument_master.record(row)
+        if _symbol_key(stock) in market_snapshot.index:
+            stocks.append(stock)
+    return stocks
+
+
+def _snapshot_row(table, item):
+    """Build the JSON row for a stock/index from the snapshot columns"""
+    i = table.index[_symbol_key(item)]
+    columns = table.columns
+    return {
+        "symbol": item['symbol'],
+        "exchange": item['exchange'],
+        "name": item['name'],
+        "ltp": columns['ltp'][i],
+        "open": columns['open'][i],
+        "high": columns['high'][i],
+        "low": columns['low'][i],
+        "close": columns['close'][i],
+        "change": columns['change'][i],
+        "change_perc": columns['change_perc'][i]
+    }
+
+
+def _snapshot_columns(table, items):
+    """Snapshot rows for `items` as columns (NumPy for prices), without a
+    dict per row"""
+    rows = np.fromiter((table.index[_symbol_key(item)] for item in items), np.intp, len(items))
+    columns = {
+        "symbol": [item['symbol'] for item in items],
+        "exchange": [item['exchange'] for item in items],
+        "name": [item['name'] for item in items],
+    }
+    for field in SNAPSHOT_FIELDS:
+        columns[field] = np.frombuffer(table.columns[field], dtype=np.float64)[rows]
+    return columns
+
+
+def _snapshot_etag(table):
+    """ETag for a snapshot-backed response; versions are per worker, so the
+    publish timestamp keeps two workers' version N apart"""
+    return make_etag(
+        "snapshot", request.path, table.version, table.timestamp,
+        market_calendar.state(), request.query_string,
+    )
+
+
+def _snapshot_response(table, data, **extra):
+    response = {
+        "success": True,
+        "data": data,
+        "version": table.version,
+        "timestamp": table.timestamp,
+        "session": market_calendar.status(),
+        **extra
+    }
+    if market_snapshot.last_errors:
+        response["errors"] = market_snapshot.last_errors
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "ok", "message": "Backend is running"})
 
+@app.route('/api/market-status', methods=['GET'])
+def get_market_status():
+    """Current exchange session (pre_open/open/post_close/closed) and next open"""
+    try:
+        return jsonify({"success": True, "data": market_calendar.status()})
+    except Exception as e:
+        app.logger.exception(e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss/coalesced counters for the in-process caches"""
+    return jsonify({"success": True, "data": {
+        "quotes": quote_cache.stats(),
+        "full_quotes": full_quote_cache.stats(),
+        "snapshot": market_snapshot.stats(),
+        "candles": candle_store.stats(),
+        "option_chains": option_chain_cache.stats(),
+        "shared": shared_cache.stats(),
+        "token": token_manager.stats(),
+        "last_known_good": {"chart": chart_lkg.stats(), "option_chain": chain_lkg.stats()},
+        "compression": compressor.stats(),
+        "indicators": indicator_engine.stats(),
+        "portfolio": portfolio_cache.stats(),
+        "session": market_calendar.status(),
+    }})
+
+def _cache_counters():
+    """Per-process cache hit/miss counts for /metrics"""
+    counts = []
+    for cache, hits, misses in (
+        ("quotes", quote_cache.hits + quote_cache.coalesced, quote_cache.misses),
+        ("full_quotes", full_quote_cache.hits + full_quote_cache.coalesced, full_quote_cache.misses),
+        ("option_chains", option_chain_cache.hits, option_chain_cache.misses),
+        ("shared", shared_cache.hits + shared_cache.waits, shared_cache.loads),
+        ("candles", candle_store.served_from_disk, candle_store.upstream_fetches),
+    ):
+        counts.append(("cache_hits_total", {"cache": cache}, hits))
+        counts.append(("cache_misses_total", {"cache": cache}, misses))
+    return counts
+
+
+metrics.register_collector(_cache_counters)
+metrics.counter("groww_guard_events_total", "Rate limiter and breaker events by method")
+metrics.register_collector(lambda: [
+    ("groww_guard_events_total", {"method": method, "event": event}, count)
+    for (method, event), count in list(upstream_guard.counters.items())
+])
+
+
+@app.route('/api/upstream-stats', methods=['GET'])
+def get_upstream_stats():
+    """Rate limit buckets, breaker states and this worker's guard counters"""
+    try:
+        return jsonify({"success": True, "data": upstream_guard.stats()})
+    except Exception as e:
+        app.logger.exception(e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint, aggregated over every worker on this host"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route('/api/popular-stocks', methods=['GET'])
 def get_popular_stocks():
     try:
         limit = request.args.get('limit', type=int, default=50)
         sector = request.args.get('sector')
         
-        stocks = POPULAR_STOCKS
+        try:
+            response_format = parse_format(request.args.get('format'))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
         if sector:
-            stocks = [s for s in POPULAR_STOCKS if s.get('sector') == sector]
+            stocks = _popular_in_sector(sector)
+        else:
+            stocks = [instrument_master.record(row) for row in POPULAR_ROWS[:limit]]
         
-        stocks = stocks[:limit]
+        table = market_snapshot.read()
+        if table.version == 0:
+            return _upstream_unavailable("market data is not available yet")
+        etag = _snapshot_etag(table)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        if response_format != ROWS:
+            stocks = stocks[:limit]
+            columns = _snapshot_columns(table, stocks)
+            columns["sector"] = [stock.get('sector', 'Other') for stock in stocks]
+            meta = _snapshot_response(table, None, total=len(POPULAR_ROWS))
+            del meta["data"]
+            return with_etag(columns_response(columns, response_format, meta), etag)
         results = []
+        for stock in stocks[:limit]:
+            row = _snapshot_row(table, stock)
+            row["sector"] = stock.get('sector', 'Other')
+            results.append(row)
         
-        # Get LTP for stocks
-        symbols = [f"{stock['exchange']}_{stock['symbol']}" for stock in stocks]
-        
-        try:
-            ltp_data = groww.get_ltp(
-                segment=groww.SEGMENT_CASH,
-                exchange_trading_symbols=tuple(symbols)
-            )
-            
-            ohlc_data = groww.get_ohlc(
-                segment=groww.SEGMENT_CASH,
-                exchange_trading_symbols=tuple(symbols)
-            )
-        except Exception as e:
-            app.logger.error(f"Error fetching data: {e}")
-            ltp_data = {}
-            ohlc_data = {}
-        
-        for stock in stocks:
-            key = f"{stock['exchange']}_{stock['symbol']}"
-            ltp = ltp_data.get(key, 0)
-            ohlc = ohlc_data.get(key, {})
-            
-            change = 0
-            change_perc = 0
-            if ohlc.get('close', 0) != 0 and ltp:
-                change = ltp - ohlc.get('close', 0)
-                change_perc = (change / ohlc.get('close', 0)) * 100
-            
-            results.append({
-                "symbol": stock['symbol'],
-                "exchange": stock['exchange'],
-                "name": stock['name'],
-                "sector": stock.get('sector', 'Other'),
-                "ltp": ltp,
-                "open": ohlc.get('open', 0),
-                "high": ohlc.get('high', 0),
-                "low": ohlc.get('low', 0),
-                "close": ohlc.get('close', 0),
-                "change": change,
-                "change_perc": change_perc
-            })
-        
-        return jsonify({"success": True, "data": results, "total": len(POPULAR_STOCKS)})
+        return with_etag(jsonify(_snapshot_response(table, results, total=len(POPULAR_ROWS))), etag)
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -273,50 +813,99 @@ def get_popular_stocks():
 @app.route('/api/sectors', methods=['GET'])
 def get_sectors():
     """Get list of all sectors"""
-    sectors = list(set([stock.get('sector', 'Other') for stock in POPULAR_STOCKS]))
-    return jsonify({"success": True, "data": sorted(sectors)})
+    table = market_snapshot.read()
+    return jsonify(_snapshot_response(table, instrument_master.values('sector')))
 
 @app.route('/api/indices', methods=['GET'])
 def get_indices():
     try:
-        results = []
-        symbols = [f"{index['exchange']}_{index['symbol']}" for index in MAJOR_INDICES]
+        table = market_snapshot.read()
+        if table.version == 0:
+            return _upstream_unavailable("market data is not available yet")
+        etag = _snapshot_etag(table)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
         
-        ltp_data = groww.get_ltp(
-            segment=groww.SEGMENT_CASH,
-            exchange_trading_symbols=tuple(symbols)
+        results = [_snapshot_row(table, index) for index in MAJOR_INDICES]
+        return with_etag(jsonify(_snapshot_response(table, results)), etag)
+    except Exception as e:
+        app.logger.exception(e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/movers', methods=['GET'])
+def get_movers():
+    """Top/bottom movers by change, range and gap plus sector aggregates"""
+    try:
+        limit = min(max(request.args.get('limit', type=int, default=10), 1), 100)
+        rank_by = [m.strip() for m in request.args.get('rank_by', ','.join(MOVER_METRICS)).split(',') if m.strip()]
+        unknown = [m for m in rank_by if m not in MOVER_METRICS]
+        if unknown or not rank_by:
+            return jsonify({
+                "success": False,
+                "error": f"rank_by must be among: {', '.join(MOVER_METRICS)}"
+            }), 400
+        sectors = request.args.get('sector')
+
+        table = market_snapshot.read()
+        if table.version == 0:
+            return _upstream_unavailable("market data is not available yet")
+        etag = _snapshot_etag(table)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        result = screener.movers(table, rank_by, limit, sectors.split(',') if sectors else None)
+        return with_etag(jsonify(_snapshot_response(table, result)), etag)
+    except Exception as e:
+        app.logger.exception(e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/stream/prices', methods=['GET'])
+def stream_live_prices():
+    """SSE stream: initial snapshot, then only rows whose LTP changed"""
+    try:
+        symbols = request.args.get('symbols')
+        sector = request.args.get('sector')
+
+        universe = {_symbol_key(item): item for item in POPULAR_STOCKS + MAJOR_INDICES}
+        if symbols:
+            keys = [s.strip().upper() for s in symbols.split(',') if s.strip()]
+            keys = [k if '_' in k else f"NSE_{k}" for k in keys]
+            unknown = [k for k in keys if k not in universe]
+            if unknown:
+                return jsonify({"success": False, "error": f"Unknown symbols: {', '.join(unknown)}"}), 400
+        elif sector:
+            keys = [_symbol_key(s) for s in _popular_in_sector(sector)]
+            if not keys:
+                return jsonify({"success": False, "error": f"Unknown sector: {sector}"}), 400
+        else:
+            keys = [_symbol_key(s) for s in POPULAR_STOCKS]
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        def build_row(table, item):
+            row = _snapshot_row(table, item)
+            if 'sector' in item:
+                row["sector"] = item['sector']
+            return row
+
+        # Each stream holds a worker for up to STREAM_MAX_SECONDS: run more
+        # than a handful of subscribers with threaded workers
+        # (WEB_WORKER_CLASS=gthread WEB_THREADS=N in the Procfile) or asgi.py
+        stream = stream_prices(
+            market_snapshot,
+            [(key, universe[key]) for key in dict.fromkeys(keys)],
+            build_row,
+            last_event_id=last_event_id,
+            heartbeat=float(os.getenv("STREAM_HEARTBEAT", "15")),
+            max_duration=float(os.getenv("STREAM_MAX_SECONDS", "300")),
         )
-        
-        ohlc_data = groww.get_ohlc(
-            segment=groww.SEGMENT_CASH,
-            exchange_trading_symbols=tuple(symbols)
+        return Response(
+            stream_with_context(stream),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
         )
-        
-        for index in MAJOR_INDICES:
-            key = f"{index['exchange']}_{index['symbol']}"
-            ohlc = ohlc_data.get(key, {})
-            ltp = ltp_data.get(key, 0)
-            
-            change = 0
-            change_perc = 0
-            if ohlc.get('close', 0) != 0:
-                change = ltp - ohlc.get('close', 0)
-                change_perc = (change / ohlc.get('close', 0)) * 100
-            
-            results.append({
-                "symbol": index['symbol'],
-                "exchange": index['exchange'],
-                "name": index['name'],
-                "ltp": ltp,
-                "open": ohlc.get('open', 0),
-                "high": ohlc.get('high', 0),
-                "low": ohlc.get('low', 0),
-                "close": ohlc.get('close', 0),
-                "change": change,
-                "change_perc": change_perc
-            })
-        
-        return jsonify({"success": True, "data": results})
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -331,13 +920,78 @@ def get_quote():
         if not symbol:
             return jsonify({"success": False, "error": "Symbol is required"}), 400
         
-        quote = groww.get_quote(
-            exchange=exchange,
-            segment=segment,
-            trading_symbol=symbol
-        )
+        key = (exchange, segment, symbol)
+        quotes, errors = fetch_full_quotes([key])
+        if key not in quotes:
+            raise RuntimeError(errors[0]['error'] if errors else f"No quote for {symbol}")
         
-        return jsonify({"success": True, "data": quote})
+        return jsonify({"success": True, "data": quotes[key], "session": market_calendar.status()})
+    except Exception as e:
+        app.logger.exception(e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+def _parse_quote_instruments(default_exchange, default_segment):
+    """(exchange, segment, symbol) tuples from ?symbols=NSE:TCS,... or a JSON body"""
+    instruments = []
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        items = body.get('instruments', []) if isinstance(body, dict) else body
+        for item in items:
+            if isinstance(item, str):
+                item = {"symbol": item}
+            instruments.append((
+                item.get('exchange', default_exchange),
+                item.get('segment', default_segment),
+                item['symbol'],
+            ))
+    else:
+        for token in request.args.get('symbols', '').split(','):
+            parts = [p.strip() for p in token.split(':') if p.strip()]
+            if len(parts) == 1:
+                instruments.append((default_exchange, default_segment, parts[0]))
+            elif len(parts) == 2:
+                instruments.append((parts[0], default_segment, parts[1]))
+            elif len(parts) == 3:
+                instruments.append(tuple(parts))
+    # Collapse duplicates, keep request order
+    return list(dict.fromkeys(instruments))
+
+@app.route('/api/quotes', methods=['GET', 'POST'])
+def get_quotes():
+    """Batch quotes: many instruments per request, fetched concurrently"""
+    try:
+        exchange = request.args.get('exchange', 'NSE')
+        segment = request.args.get('segment', groww.SEGMENT_CASH)
+        try:
+            instruments = _parse_quote_instruments(exchange, segment)
+        except (KeyError, TypeError, AttributeError):
+            return jsonify({"success": False, "error": "Each instrument needs a symbol"}), 400
+
+        if not instruments:
+            return jsonify({"success": False, "error": "At least one symbol is required"}), 400
+        if len(instruments) > QUOTES_MAX_ITEMS:
+            return jsonify({
+                "success": False,
+                "error": f"At most {QUOTES_MAX_ITEMS} instruments per request"
+            }), 400
+
+        quotes, errors = fetch_full_quotes(instruments)
+
+        data = {}
+        failed = {e['instrument']: e['error'] for e in errors}
+        for key in instruments:
+            label = f"{key[0]}_{key[2]}"
+            if key in quotes:
+                data[label] = quotes[key]
+            elif key in failed:
+                failed[label] = failed.pop(key)
+        failed = {k: v for k, v in failed.items() if isinstance(k, str)}
+        return jsonify({
+            "success": True,
+            "data": data,
+            "errors": failed,
+            "session": market_calendar.status(),
+        })
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -349,9 +1003,17 @@ def get_chart_data():
         symbol = request.args.get('symbol')
         exchange = request.args.get('exchange', 'NSE')
         interval = request.args.get('interval', '1D')
+        resolution = request.args.get('resolution')
         
         if not symbol:
             return jsonify({"success": False, "error": "Symbol is required"}), 400
+        if resolution and normalize_interval(resolution) not in INTERVAL_SECONDS:
+            return jsonify({"success": False, "error": f"Unsupported resolution: {resolution}"}), 400
+        try:
+            max_points, downsample = _point_reduction_args()
+            response_format = parse_format(request.args.get('format'))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         
         # Map interval to API format and calculate date range
         interval_mapping = {
@@ -363,79 +1025,65 @@ def get_chart_data():
         }
         
         api_interval, days_back = interval_mapping.get(interval, ('1day', 30))
+        if resolution:
+            api_interval = normalize_interval(resolution)
         
-        # Calculate date range
-        to_date = datetime.now()
-        from_date = to_date - timedelta(days=days_back)
+        def load():
+            # Get candles from the store (Groww only for missing days); on a
+            # day without a session the window ends at the last one, so a
+            # weekend 1D chart shows Friday rather than nothing
+            to_date = datetime.now()
+            trading_day = market_calendar.trading_day()
+            if trading_day < to_date.date():
+                to_date = datetime.combine(trading_day, dtime.max)
+            from_date = to_date - timedelta(days=days_back)
+            columns = load_candle_columns(exchange, symbol, api_interval, from_date, to_date)
+            columns = reduce_points(columns, max_points, downsample)
+            return {field: columns[field].tolist() for field in FIELDS}
         
+        key = (exchange, symbol, api_interval, days_back, max_points, downsample)
         try:
-            # Get candles from Groww API
-            candles = groww.get_candles(
-                exchange=exchange,
-                segment=groww.SEGMENT_CASH,
-                trading_symbol=symbol,
-                from_date=from_date.strftime('%Y-%m-%d'),
-                to_date=to_date.strftime('%Y-%m-%d'),
-                interval=api_interval
-            )
-            
-            # Format data for Android app
-            chart_data = {
-                "candles": [],
-                "interval": interval
-            }
-            
-            for candle in candles:
-                chart_data["candles"].append({
-                    "timestamp": candle.get('timestamp', 0),
-                    "open": candle.get('open', 0),
-                    "high": candle.get('high', 0),
-                    "low": candle.get('low', 0),
-                    "close": candle.get('close', 0),
-                    "volume": candle.get('volume', 0)
-                })
-            
-            return jsonify({"success": True, "data": chart_data})
-            
+            stored, stored_at = chart_lkg.get(key, load)
         except Exception as api_error:
             app.logger.error(f"Groww API error: {api_error}")
-            # Return mock data if API fails
-            return jsonify({
-                "success": True, 
-                "data": {
-                    "candles": generate_mock_candles(days_back),
-                    "interval": interval
-                }
-            })
+            return _upstream_unavailable(api_error)
+        session = market_calendar.status()
+        etag = make_etag("chart", key, stored_at, session["state"], request.query_string)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        columns = {
+            "timestamp": np.asarray(stored["timestamp"], dtype=np.int64),
+            **{field: np.asarray(stored[field], dtype=np.float64) for field in FIELDS[1:]},
+        }
+        if response_format != ROWS:
+            return with_etag(columns_response(columns, response_format, {
+                "success": True,
+                "interval": interval,
+                "freshness": chart_lkg.freshness(key, stored_at),
+                "session": session,
+            }), etag)
+
+        # Format data for Android app
+        chart_data = {
+            "candles": to_candles(columns),
+            "interval": interval
+        }
+
+        return with_etag(jsonify({
+            "success": True,
+            "data": chart_data,
+            "freshness": chart_lkg.freshness(key, stored_at),
+            "session": session,
+        }), etag)
             
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
 
-def generate_mock_candles(days_back):
-    """Generate mock candle data for testing"""
-    import random
-    candles = []
-    base_price = 2500
-    
-    for i in range(min(days_back * 10, 100)):  # Limit to 100 candles
-        timestamp = int((datetime.now() - timedelta(hours=days_back*24-i)).timestamp() * 1000)
-        open_price = base_price + random.uniform(-50, 50)
-        close_price = open_price + random.uniform(-20, 20)
-        high_price = max(open_price, close_price) + random.uniform(0, 10)
-        low_price = min(open_price, close_price) - random.uniform(0, 10)
-        
-        candles.append({
-            "timestamp": timestamp,
-            "open": round(open_price, 2),
-            "high": round(high_price, 2),
-            "low": round(low_price, 2),
-            "close": round(close_price, 2),
-            "volume": random.randint(10000, 100000)
-        })
-        base_price = close_price
-    
-    return candles
+HISTORICAL_OPEN_TTL = float(os.getenv("HISTORICAL_OPEN_TTL", "5"))
+
 
 @app.route('/api/historical', methods=['GET'])
 def get_historical_data():
@@ -449,30 +1097,98 @@ def get_historical_data():
         
         if not symbol:
             return jsonify({"success": False, "error": "Symbol is required"}), 400
+        try:
+            max_points, downsample = _point_reduction_args()
+            response_format = parse_format(request.args.get('format'))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         
-        # Get historical data
-        candles = groww.get_candles(
-            exchange=exchange,
-            segment=groww.SEGMENT_CASH,
-            trading_symbol=symbol,
-            from_date=from_date,
-            to_date=to_date,
-            interval=interval
-        )
+        # Get historical data (open-ended ranges can't be stored by date, so
+        # they're cached whole: briefly in session, until the open off-hours)
+        if from_date and to_date:
+            columns = load_candle_columns(exchange, symbol, interval, from_date, to_date)
+        else:
+            candles, _ = shared_cache.get(
+                "historical_open", (exchange, symbol, interval, from_date, to_date),
+                market_calendar.ttl(HISTORICAL_OPEN_TTL),
+                lambda: groww.get_candles(
+                    exchange=exchange,
+                    segment=groww.SEGMENT_CASH,
+                    trading_symbol=symbol,
+                    from_date=from_date,
+                    to_date=to_date,
+                    interval=interval
+                ) or [],
+            )
+            columns = to_columns(candles)
         
         # Format data for charting library
-        chart_data = []
-        for candle in candles:
-            chart_data.append({
-                "time": candle.get('timestamp'),
-                "open": candle.get('open'),
-                "high": candle.get('high'),
-                "low": candle.get('low'),
-                "close": candle.get('close'),
-                "volume": candle.get('volume', 0)
-            })
+        columns = reduce_points(columns, max_points, downsample)
+        # No version for an arbitrary range: hashing the columns is still far
+        # cheaper than building and serializing the candle dicts
+        etag = make_etag("historical", request.query_string, *(columns[f].tobytes() for f in FIELDS))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        if response_format != ROWS:
+            return with_etag(columns_response(
+                {field: columns[field] for field in FIELDS}, response_format,
+                {"success": True}, names={"timestamp": "time"},
+            ), etag)
+        return with_etag(jsonify({"success": True, "data": to_candles(columns, time_key="time")}), etag)
+    except Exception as e:
+        app.logger.exception(e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/indicators', methods=['GET'])
+def get_indicators():
+    """SMA/EMA/RSI/MACD/Bollinger/VWAP over a symbol's candles, one array per output"""
+    try:
+        symbol = request.args.get('symbol')
+        exchange = request.args.get('exchange', 'NSE')
+        interval = normalize_interval(request.args.get('interval', '5minute'))
+        days = request.args.get('days', type=int, default=30)
+        since = request.args.get('since', type=int)
         
-        return jsonify({"success": True, "data": chart_data})
+        if not symbol:
+            return jsonify({"success": False, "error": "Symbol is required"}), 400
+        if interval not in INTERVAL_SECONDS:
+            return jsonify({"success": False, "error": f"Unsupported interval: {interval}"}), 400
+        if not 1 <= days <= 3650:
+            return jsonify({"success": False, "error": "days must be between 1 and 3650"}), 400
+        try:
+            spec = parse_indicators(request.args.get('indicators', 'sma,ema,rsi,macd,bb,vwap'))
+            response_format = parse_format(request.args.get('format', COLUMNAR))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        def load(from_ts):
+            return load_candle_columns(
+                exchange, symbol, interval, datetime.fromtimestamp(from_ts), datetime.now()
+            )
+
+        now = time.time()
+        try:
+            columns, last_closed = indicator_engine.read(
+                (exchange, symbol, interval, spec), spec, INTERVAL_SECONDS[interval],
+                int(now - days * 86400), load, now, since=since,
+            )
+        except Exception as api_error:
+            app.logger.error(f"Groww API error: {api_error}")
+            return _upstream_unavailable(api_error)
+
+        meta = {"success": True, "symbol": symbol, "interval": interval, "last_closed": last_closed}
+        if response_format == ROWS:
+            names = list(columns)
+            rows = [dict(zip(names, values)) for values in zip(*columns.values())]
+            return jsonify({**meta, "data": rows})
+        if response_format != COLUMNAR:
+            # Typed arrays for the binary formats; nulls become NaN
+            columns = {
+                name: np.array(values, dtype=np.int64 if name == "timestamp" else np.float64)
+                for name, values in columns.items()
+            }
+        return columns_response(columns, response_format, meta)
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -485,13 +1201,15 @@ def search_stock():
         if not query or len(query) < 2:
             return jsonify({"success": True, "data": []})
         
-        # Search in popular stocks
-        results = []
-        for stock in POPULAR_STOCKS:
-            if query in stock['symbol'] or query in stock['name'].upper():
-                results.append(stock)
+        limit = min(request.args.get('limit', type=int, default=20), 100)
+        results = search_index.search(
+            query,
+            limit=limit,
+            sector=request.args.get('sector'),
+            exchange=request.args.get('exchange'),
+        )
         
-        return jsonify({"success": True, "data": results[:20]})  # Limit to 20 results
+        return jsonify({"success": True, "data": results})
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -503,6 +1221,8 @@ def get_option_chain():
         underlying = request.args.get('underlying')
         exchange = request.args.get('exchange', 'NSE')
         expiry_date = request.args.get('expiry_date')
+        since_version = request.args.get('since_version', type=int)
+        include_greeks = request.args.get('greeks') in ('1', 'true')
         
         if not underlying:
             return jsonify({"success": False, "error": "Underlying is required"}), 400
@@ -510,10 +1230,7 @@ def get_option_chain():
         try:
             # Get all expiry dates if not provided
             if not expiry_date:
-                expiries = groww.get_expiry_dates(
-                    exchange=exchange,
-                    underlying=underlying
-                )
+                expiries = fetch_expiries(exchange, underlying)
                 if expiries:
                     expiry_date = expiries[0]  # Use nearest expiry
                 else:
@@ -522,73 +1239,60 @@ def get_option_chain():
                         "error": "No expiry dates found for this underlying"
                     }), 404
             
-            option_chain = groww.get_option_chain(
-                exchange=exchange,
-                underlying=underlying,
-                expiry_date=expiry_date
+            option_chain, version, delta, source_ms = fetch_option_chain(
+                exchange, underlying, expiry_date, since_version
+            )
+            session = market_calendar.status()
+            valuation = ()
+            if include_greeks:
+                # Greeks move with spot and time to expiry as well as the
+                # chain: value at the start of a GREEKS_TIME_BUCKET window so
+                # the body (and ETag) only changes when one of them does
+                spot = _underlying_spot(exchange, underlying, option_chain)
+                valued_at = time.time() // GREEKS_TIME_BUCKET * GREEKS_TIME_BUCKET
+                valuation = (spot, valued_at)
+            etag = make_etag(
+                "option-chain", exchange, underlying, expiry_date, version,
+                session["state"], *valuation, request.query_string,
             )
+            cached = not_modified(etag)
+            if cached is not None:
+                return cached
             
-            return jsonify({
+            response = {
                 "success": True, 
                 "data": option_chain,
-                "expiry_date": expiry_date
-            })
+                "expiry_date": expiry_date,
+                "version": version,
+                "delta": delta is not None,
+                "freshness": chain_lkg.freshness(
+                    (exchange, underlying, expiry_date), source_ms / 1000
+                ),
+                "session": session,
+            }
+            if delta is not None:
+                # Only strikes whose CE/PE changed after since_version
+                response["data"] = with_strikes(option_chain, delta["strikes"])
+                response["removed_strikes"] = delta["removed"]
+            if include_greeks:
+                # Computed locally for every leg instead of one upstream call each
+                greeks = chain_greeks(
+                    response["data"], spot, expiry_date, RISK_FREE_RATE,
+                    now=datetime.fromtimestamp(valued_at, IST),
+                )
+                response["data"] = with_greeks(response["data"], greeks)
+                response["spot"] = spot
+                response["valued_at"] = int(valued_at * 1000)
+            return with_etag(jsonify(response), etag)
             
         except Exception as api_error:
             app.logger.error(f"Groww API error: {api_error}")
-            # Return mock option chain data
-            return jsonify({
-                "success": True,
-                "data": generate_mock_option_chain(underlying),
-                "expiry_date": (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-            })
+            return _upstream_unavailable(api_error)
             
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
 
-def generate_mock_option_chain(underlying):
-    """Generate mock option chain for testing"""
-    import random
-    
-    base_price = 24000 if underlying == "NIFTY" else 50000 if underlying == "BANKNIFTY" else 20000
-    strikes = []
-    
-    for i in range(-5, 6):  # 11 strikes around ATM
-        strike_price = base_price + (i * 100)
-        
-        ce_data = {
-            "symbol": f"{underlying}24FEB{int(strike_price)}CE",
-            "ltp": round(abs(50 - i * 10) + random.uniform(0, 20), 2),
-            "change": round(random.uniform(-10, 10), 2),
-            "changePerc": round(random.uniform(-5, 5), 2),
-            "oi": random.randint(5000, 50000),
-            "iv": round(random.uniform(15, 25), 1),
-            "volume": random.randint(1000, 10000)
-        }
-        
-        pe_data = {
-            "symbol": f"{underlying}24FEB{int(strike_price)}PE",
-            "ltp": round(abs(50 + i * 10) + random.uniform(0, 20), 2),
-            "change": round(random.uniform(-10, 10), 2),
-            "changePerc": round(random.uniform(-5, 5), 2),
-            "oi": random.randint(5000, 50000),
-            "iv": round(random.uniform(15, 25), 1),
-            "volume": random.randint(1000, 10000)
-        }
-        
-        strikes.append({
-            "strikePrice": strike_price,
-            "ce": ce_data,
-            "pe": pe_data
-        })
-    
-    return {
-        "underlying": underlying,
-        "expiryDate": (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d'),
-        "strikes": strikes
-    }
-
 @app.route('/api/expiry-dates', methods=['GET'])
 def get_expiry_dates():
     """Get all available expiry dates for an underlying"""
@@ -599,10 +1303,7 @@ def get_expiry_dates():
         if not underlying:
             return jsonify({"success": False, "error": "Underlying is required"}), 400
         
-        expiries = groww.get_expiry_dates(
-            exchange=exchange,
-            underlying=underlying
-        )
+        expiries = fetch_expiries(exchange, underlying)
         
         return jsonify({"success": True, "data": expiries})
     except Exception as e:
@@ -616,6 +1317,27 @@ def get_greeks():
         trading_symbol = request.args.get('trading_symbol')
         exchange = request.args.get('exchange', 'NSE')
         expiry = request.args.get('expiry')
+        trading_symbols = request.args.get('trading_symbols')
+
+        if trading_symbols or not trading_symbol or request.args.get('local') in ('1', 'true'):
+            # Batch mode: IV + Greeks for the whole chain (or the listed legs)
+            # computed locally from one cached option-chain fetch
+            if not all([underlying, expiry]):
+                return jsonify({"success": False, "error": "underlying and expiry are required"}), 400
+
+            chain, version, _, _ = fetch_option_chain(exchange, underlying, expiry)
+            spot = _underlying_spot(exchange, underlying, chain)
+            greeks = chain_greeks(chain, spot, expiry, RISK_FREE_RATE)
+
+            wanted = [s for s in (trading_symbols or trading_symbol or '').split(',') if s]
+            if wanted:
+                legs = leg_symbols(chain)
+                greeks = {
+                    symbol: greeks.get(legs[symbol][0], {}).get(legs[symbol][1]) if symbol in legs else None
+                    for symbol in wanted
+                }
+
+            return jsonify({"success": True, "data": greeks, "spot": spot, "version": version})
         
         if not all([underlying, trading_symbol, expiry]):
             return jsonify({"success": False, "error": "All parameters are required"}), 400
@@ -632,6 +1354,38 @@ def get_greeks():
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Orders and positions per account, shared by the host's workers; placing an
+# order re-fetches both so the new order is never missing from a poll
+portfolio_cache = PortfolioCache(
+    shared_cache,
+    fetch=lambda kind: groww.get_orders() if kind == "orders" else groww.get_positions(),
+    ttl=float(os.getenv("PORTFOLIO_TTL", "2.0")),
+    pending_ttl=float(os.getenv("PORTFOLIO_PENDING_TTL", "60")),
+    logger=app.logger,
+)
+PORTFOLIO_ACCOUNT = "sim" if GROWW_BACKEND == "sim" else token_manager.account_id
+
+
+def _portfolio_response(kind, field):
+    """Cached orders/positions, only the items changed after ?since= when given"""
+    since = request.args.get('since', type=int)
+    try:
+        items, version, delta = portfolio_cache.get(PORTFOLIO_ACCOUNT, kind, since)
+    except Exception as api_error:
+        app.logger.error(f"Groww API error: {api_error}")
+        return _upstream_unavailable(api_error)
+    etag = make_etag(kind, PORTFOLIO_ACCOUNT, version, request.query_string)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    response = {"success": True, "data": {field: items}, "version": version, "delta": delta is not None}
+    if delta is not None:
+        identity = KINDS[kind][1]
+        response["data"] = {field: [item for item in items if identity(item) in delta["items"]]}
+        response["removed"] = delta["removed"]
+    return with_etag(jsonify(response), etag)
+
 @app.route('/api/place-order', methods=['POST'])
 def place_order():
     """Place an order (options or equity)"""
@@ -650,6 +1404,26 @@ def place_order():
             validity=data.get('validity', 'DAY')
         )
         
+        # Write-through: the order (as placed, until Groww lists it) and the
+        # positions it moved are in the cache before the client polls again
+        placed = {
+            "trading_symbol": data['trading_symbol'],
+            "exchange": data.get('exchange', 'NSE'),
+            "segment": data.get('segment', groww.SEGMENT_CASH),
+            "transaction_type": data['transaction_type'],
+            "quantity": data['quantity'],
+            "order_type": data.get('order_type', 'MARKET'),
+            "product": data.get('product_type', 'DELIVERY'),
+            "price": data.get('price', 0),
+            "validity": data.get('validity', 'DAY'),
+            **(order if isinstance(order, dict) else {}),
+        }
+        try:
+            portfolio_cache.invalidate(PORTFOLIO_ACCOUNT, placed)
+        except Exception as cache_error:
+            # The order went through; don't report it as failed
+            app.logger.error(f"Portfolio cache invalidation failed: {cache_error}")
+
         return jsonify({"success": True, "data": order})
     except Exception as e:
         app.logger.exception(e)
@@ -657,20 +1431,18 @@ def place_order():
 
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
-    """Get all orders"""
+    """Get all orders (or, with ?since=<version>, those changed after it)"""
     try:
-        orders = groww.get_orders()
-        return jsonify({"success": True, "data": orders})
+        return _portfolio_response("orders", "order_list")
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/api/positions', methods=['GET'])
 def get_positions():
-    """Get current positions"""
+    """Get current positions (or, with ?since=<version>, those changed after it)"""
     try:
-        positions = groww.get_positions()
-        return jsonify({"success": True, "data": positions})
+        return _portfolio_response("positions", "positions")
     except Exception as e:
         app.logger.exception(e)
         return jsonify({"success": False, "error": str(e)}), 500
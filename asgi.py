@@ -0,0 +1,214 @@
+"""ASGI entry point: serves the Flask app from an event loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT
+
+Connections, request bodies and response bodies are handled on the event
+loop; only the Flask handler itself (and so the blocking GrowwAPI calls it
+makes) runs on a thread pool. A request waiting on Groww costs one pool
+thread instead of a whole sync worker process, so a process handles up to
+ASGI_THREADS requests at once (more wait on the loop for a free thread).
+Long-lived SSE streams get a pool of their own (ASGI_STREAM_THREADS), so
+subscribers can't use up the threads ordinary requests need. Routes and
+JSON shapes are exactly the Flask ones.
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app, market_snapshot
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "256"))
+ASGI_MAX_BODY = int(os.getenv("ASGI_MAX_BODY", str(1024 * 1024)))
+ASGI_STREAM_THREADS = int(os.getenv("ASGI_STREAM_THREADS", "1024"))
+# Requests routed to the stream pool: these paths, or anything an
+# EventSource sends (it always asks for text/event-stream)
+ASGI_STREAM_PATHS = tuple(
+    p for p in os.getenv("ASGI_STREAM_PATHS", "/api/stream/").split(",") if p
+)
+
+
+class _Disconnected(Exception):
+    pass
+
+
+def _environ(scope, body):
+    """PEP 3333 environ for an ASGI http scope"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name == "CONTENT_LENGTH":
+            environ["CONTENT_LENGTH"] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    environ.setdefault("CONTENT_LENGTH", str(len(body)))
+    return environ
+
+
+class WSGIAdapter:
+    """Run a WSGI app under ASGI with its handlers on bounded thread pools,
+    one for ordinary requests and one for event streams.
+
+    Response chunks are handed back to the loop one at a time and the handler
+    thread waits for each send, so a slow client applies backpressure instead
+    of buffering a stream in memory. When the client goes away the response
+    iterator is closed at the next chunk, which ends SSE streams promptly.
+    """
+
+    def __init__(self, wsgi_app, max_threads=ASGI_THREADS, max_body=ASGI_MAX_BODY,
+                 stream_threads=ASGI_STREAM_THREADS, stream_paths=ASGI_STREAM_PATHS):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self.stream_paths = stream_paths
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_threads,
+            thread_name_prefix="asgi-wsgi",
+        )
+        self.stream_executor = ThreadPoolExecutor(
+            max_workers=stream_threads,
+            thread_name_prefix="asgi-stream",
+        )
+
+    def _is_stream(self, scope):
+        if scope["path"].startswith(self.stream_paths):
+            return True
+        return any(
+            name == b"accept" and b"text/event-stream" in value
+            for name, value in scope.get("headers", ())
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                market_snapshot.stop()
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.stream_executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise _Disconnected()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def _http(self, scope, receive, send):
+        try:
+            body = await self._read_body(receive)
+        except _Disconnected:
+            return
+        if body is None:
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"text/plain")]})
+            await send({"type": "http.response.body", "body": b"Request body too large"})
+            return
+
+        loop = asyncio.get_running_loop()
+        disconnected = threading.Event()
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            executor = self.stream_executor if self._is_stream(scope) else self.executor
+            await loop.run_in_executor(
+                executor, self._run, _environ(scope, body), send, loop, disconnected,
+            )
+        finally:
+            watcher.cancel()
+
+    def _run(self, environ, send, loop, disconnected):
+        """Call the WSGI app on a pool thread, forwarding output to the loop"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get("started"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+            return lambda data: forward(data, True)
+
+        def emit(message):
+            try:
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+            except Exception:
+                # The server refuses sends once the client is gone
+                disconnected.set()
+                raise _Disconnected()
+
+        def forward(chunk, more_body):
+            if disconnected.is_set():
+                raise _Disconnected()
+            if not response.get("started"):
+                response["started"] = True
+                emit({"type": "http.response.start", "status": response["status"],
+                      "headers": response["headers"]})
+            if chunk or not more_body:
+                emit({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                forward(chunk, True)
+            forward(b"", False)
+        except _Disconnected:
+            pass
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+
+
+app = WSGIAdapter(flask_app)
@@ -0,0 +1,69 @@
+"""Chunked, concurrent fan-out for Groww's batch LTP/OHLC endpoints."""
+from concurrent.futures import ThreadPoolExecutor
+
+
+def chunked(items, size):
+    """Split a sequence into consecutive tuples of at most `size` items"""
+    items = tuple(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class BatchFetcher:
+    """Runs LTP and OHLC chunk requests side by side on a bounded thread pool.
+
+    A failed chunk is reported in `errors` and simply missing from the merged
+    data, so one bad chunk never blanks the symbols from the others.
+    """
+
+    def __init__(self, chunk_size=50, max_workers=8):
+        self.chunk_size = chunk_size
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="groww-batch",
+        )
+
+    def fetch(self, client, symbols, segment=None):
+        """Return (ltp_data, ohlc_data, errors) for exchange_trading_symbols"""
+        segment = segment or client.SEGMENT_CASH
+        jobs = []
+        for chunk in chunked(symbols, self.chunk_size):
+            for method in ("get_ltp", "get_ohlc"):
+                future = self.executor.submit(
+                    getattr(client, method),
+                    segment=segment,
+                    exchange_trading_symbols=chunk,
+                )
+                jobs.append((method, chunk, future))
+
+        ltp_data = {}
+        ohlc_data = {}
+        errors = []
+        for method, chunk, future in jobs:
+            try:
+                data = future.result() or {}
+            except Exception as e:
+                errors.append({"method": method, "symbols": list(chunk), "error": str(e)})
+                continue
+            if method == "get_ltp":
+                ltp_data.update(data)
+            else:
+                ohlc_data.update(data)
+
+        return ltp_data, ohlc_data, errors
+
+
+def fan_out(executor, fn, items):
+    """Run fn(item) for every item on `executor`.
+
+    Returns ({item: result}, {item: error message}); the executor's size is
+    the concurrency cap.
+    """
+    futures = [(item, executor.submit(fn, item)) for item in items]
+    results = {}
+    errors = {}
+    for item, future in futures:
+        try:
+            results[item] = future.result()
+        except Exception as e:
+            errors[item] = str(e)
+    return results, errors
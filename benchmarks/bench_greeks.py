@@ -0,0 +1,116 @@
+"""Benchmark the local Greeks/IV engine on whole option chains.
+
+Builds synthetic chains priced with known vols (a smile around ATM), then
+reports per-chain latency and how closely IV and Greeks are recovered.
+With --upstream, a handful of legs from a real chain are also compared
+against groww.get_greeks (needs working credentials in .env).
+
+    python benchmarks/bench_greeks.py [--strikes 100] [--upstream NIFTY --expiry 2026-10-30]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greeks import bs_greeks, bs_price, chain_greeks, leg_symbols, time_to_expiry  # noqa: E402
+
+RATE = 0.065
+
+
+def make_chain(spot, strikes, step, expiry):
+    t = time_to_expiry(expiry)
+    ks = spot - (strikes // 2) * step + np.arange(strikes) * step
+    vols = 0.13 + 0.6 * (ks / spot - 1) ** 2
+    calls = bs_price(spot, ks, t, RATE, vols, True)
+    puts = bs_price(spot, ks, t, RATE, vols, False)
+    chain = {"underlying_ltp": spot, "strikes": {}}
+    for k, c, p in zip(ks, calls, puts):
+        chain["strikes"][str(int(k))] = {
+            "CE": {"trading_symbol": f"SIM{int(k)}CE", "ltp": float(c)},
+            "PE": {"trading_symbol": f"SIM{int(k)}PE", "ltp": float(p)},
+        }
+    return chain, ks, vols, t
+
+
+def bench_local(args):
+    expiry = date.today() + timedelta(days=args.days)
+    chain, ks, vols, t = make_chain(args.spot, args.strikes, args.step, expiry)
+
+    chain_greeks(chain, args.spot, expiry, RATE)   # warm up
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result = chain_greeks(chain, args.spot, expiry, RATE)
+    per_chain_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+    iv_errors, delta_errors = [], []
+    for side, is_call in (("CE", True), ("PE", False)):
+        expected = bs_greeks(args.spot, ks, t, RATE, vols, is_call)
+        time_value = np.minimum(bs_price(args.spot, ks, t, RATE, vols, True),
+                                bs_price(args.spot, ks, t, RATE, vols, False))
+        for i, k in enumerate(ks):
+            got = result[str(int(k))][side]
+            # Legs with no time value left can't carry a meaningful IV
+            if got["iv"] is None or time_value[i] < 0.05:
+                continue
+            iv_errors.append(abs(got["iv"] / 100 - vols[i]))
+            delta_errors.append(abs(got["delta"] - expected["delta"][i]))
+
+    legs = 2 * args.strikes
+    print(f"strikes={args.strikes} legs={legs} days={args.days}")
+    print(f"per-chain latency: {per_chain_ms:.2f} ms ({per_chain_ms * 1000 / legs:.1f} us/leg)")
+    print(f"IV abs error:    max={max(iv_errors):.2e} mean={np.mean(iv_errors):.2e} over {len(iv_errors)} legs")
+    print(f"delta abs error: max={max(delta_errors):.2e}")
+
+
+def compare_upstream(args):
+    import app
+
+    chain = app.groww.get_option_chain(
+        exchange="NSE", underlying=args.upstream, expiry_date=args.expiry
+    )
+    spot = app._underlying_spot("NSE", args.upstream, chain)
+    start = time.perf_counter()
+    local = chain_greeks(chain, spot, args.expiry, RATE)
+    local_ms = (time.perf_counter() - start) * 1000
+    print(f"{args.upstream} {args.expiry}: local chain in {local_ms:.2f} ms")
+
+    legs = list(leg_symbols(chain).items())
+    legs = legs[len(legs) // 2 - args.sample // 2:][:args.sample]
+    upstream_s = 0.0
+    print(f"{'symbol':<24} {'iv local':>9} {'iv groww':>9} {'delta local':>12} {'delta groww':>12}")
+    for symbol, (strike, side) in legs:
+        start = time.perf_counter()
+        remote = app.groww.get_greeks(
+            exchange="NSE", underlying=args.upstream, trading_symbol=symbol, expiry=args.expiry
+        ) or {}
+        upstream_s += time.perf_counter() - start
+        mine = local.get(strike, {}).get(side) or {}
+        print(f"{symbol:<24} {mine.get('iv')!s:>9} {remote.get('iv')!s:>9} "
+              f"{mine.get('delta')!s:>12} {remote.get('delta')!s:>12}")
+    print(f"upstream: {upstream_s / max(len(legs), 1) * 1000:.1f} ms per leg")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--strikes", type=int, default=100)
+    parser.add_argument("--step", type=float, default=50)
+    parser.add_argument("--spot", type=float, default=24000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--upstream", help="underlying to compare against groww.get_greeks")
+    parser.add_argument("--expiry", help="expiry (YYYY-MM-DD) for --upstream")
+    parser.add_argument("--sample", type=int, default=10)
+    args = parser.parse_args()
+
+    bench_local(args)
+    if args.upstream:
+        compare_upstream(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Per-route load test of app.py against the simulated upstream.
+
+Boots the real app under gunicorn with GROWW_BACKEND=sim, injects
+--latency per GrowwAPI method ("get_candles=200,*=30", milliseconds), then
+drives each route for --duration seconds at --concurrency keep-alive
+clients. For every route it reports throughput, p50/p95/p99 latency,
+upstream calls per request (from the app's own /metrics, so every worker
+is counted) and bytes per response. The report is JSON; save one per
+commit with --output and diff two with --compare.
+
+Response sizes come from --payload (small, realistic or large), which sets
+the rows per popular-stocks page (--symbols), instruments per /api/quotes
+batch (--quote-batch), the simulator's option-chain strikes per side
+(--strikes) and the /api/historical range (--history-days, --interval).
+Any of those flags overrides its preset value. Quote batches draw on the
+app's instrument master (set INSTRUMENTS_CSV for the full one), padded
+with synthetic symbols the simulator prices like any other. Popular-stocks
+pages can't outgrow the app's popular list, so the report also records the
+sizes the run actually got under "effective".
+
+    python benchmarks/bench_routes.py [--routes popular-stocks,search]
+        [--workers 2] [--server sync|asgi] [--concurrency 16] [--duration 10]
+        [--latency 30] [--payload realistic] [--symbols 50] [--quote-batch 25]
+        [--strikes 40] [--history-days 30] [--interval 5minute]
+        [--output after.json] [--compare before.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYMBOLS = ["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "SBIN", "ITC", "LT"]
+SEARCH_TERMS = ["REL", "TATA", "BANK", "INF", "HDFC", "SUN", "MAR", "ADANI"]
+UNDERLYINGS = ["NIFTY", "BANKNIFTY", "FINNIFTY"]
+
+# Per-route payload sizes; "realistic" is what the frontend asks for
+PAYLOADS = {
+    "small": {"symbols": 10, "quote_batch": 5, "strikes": 10, "history_days": 5, "interval": "15minute"},
+    "realistic": {"symbols": 50, "quote_batch": 25, "strikes": 40, "history_days": 30, "interval": "5minute"},
+    "large": {"symbols": 100, "quote_batch": 100, "strikes": 100, "history_days": 90, "interval": "1minute"},
+}
+
+
+def _quote_batch(universe, size, n):
+    """`size` comma-separated symbols, a different window of the universe per n"""
+    start = n * size % len(universe)
+    return ",".join((universe + universe)[start:start + min(size, len(universe))])
+
+
+def _route_paths(args, universe=SYMBOLS):
+    """{route: callable(n) -> request path}; n varies the request per client"""
+    to_date = date.today()
+    from_date = to_date - timedelta(days=args.history_days)
+    return {
+        "popular-stocks": lambda n: f"/api/popular-stocks?limit={args.symbols}",
+        "indices": lambda n: "/api/indices",
+        "quotes": lambda n: f"/api/quotes?symbols={_quote_batch(universe, args.quote_batch, n)}",
+        "chart-data": lambda n: f"/api/chart-data?symbol={SYMBOLS[n % len(SYMBOLS)]}&interval=1M",
+        "historical": lambda n: (
+            f"/api/historical?symbol={SYMBOLS[n % len(SYMBOLS)]}&interval={args.interval}"
+            f"&from_date={from_date}&to_date={to_date}"
+        ),
+        "search": lambda n: f"/api/search?q={SEARCH_TERMS[n % len(SEARCH_TERMS)]}",
+        "option-chain": lambda n: f"/api/option-chain?underlying={UNDERLYINGS[n % len(UNDERLYINGS)]}",
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _start_server(args, port, state_dir):
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        GROWW_BACKEND="sim",
+        GROWW_SIM_LATENCY_MS=args.latency,
+        GROWW_SIM_JITTER_MS=args.jitter,
+        GROWW_SIM_STRIKES=str(args.strikes),
+        # Fresh caches per run so results don't depend on earlier runs
+        SHARED_CACHE_PATH=os.path.join(state_dir, "shared_cache.sqlite3"),
+        CANDLE_STORE_PATH=os.path.join(state_dir, "candles.sqlite3"),
+        GROWW_GUARD_PATH=os.path.join(state_dir, "guard.sqlite3"),
+        METRICS_DIR=os.path.join(state_dir, "metrics"),
+        METRICS_FLUSH_INTERVAL="0.2",
+    )
+    if not args.keep_rate_limits:
+        # The stub has no quota; measure the app, not the limiter
+        env.update(GROWW_RATE_LIMITS="*=1000000", GROWW_RATE_LIMIT_DEFAULT="1000000")
+    cmd = [sys.executable, "-m", "gunicorn", "asgi:app" if args.server == "asgi" else "app:app",
+           "--workers", str(args.workers), "--bind", f"127.0.0.1:{port}", "--log-level", "warning"]
+    if args.server == "asgi":
+        cmd += ["--worker-class", "uvicorn.workers.UvicornWorker"]
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not come up on port {port}")
+
+
+def _get_json(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    body = response.read()
+    conn.close()
+    return json.loads(body) if response.status == 200 else {}
+
+
+def _universe(port, size):
+    """`size` symbols for quote batches: the app's popular stocks, padded
+    with synthetic ones (the simulator quotes any symbol)"""
+    listed = [row["symbol"] for row in _get_json(port, f"/api/popular-stocks?limit={size}").get("data") or []]
+    symbols = list(dict.fromkeys(listed or SYMBOLS))
+    symbols += [f"SIMSTOCK{i:05d}" for i in range(size - len(symbols))]
+    return symbols
+
+
+def _effective_sizes(port, args):
+    """Payload sizes the app actually serves for the requested ones"""
+    page = _get_json(port, f"/api/popular-stocks?limit={args.symbols}")
+    return {
+        "symbols": len(page.get("data") or []),
+        "symbols_available": page.get("total"),
+        "quote_batch": args.quote_batch,
+    }
+
+
+def _upstream_calls(port):
+    """{method: calls} summed over every worker, from /metrics"""
+    time.sleep(0.5)     # let every worker flush its counters
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/metrics")
+    text = conn.getresponse().read().decode("utf-8")
+    conn.close()
+    calls = {}
+    for method, value in re.findall(
+        r'^groww_upstream_duration_seconds_count\{method="([^"]+)"[^}]*\} (\S+)$', text, re.M
+    ):
+        calls[method] = calls.get(method, 0) + int(float(value))
+    return calls
+
+
+def _client(port, path_for, stop_at, samples, index):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    n = index
+    while time.time() < stop_at:
+        path = path_for(n)
+        n += 1
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            samples.append((None, "connection", 0))
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            continue
+        samples.append((time.perf_counter() - started, response.status, len(body)))
+    conn.close()
+
+
+def _drive(port, path_for, concurrency, duration):
+    samples = []
+    stop_at = time.time() + duration
+    threads = [
+        threading.Thread(target=_client, args=(port, path_for, stop_at, samples, i), daemon=True)
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bench_route(port, route, path_for, args):
+    if args.warmup > 0:
+        _drive(port, path_for, args.concurrency, args.warmup)
+    before = _upstream_calls(port)
+    samples, elapsed = _drive(port, path_for, args.concurrency, args.duration)
+    after = _upstream_calls(port)
+
+    ok = [s for s in samples if s[1] == 200]
+    latencies = [s[0] for s in ok]
+    upstream = {m: after.get(m, 0) - before.get(m, 0) for m in after if after.get(m, 0) > before.get(m, 0)}
+    failures = {}
+    for _, status, _ in samples:
+        if status != 200:
+            failures[str(status)] = failures.get(str(status), 0) + 1
+    result = {
+        "route": route,
+        "requests": len(ok),
+        "failures": failures,
+        "throughput_rps": round(len(ok) / elapsed, 1),
+        "p50_ms": None,
+        "p95_ms": None,
+        "p99_ms": None,
+        "bytes_per_response": round(sum(s[2] for s in ok) / len(ok)) if ok else None,
+        # Includes background work (e.g. snapshot refreshes) during the window
+        "upstream_calls": upstream,
+        "upstream_calls_per_request": round(sum(upstream.values()) / len(ok), 3) if ok else None,
+    }
+    if latencies:
+        for q in (50, 95, 99):
+            result[f"p{q}_ms"] = round(_percentile(latencies, q / 100) * 1000, 2)
+    return result
+
+
+def compare(baseline, report):
+    """Print per-route changes against an earlier report"""
+    old = {r["route"]: r for r in baseline["routes"]}
+    print(f"# vs {baseline.get('revision') or 'baseline'} -> {report.get('revision') or 'current'}",
+          file=sys.stderr)
+    for result in report["routes"]:
+        before = old.get(result["route"])
+        if before is None:
+            continue
+        changes = []
+        for key in ("throughput_rps", "p95_ms", "bytes_per_response", "upstream_calls_per_request"):
+            a, b = before.get(key), result.get(key)
+            if a and b is not None:
+                changes.append(f"{key} {a} -> {b} ({(b - a) / a * 100:+.1f}%)")
+        print(f"{result['route']}: " + ", ".join(changes), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--routes",
+                        default="popular-stocks,indices,quotes,chart-data,historical,search,option-chain")
+    parser.add_argument("--server", choices=("sync", "asgi"), default="sync")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--latency", default="30", help="upstream ms, e.g. 'get_candles=200,*=30'")
+    parser.add_argument("--jitter", default="0", help="upstream latency jitter ms, same format")
+    parser.add_argument("--payload", choices=sorted(PAYLOADS), default="realistic",
+                        help="preset for the size flags below")
+    parser.add_argument("--symbols", type=int, help="rows per /api/popular-stocks page")
+    parser.add_argument("--quote-batch", type=int, help="instruments per /api/quotes request")
+    parser.add_argument("--strikes", type=int, help="option chain strikes per side")
+    parser.add_argument("--history-days", type=int, help="/api/historical range")
+    parser.add_argument("--interval", help="/api/historical candle interval")
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    args = parser.parse_args()
+    for key, value in PAYLOADS[args.payload].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+
+    paths = _route_paths(args)
+    routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    unknown = [route for route in routes if route not in paths]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)} (choose from {', '.join(paths)})")
+
+    state_dir = tempfile.mkdtemp(prefix="bench_routes_")
+    port = _free_port()
+    server = _start_server(args, port, state_dir)
+    try:
+        effective = _effective_sizes(port, args)
+        if "popular-stocks" in routes and effective["symbols"] < args.symbols:
+            print(f"# popular-stocks pages hold {effective['symbols']} rows, not {args.symbols}: "
+                  f"the app lists {effective['symbols_available']} popular stocks", file=sys.stderr)
+        if "quotes" in routes:
+            paths = _route_paths(args, _universe(port, max(args.quote_batch * 4, len(SYMBOLS))))
+        results = [bench_route(port, route, paths[route], args) for route in routes]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    report = {
+        "revision": _git_revision(),
+        "timestamp": int(time.time()),
+        "config": {
+            key: getattr(args, key) for key in (
+                "server", "workers", "concurrency", "duration", "warmup",
+                "latency", "jitter", "payload", "symbols", "quote_batch", "strikes",
+                "history_days", "interval", "keep_rate_limits",
+            )
+        },
+        "effective": effective,
+        "routes": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark /api/search's index against a linear scan at 100k instruments.
+
+    python benchmarks/bench_search.py [--instruments 100000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrument_search import SearchIndex  # noqa: E402
+
+SECTORS = ["Banking", "IT", "Pharma", "Auto", "FMCG", "Metals", "Power", "Finance"]
+WORDS = [
+    "TATA", "BHARAT", "INDIA", "POWER", "STEEL", "BANK", "FINANCE", "PHARMA",
+    "MOTORS", "CEMENT", "ENERGY", "CAPITAL", "HOLDINGS", "INDUSTRIES", "LABS",
+    "TECH", "INFRA", "CHEMICALS", "TEXTILES", "FOODS", "RETAIL", "AGRO",
+]
+
+
+def make_instruments(n, seed=7):
+    rng = random.Random(seed)
+    instruments = []
+    seen = set()
+    while len(instruments) < n:
+        symbol = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 10)))
+        exchange = rng.choice(("NSE", "BSE"))
+        if (symbol, exchange) in seen:
+            continue
+        seen.add((symbol, exchange))
+        name = " ".join(rng.choices(WORDS, k=rng.randint(1, 3))).title()
+        instruments.append({
+            "symbol": symbol,
+            "exchange": exchange,
+            "name": name,
+            "sector": rng.choice(SECTORS),
+        })
+    return instruments
+
+
+def linear_search(instruments, query, limit=20):
+    query = query.upper()
+    results = []
+    for item in instruments:
+        if query in item["symbol"] or query in item["name"].upper():
+            results.append(item)
+    return results[:limit]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--instruments", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    instruments = make_instruments(args.instruments)
+    start = time.perf_counter()
+    index = SearchIndex(instruments)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"instruments={len(index)} build={build_ms:.0f}ms")
+
+    sample = instruments[len(instruments) // 2]["symbol"]
+    queries = [
+        ("exact", sample),
+        ("prefix", sample[:3]),
+        ("two-char", "TA"),
+        ("name", "STEEL"),
+        ("rare", "ZQXJ"),
+        ("filtered", "BANK"),
+    ]
+    print(f"{'query':<10} {'q':<12} {'index us':>10} {'scan us':>10} {'hits':>5}")
+    for label, query in queries:
+        kwargs = {"sector": "Pharma", "exchange": "BSE"} if label == "filtered" else {}
+        index_us = timed(lambda: index.search(query, **kwargs), args.repeat)
+        scan_us = timed(lambda: linear_search(instruments, query), max(args.repeat // 200, 3))
+        hits = len(index.search(query, **kwargs))
+        print(f"{label:<10} {query:<12} {index_us:>10.1f} {scan_us:>10.1f} {hits:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Load test: gunicorn sync workers (app:app) vs the ASGI entry point (asgi:app).
+
+Both servers run the real app against a stub GrowwAPI that sleeps
+--upstream-delay seconds per call, then are driven with --concurrency
+keep-alive clients hitting /api/quote. Every request asks for a symbol
+nobody asked for before, so each one misses the quote caches and waits on
+the stub. The ASGI ceiling is QUOTE_MAX_CONCURRENCY upstream calls per
+worker at a time. Prints one JSON report per mode.
+
+    python benchmarks/bench_serving.py [--workers 2] [--concurrency 200]
+        [--upstream-delay 0.2] [--duration 10] [--modes sync,asgi]
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class SlowGroww:
+    """Just enough of GrowwAPI for /api/quote, with a fixed latency per call"""
+    SEGMENT_CASH = "CASH"
+    EXCHANGE_NSE = "NSE"
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get_quote(self, exchange, segment, trading_symbol, timeout=None):
+        time.sleep(self.delay)
+        return {"trading_symbol": trading_symbol, "last_price": 100.0, "exchange": exchange}
+
+
+def _stubbed_app():
+    # An empty token keeps app.py from building a real client at import
+    os.environ["GROWW_API_TOKEN"] = ""
+    import app as app_module
+    app_module.groww = SlowGroww(float(os.environ.get("BENCH_UPSTREAM_DELAY", "0.2")))
+    # The stub stands in for Groww, so the no-credentials 503 gate is off
+    app_module.UPSTREAM_CONFIGURED = True
+    return app_module
+
+
+def __getattr__(name):
+    # Entry points for the servers started below; built on first access so
+    # running this file as a script doesn't import the app
+    if name == "wsgi_app":
+        return _stubbed_app().app
+    if name == "asgi_app":
+        _stubbed_app()
+        import asgi
+        return asgi.app
+    raise AttributeError(name)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(mode, port, workers, delay, state_dir):
+    env = dict(
+        os.environ,
+        BENCH_UPSTREAM_DELAY=str(delay),
+        PYTHONPATH=ROOT,
+        # Stub quotes must not land in the host's real caches
+        SHARED_CACHE_PATH=os.path.join(state_dir, "shared_cache.sqlite3"),
+        CANDLE_STORE_PATH=os.path.join(state_dir, "candles.sqlite3"),
+        GROWW_GUARD_PATH=os.path.join(state_dir, "guard.sqlite3"),
+        METRICS_DIR=os.path.join(state_dir, "metrics"),
+    )
+    bind = f"127.0.0.1:{port}"
+    if mode == "sync":
+        cmd = [sys.executable, "-m", "gunicorn", "benchmarks.bench_serving:wsgi_app",
+               "--workers", str(workers), "--bind", bind, "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "benchmarks.bench_serving:asgi_app",
+               "--workers", str(workers), "--bind", bind, "--log-level", "warning",
+               "--worker-class", "uvicorn.workers.UvicornWorker"]
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not come up on {bind}")
+
+
+def _client(port, stop_at, latencies, failures, index):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    n = index
+    while time.time() < stop_at:
+        # Unique per client and request: a cached quote would skip the upstream
+        symbol = f"BENCH{index}X{n}"
+        n += 1
+        started = time.perf_counter()
+        try:
+            conn.request("GET", f"/api/quote?symbol={symbol}")
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                failures.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            failures.append("connection")
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(mode, args):
+    port = _free_port()
+    state_dir = tempfile.mkdtemp(prefix="bench_serving_")
+    server = _start_server(mode, port, args.workers, args.upstream_delay, state_dir)
+    try:
+        latencies, failures = [], []
+        stop_at = time.time() + args.duration
+        threads = [
+            threading.Thread(target=_client, args=(port, stop_at, latencies, failures, i), daemon=True)
+            for i in range(args.concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    return {
+        "mode": mode,
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "upstream_delay_s": args.upstream_delay,
+        "requests": len(latencies),
+        "failures": len(failures),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        # Upper bound for sync workers: each one holds a request for a full upstream call
+        "sync_ceiling_rps": round(args.workers / args.upstream_delay, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--upstream-delay", type=float, default=0.2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--modes", default="sync,asgi")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        print(json.dumps(run(mode.strip(), args)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""On-disk SQLite candle store with incremental backfill from upstream."""
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    exchange TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume NUMERIC,
+    PRIMARY KEY (exchange, symbol, interval, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS series (
+    exchange TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    covered_from TEXT NOT NULL,
+    covered_to TEXT NOT NULL,
+    ts_unit TEXT NOT NULL DEFAULT 'ms',
+    rows INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (exchange, symbol, interval)
+);
+"""
+
+# Don't rewrite last_access on every read; once a minute is plenty for LRU
+ACCESS_RESOLUTION = 60
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _to_ms(timestamp):
+    """Normalize an upstream candle timestamp to epoch milliseconds"""
+    if isinstance(timestamp, str):
+        if not timestamp.lstrip("-").isdigit():
+            return int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+        timestamp = int(timestamp)
+    timestamp = int(timestamp)
+    # Epoch seconds are < 1e11 for the next few thousand years
+    return timestamp * 1000 if abs(timestamp) < 10 ** 11 else timestamp
+
+
+def _day_bounds_ms(from_day, to_day):
+    start = datetime.combine(from_day, datetime.min.time())
+    end = datetime.combine(to_day + timedelta(days=1), datetime.min.time())
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000) - 1
+
+
+class CandleStore:
+    """Candles keyed by (exchange, symbol, interval), covered by a date range.
+
+    Each series remembers the contiguous span of *closed* days it holds.
+    A request only goes upstream for days outside that span, plus today
+    (the still-open bar), and the rest is served from disk. SQLite in WAL
+    mode with a busy timeout lets every gunicorn worker share one file.
+    With a `calendar` (a MarketCalendar), today counts as closed once its
+    session has settled, or all day on weekends and holidays.
+    """
+
+    def __init__(self, path, max_rows=2_000_000, calendar=None):
+        self.path = path
+        self.max_rows = max_rows
+        self.calendar = calendar
+        self._local = threading.local()
+        self.upstream_fetches = 0
+        self.served_from_disk = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _last_closed(self):
+        if self.calendar is not None:
+            return self.calendar.closed_through()
+        return date.today() - timedelta(days=1)
+
+    def get_candles(self, exchange, symbol, interval, from_date, to_date, fetch):
+        """Return candles in [from_date, to_date] as upstream-shaped dicts.
+
+        `fetch(from_date, to_date)` is called (with 'YYYY-MM-DD' strings) only
+        for the ranges the store doesn't hold yet.
+        """
+        from_day, to_day = _to_date(from_date), _to_date(to_date)
+        if from_day > to_day:
+            from_day, to_day = to_day, from_day
+        key = (exchange, symbol, interval)
+        last_closed = self._last_closed()
+
+        conn = self._conn()
+        series = conn.execute(
+            "SELECT covered_from, covered_to, ts_unit, last_access FROM series "
+            "WHERE exchange=? AND symbol=? AND interval=?",
+            key,
+        ).fetchone()
+
+        ranges = []
+        if series is None:
+            ranges.append((from_day, to_day))
+        else:
+            covered_from, covered_to = _to_date(series[0]), _to_date(series[1])
+            span = (to_day - from_day).days
+            if from_day > covered_to + timedelta(days=span + 1) or \
+                    to_day < covered_from - timedelta(days=span + 1):
+                # Far outside what we hold: start this series over instead of
+                # backfilling a huge gap nobody asked for
+                self._drop(key)
+                series = None
+                ranges.append((from_day, to_day))
+            else:
+                if from_day < covered_from:
+                    ranges.append((from_day, covered_from - timedelta(days=1)))
+                if to_day > covered_to:
+                    ranges.append((covered_to + timedelta(days=1), to_day))
+
+        ts_unit = series[2] if series is not None else None
+        for start, end in ranges:
+            candles = fetch(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")) or []
+            self.upstream_fetches += 1
+            ts_unit = self._write(key, candles, start, min(end, last_closed), ts_unit)
+
+        if not ranges:
+            self.served_from_disk += 1
+            if time.time() - series[3] > ACCESS_RESOLUTION:
+                conn.execute(
+                    "UPDATE series SET last_access=? WHERE exchange=? AND symbol=? AND interval=?",
+                    (time.time(), *key),
+                )
+
+        start_ms, end_ms = _day_bounds_ms(from_day, to_day)
+        rows = conn.execute(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE exchange=? AND symbol=? AND interval=? AND ts BETWEEN ? AND ? "
+            "ORDER BY ts",
+            (*key, start_ms, end_ms),
+        ).fetchall()
+
+        divisor = 1000 if ts_unit == "s" else 1
+        return [
+            {
+                "timestamp": ts // divisor,
+                "open": o,
+                "high": h,
+                "low": l,
+                "close": c,
+                "volume": v,
+            }
+            for ts, o, h, l, c, v in rows
+        ]
+
+    def covering_intervals(self, exchange, symbol, from_date, to_date):
+        """Intervals already stored for this symbol whose closed days span the range"""
+        from_day = _to_date(from_date)
+        closed_to = min(_to_date(to_date), self._last_closed())
+        rows = self._conn().execute(
+            "SELECT interval, covered_from, covered_to FROM series WHERE exchange=? AND symbol=?",
+            (exchange, symbol),
+        ).fetchall()
+        return [
+            interval for interval, covered_from, covered_to in rows
+            if _to_date(covered_from) <= from_day and _to_date(covered_to) >= closed_to
+        ]
+
+    def _is_trading_day(self, day):
+        if self.calendar is not None:
+            return self.calendar.is_trading_day(day)
+        return day.weekday() < 5
+
+    def _covered_to(self, rows, start, closed_to):
+        """Last day a fetch of [start, closed_to] settles for good.
+
+        Only closed days count; today is re-fetched until it closes. An
+        upstream answer that stops short of the last trading day in the range
+        (empty or truncated) only covers the days it actually reached, so a
+        transient empty response isn't remembered as "no candles".
+        """
+        nothing = start - timedelta(days=1)
+        if closed_to < start:
+            return nothing
+        last_expected = closed_to
+        while last_expected >= start and not self._is_trading_day(last_expected):
+            last_expected -= timedelta(days=1)
+        if last_expected < start:
+            return closed_to        # no sessions in the range, nothing to miss
+        if not rows:
+            return nothing
+        last_present = datetime.fromtimestamp(max(row[3] for row in rows) / 1000).date()
+        if last_present >= last_expected:
+            return closed_to
+        return max(min(last_present, closed_to), nothing)
+
+    def _write(self, key, candles, start, closed_to, ts_unit):
+        """Upsert fetched candles and extend the series' covered range"""
+        rows = []
+        for candle in candles:
+            raw = candle.get("timestamp")
+            if raw is None:
+                continue
+            if ts_unit is None and not isinstance(raw, str):
+                ts_unit = "s" if abs(int(raw)) < 10 ** 11 else "ms"
+            rows.append((
+                *key,
+                _to_ms(raw),
+                candle.get("open"),
+                candle.get("high"),
+                candle.get("low"),
+                candle.get("close"),
+                candle.get("volume", 0),
+            ))
+        ts_unit = ts_unit or "ms"
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            count = conn.execute(
+                "SELECT COUNT(*) FROM candles WHERE exchange=? AND symbol=? AND interval=?",
+                key,
+            ).fetchone()[0]
+
+            existing = conn.execute(
+                "SELECT covered_from, covered_to FROM series "
+                "WHERE exchange=? AND symbol=? AND interval=?",
+                key,
+            ).fetchone()
+            covered_from, covered_to = start, self._covered_to(rows, start, closed_to)
+            if existing is not None:
+                existing_from, existing_to = _to_date(existing[0]), _to_date(existing[1])
+                if covered_to + timedelta(days=1) >= existing_from and \
+                        covered_from <= existing_to + timedelta(days=1) and covered_to >= covered_from:
+                    covered_from = min(covered_from, existing_from)
+                    covered_to = max(covered_to, existing_to)
+                else:
+                    # Nothing usable fetched, or it doesn't join up: keep
+                    # the span we had, the rest is fetched again next time
+                    covered_from, covered_to = existing_from, existing_to
+
+            conn.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, covered_from.isoformat(), covered_to.isoformat(), ts_unit, count, time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._evict()
+        return ts_unit
+
+    def _drop(self, key):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM candles WHERE exchange=? AND symbol=? AND interval=?", key)
+            conn.execute("DELETE FROM series WHERE exchange=? AND symbol=? AND interval=?", key)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self):
+        """Drop least-recently-used series until the store fits in max_rows"""
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(rows), 0) FROM series").fetchone()[0]
+        if total <= self.max_rows:
+            return
+
+        victims = conn.execute(
+            "SELECT exchange, symbol, interval, rows FROM series ORDER BY last_access"
+        ).fetchall()
+        for exchange, symbol, interval, rows in victims[:-1]:
+            self._drop((exchange, symbol, interval))
+            total -= rows
+            if total <= self.max_rows:
+                break
+
+    def stats(self):
+        conn = self._conn()
+        series, rows = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM series"
+        ).fetchone()
+        return {
+            "path": self.path,
+            "series": series,
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "upstream_fetches": self.upstream_fetches,
+            "served_from_disk": self.served_from_disk,
+        }
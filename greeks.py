@@ -0,0 +1,209 @@
+"""Vectorized Black-Scholes Greeks and implied volatility for whole option chains."""
+from datetime import datetime, time as dtime
+
+import numpy as np
+
+from market_calendar import IST
+from option_chain_cache import strike_items
+
+EXPIRY_CLOSE = dtime(15, 30)
+YEAR_SECONDS = 365 * 24 * 3600
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+IV_MIN = 1e-4
+IV_MAX = 5.0
+
+
+def _erfc(x):
+    """Complementary error function (Numerical Recipes erfcc), vectorized.
+
+    Fractional error < 1.2e-7 everywhere, including the tails, which is what
+    keeps far OTM prices (and their implied vols) accurate.
+    """
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    ans = t * np.exp(poly)
+    return np.where(x >= 0, ans, 2.0 - ans)
+
+
+def norm_cdf(x):
+    return 0.5 * _erfc(-x / np.sqrt(2.0))
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def _d1_d2(spot, strike, t, rate, vol):
+    vol_t = vol * np.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * vol * vol) * t) / vol_t
+    return d1, d1 - vol_t
+
+
+def bs_price(spot, strike, t, rate, vol, is_call):
+    d1, d2 = _d1_d2(spot, strike, t, rate, vol)
+    discount = np.exp(-rate * t)
+    call = spot * norm_cdf(d1) - strike * discount * norm_cdf(d2)
+    put = strike * discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_greeks(spot, strike, t, rate, vol, is_call):
+    """Delta, gamma, theta (per calendar day), vega and rho (per 1%)"""
+    d1, d2 = _d1_d2(spot, strike, t, rate, vol)
+    discount = np.exp(-rate * t)
+    pdf = norm_pdf(d1)
+    sqrt_t = np.sqrt(t)
+
+    delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+    gamma = pdf / (spot * vol * sqrt_t)
+    decay = -spot * pdf * vol / (2 * sqrt_t)
+    theta = np.where(
+        is_call,
+        decay - rate * strike * discount * norm_cdf(d2),
+        decay + rate * strike * discount * norm_cdf(-d2),
+    ) / 365.0
+    vega = spot * pdf * sqrt_t / 100.0
+    rho = np.where(
+        is_call,
+        strike * t * discount * norm_cdf(d2),
+        -strike * t * discount * norm_cdf(-d2),
+    ) / 100.0
+    return {"delta": delta, "gamma": gamma, "theta": theta, "vega": vega, "rho": rho}
+
+
+def implied_vol(price, spot, strike, t, rate, is_call, tol=1e-6, max_iter=50):
+    """Solve for volatility on every option at once.
+
+    Newton steps, safeguarded by a bracket that shrinks every iteration: a
+    step that leaves the bracket (or has a vanishing vega) falls back to
+    bisection, Brent-style. ITM options are solved through their OTM
+    put-call-parity twin, whose price is almost all time value and so pins
+    the vol down far better. Prices outside no-arbitrage bounds give NaN.
+    """
+    price, spot, strike, t = np.broadcast_arrays(
+        np.asarray(price, float), np.asarray(spot, float),
+        np.asarray(strike, float), np.asarray(t, float),
+    )
+    is_call = np.broadcast_to(is_call, price.shape)
+    discount = np.exp(-rate * t)
+    intrinsic = np.where(is_call, np.maximum(spot - strike * discount, 0), np.maximum(strike * discount - spot, 0))
+    upper = np.where(is_call, spot, strike * discount)
+    valid = (price > intrinsic) & (price < upper) & (t > 0) & (spot > 0) & (strike > 0)
+
+    forward_gap = spot - strike * discount
+    itm = np.where(is_call, forward_gap > 0, forward_gap < 0)
+    price = np.where(itm, np.where(is_call, price - forward_gap, price + forward_gap), price)
+    is_call = np.where(itm, ~is_call, is_call)
+
+    lo = np.full(price.shape, IV_MIN)
+    hi = np.full(price.shape, IV_MAX)
+    vol = np.full(price.shape, 0.3)
+    done = ~valid
+
+    for _ in range(max_iter):
+        if done.all():
+            break
+        model = bs_price(spot, strike, t, rate, vol, is_call)
+        diff = model - price
+        converged = np.abs(diff) < tol * np.maximum(price, 1e-8)
+        done = done | converged
+
+        too_high = diff > 0
+        hi = np.where(too_high & ~done, vol, hi)
+        lo = np.where(~too_high & ~done, vol, lo)
+
+        d1, _ = _d1_d2(spot, strike, t, rate, vol)
+        vega = spot * norm_pdf(d1) * np.sqrt(t)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = vol - diff / vega
+        bisect = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        vol = np.where(done, vol, np.where(bisect, 0.5 * (lo + hi), step))
+
+    return np.where(valid, vol, np.nan)
+
+
+def time_to_expiry(expiry_date, now=None):
+    """Years until 15:30 IST on the expiry date"""
+    if isinstance(expiry_date, str):
+        expiry_date = datetime.strptime(expiry_date[:10], "%Y-%m-%d").date()
+    expiry = datetime.combine(expiry_date, EXPIRY_CLOSE, tzinfo=IST)
+    now = now or datetime.now(IST)
+    return max((expiry - now).total_seconds(), 0) / YEAR_SECONDS
+
+
+def _legs(strike_payload):
+    for side in ("CE", "PE"):
+        leg = strike_payload.get(side) or strike_payload.get(side.lower())
+        if leg:
+            yield side, leg
+
+
+def chain_greeks(chain, spot, expiry_date, rate=0.065, now=None):
+    """IV + Greeks for every CE and PE in the chain in one vectorized pass.
+
+    Returns {strike: {"CE": {...}, "PE": {...}}}; legs without a usable LTP
+    (or an LTP outside arbitrage bounds) get None values.
+    """
+    t = time_to_expiry(expiry_date, now)
+    keys, sides, strikes, prices = [], [], [], []
+    for strike_key, payload in strike_items(chain):
+        for side, leg in _legs(payload):
+            keys.append(strike_key)
+            sides.append(side)
+            strikes.append(float(strike_key))
+            prices.append(float(leg.get("ltp") or 0))
+
+    result = {}
+    if not keys:
+        return result
+
+    strikes = np.array(strikes)
+    prices = np.array(prices)
+    is_call = np.array([side == "CE" for side in sides])
+
+    vol = implied_vol(prices, spot, strikes, t, rate, is_call)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        greeks = bs_greeks(spot, strikes, t, rate, vol, is_call)
+
+    columns = {name: values.tolist() for name, values in greeks.items()}
+    ivs = (vol * 100).tolist()
+    for i, (strike_key, side) in enumerate(zip(keys, sides)):
+        ok = ivs[i] == ivs[i]   # NaN check
+        result.setdefault(strike_key, {})[side] = {
+            "iv": round(ivs[i], 4) if ok else None,
+            **{name: (round(values[i], 6) if ok else None) for name, values in columns.items()},
+        }
+    return result
+
+
+def with_greeks(chain, greeks):
+    """Copy of `chain` with a "greeks" dict added to every CE/PE leg"""
+    def annotate(strike_key, payload):
+        payload = dict(payload)
+        for side, leg in _legs(payload):
+            key = side if side in payload else side.lower()
+            payload[key] = {**leg, "greeks": greeks.get(strike_key, {}).get(side)}
+        return payload
+
+    annotated = dict(chain)
+    strikes = chain.get("strikes") or {}
+    if isinstance(strikes, dict):
+        annotated["strikes"] = {k: annotate(k, v) for k, v in strikes.items()}
+    else:
+        annotated["strikes"] = [annotate(k, v) for k, v in strike_items(chain)]
+    return annotated
+
+
+def leg_symbols(chain):
+    """{trading_symbol: (strike, side)} for every leg in the chain"""
+    symbols = {}
+    for strike_key, payload in strike_items(chain):
+        for side, leg in _legs(payload):
+            symbol = leg.get("trading_symbol") or leg.get("symbol")
+            if symbol:
+                symbols[symbol] = (strike_key, side)
+    return symbols
@@ -0,0 +1,508 @@
+"""Technical indicators: vectorized over a full series, then O(1) per new bar."""
+import math
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+# name -> default parameters; "sma:50", "macd:12:26:9", "bb:20:2" override them
+DEFAULTS = {
+    "sma": (20,),
+    "ema": (20,),
+    "rsi": (14,),
+    "macd": (12, 26, 9),
+    "bb": (20, 2),
+    "vwap": (),
+}
+
+# EMAs are evaluated in blocks this long; within a block the recursion is a
+# closed form, and (1 - alpha) ** -EMA_BLOCK must stay finite
+EMA_BLOCK = 128
+
+NAN = float("nan")
+
+
+def parse_indicators(spec):
+    """'sma:20,ema:50,rsi,macd' -> ((name, params), ...) in request order"""
+    parsed = []
+    for item in filter(None, (part.strip().lower() for part in (spec or "").split(","))):
+        name, *args = item.split(":")
+        if name not in DEFAULTS:
+            raise ValueError(f"Unknown indicator: {name} (choose from {', '.join(DEFAULTS)})")
+        defaults = DEFAULTS[name]
+        if len(args) > len(defaults):
+            raise ValueError(f"{name} takes at most {len(defaults)} parameters")
+        try:
+            params = tuple(
+                (float(arg) if isinstance(default, float) or "." in arg else int(arg))
+                for arg, default in zip(args, defaults)
+            ) + defaults[len(args):]
+        except ValueError:
+            raise ValueError(f"Invalid parameters for {name}: {item}")
+        periods = params if name != "bb" else params[:1]
+        if any(p < 2 or p > 1000 for p in periods):
+            raise ValueError(f"{name} periods must be between 2 and 1000")
+        if name == "bb" and not 0 < params[1] <= 10:
+            raise ValueError("bb width must be between 0 and 10")
+        if (name, params) not in parsed:
+            parsed.append((name, params))
+    if not parsed:
+        raise ValueError("At least one indicator is required")
+    return tuple(parsed)
+
+
+def _label(name, params):
+    return "_".join([name, *(f"{p:g}" for p in params)])
+
+
+# ----- building blocks -----
+
+def _ema_blocks(values, alpha, start):
+    """EMA recursion e[i] = e[i-1] + alpha * (x[i] - e[i-1]) from e[-1] = start,
+    evaluated blockwise with NumPy instead of a Python loop per element"""
+    out = np.empty(len(values))
+    decay = 1.0 - alpha
+    powers = decay ** np.arange(1, EMA_BLOCK + 1)
+    inverse = decay ** -np.arange(EMA_BLOCK)
+    previous = start
+    for begin in range(0, len(values), EMA_BLOCK):
+        block = values[begin:begin + EMA_BLOCK]
+        m = len(block)
+        out[begin:begin + m] = (
+            powers[:m] * previous
+            + alpha * powers[:m] / decay * np.cumsum(block * inverse[:m])
+        )
+        previous = out[begin + m - 1]
+    return out
+
+
+class _EMA:
+    """EMA seeded with the SMA of its first `period` inputs"""
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = NAN
+
+    def batch(self, values):
+        out = np.full(len(values), NAN)
+        n = self.period
+        self.count = len(values)
+        if len(values) < n:
+            self.seed_sum = float(values.sum())
+            return out
+        out[n - 1] = values[:n].mean()
+        out[n:] = _ema_blocks(values[n:], self.alpha, out[n - 1])
+        self.value = float(out[-1])
+        return out
+
+    def update(self, x, commit):
+        count = self.count + 1
+        if count < self.period:
+            value, seed_sum = NAN, self.seed_sum + x
+        elif count == self.period:
+            value, seed_sum = (self.seed_sum + x) / self.period, self.seed_sum + x
+        else:
+            value, seed_sum = self.value + self.alpha * (x - self.value), self.seed_sum
+        if commit:
+            self.count, self.seed_sum, self.value = count, seed_sum, value
+        return value
+
+
+class _Window:
+    """Rolling mean / population std over the last `period` inputs.
+
+    Sums are kept relative to a fixed reference price so the running sum of
+    squares doesn't lose the variance to cancellation at index-level prices.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.values = deque(maxlen=period)
+        self.ref = 0.0
+        self.sum = 0.0
+        self.sumsq = 0.0
+
+    def batch(self, values, with_std=False):
+        n = self.period
+        mean = np.full(len(values), NAN)
+        std = np.full(len(values), NAN) if with_std else None
+        if len(values) >= n:
+            windows = np.lib.stride_tricks.sliding_window_view(values, n)
+            mean[n - 1:] = windows.mean(axis=1)
+            if with_std:
+                std[n - 1:] = windows.std(axis=1)
+        tail = values[-n:]
+        self.values.extend(tail.tolist())
+        self.ref = float(tail[-1]) if len(tail) else 0.0
+        shifted = tail - self.ref
+        self.sum = float(shifted.sum())
+        self.sumsq = float((shifted * shifted).sum())
+        return mean, std
+
+    def update(self, x, commit):
+        d = x - self.ref
+        total, squares = self.sum + d, self.sumsq + d * d
+        full = len(self.values) == self.period
+        if full:
+            old = self.values[0] - self.ref
+            total, squares = total - old, squares - old * old
+        count = len(self.values) + (0 if full else 1)
+        if commit:
+            self.values.append(x)
+            self.sum, self.sumsq = total, squares
+        if count < self.period:
+            return NAN, NAN
+        mean = total / count
+        return mean + self.ref, math.sqrt(max(squares / count - mean * mean, 0.0))
+
+
+# ----- indicators -----
+# Each has outputs (labels), batch(columns) -> {label: array} which also
+# leaves the state positioned after the last bar, and update(bar, commit)
+# -> {label: value} which advances it by one bar when commit is true.
+
+class SMA:
+    def __init__(self, period):
+        self.window = _Window(period)
+        self.outputs = (_label("sma", (period,)),)
+
+    def batch(self, columns):
+        return {self.outputs[0]: self.window.batch(columns["close"])[0]}
+
+    def update(self, bar, commit):
+        return {self.outputs[0]: self.window.update(bar["close"], commit)[0]}
+
+
+class EMA:
+    def __init__(self, period):
+        self.ema = _EMA(period)
+        self.outputs = (_label("ema", (period,)),)
+
+    def batch(self, columns):
+        return {self.outputs[0]: self.ema.batch(columns["close"])}
+
+    def update(self, bar, commit):
+        return {self.outputs[0]: self.ema.update(bar["close"], commit)}
+
+
+def _rsi(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0),
+                        100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+
+
+class RSI:
+    """Wilder's RSI: gains and losses smoothed with alpha = 1/period"""
+
+    def __init__(self, period):
+        self.gains = _EMA(period, alpha=1.0 / period)
+        self.losses = _EMA(period, alpha=1.0 / period)
+        self.previous = None
+        self.outputs = (_label("rsi", (period,)),)
+
+    def batch(self, columns):
+        close = columns["close"]
+        out = np.full(len(close), NAN)
+        if len(close):
+            change = np.diff(close)
+            gains = self.gains.batch(np.maximum(change, 0.0))
+            losses = self.losses.batch(np.maximum(-change, 0.0))
+            out[1:] = _rsi(gains, losses)
+            self.previous = float(close[-1])
+        return {self.outputs[0]: out}
+
+    def update(self, bar, commit):
+        close = bar["close"]
+        previous = self.previous
+        if commit:
+            self.previous = close
+        if previous is None:
+            return {self.outputs[0]: NAN}
+        change = close - previous
+        gain = self.gains.update(max(change, 0.0), commit)
+        loss = self.losses.update(max(-change, 0.0), commit)
+        return {self.outputs[0]: float(_rsi(np.float64(gain), np.float64(loss)))}
+
+
+class MACD:
+    def __init__(self, fast, slow, signal):
+        self.fast = _EMA(fast)
+        self.slow = _EMA(slow)
+        self.signal = _EMA(signal)
+        label = _label("macd", (fast, slow, signal))
+        self.outputs = (label, f"{label}_signal", f"{label}_hist")
+
+    def batch(self, columns):
+        close = columns["close"]
+        macd = self.fast.batch(close) - self.slow.batch(close)
+        signal = np.full(len(close), NAN)
+        start = max(self.fast.period, self.slow.period) - 1
+        if len(close) > start:
+            # The signal line starts once the MACD line exists
+            signal[start:] = self.signal.batch(macd[start:])
+        return dict(zip(self.outputs, (macd, signal, macd - signal)))
+
+    def update(self, bar, commit):
+        fast = self.fast.update(bar["close"], commit)
+        slow = self.slow.update(bar["close"], commit)
+        macd = fast - slow
+        signal = self.signal.update(macd, commit) if macd == macd else NAN
+        return dict(zip(self.outputs, (macd, signal, macd - signal)))
+
+
+class Bollinger:
+    def __init__(self, period, width):
+        self.window = _Window(period)
+        self.width = width
+        label = _label("bb", (period, width))
+        self.outputs = (f"{label}_mid", f"{label}_upper", f"{label}_lower")
+
+    def batch(self, columns):
+        mean, std = self.window.batch(columns["close"], with_std=True)
+        return dict(zip(self.outputs, (mean, mean + self.width * std, mean - self.width * std)))
+
+    def update(self, bar, commit):
+        mean, std = self.window.update(bar["close"], commit)
+        return dict(zip(self.outputs, (mean, mean + self.width * std, mean - self.width * std)))
+
+
+def _ist_day(ts):
+    return (int(ts) + 19800) // 86400
+
+
+class VWAP:
+    """Session VWAP on the typical price, restarting each IST trading day"""
+
+    def __init__(self):
+        self.day = None
+        self.pv = 0.0
+        self.volume = 0.0
+        self.outputs = ("vwap",)
+
+    def batch(self, columns):
+        ts = columns["timestamp"]
+        out = np.full(len(ts), NAN)
+        if len(ts):
+            typical = (columns["high"] + columns["low"] + columns["close"]) / 3.0
+            volume = columns["volume"]
+            days = (ts.astype(np.int64) + 19800) // 86400
+            starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+            pv = np.cumsum(typical * volume)
+            vol = np.cumsum(volume)
+            # Subtract each day's opening cumulative totals
+            offset = np.repeat(np.r_[0, starts[1:]], np.diff(np.r_[starts, len(ts)]))
+            pv_day = pv - np.r_[0.0, pv][offset]
+            vol_day = vol - np.r_[0.0, vol][offset]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out = np.where(vol_day > 0, pv_day / vol_day, NAN)
+            self.day = int(days[-1])
+            self.pv, self.volume = float(pv_day[-1]), float(vol_day[-1])
+        return {"vwap": out}
+
+    def update(self, bar, commit):
+        day = _ist_day(bar["timestamp"])
+        pv, volume = (self.pv, self.volume) if day == self.day else (0.0, 0.0)
+        typical = (bar["high"] + bar["low"] + bar["close"]) / 3.0
+        pv += typical * bar["volume"]
+        volume += bar["volume"]
+        if commit:
+            self.day, self.pv, self.volume = day, pv, volume
+        return {"vwap": pv / volume if volume > 0 else NAN}
+
+
+INDICATORS = {"sma": SMA, "ema": EMA, "rsi": RSI, "macd": MACD, "bb": Bollinger, "vwap": VWAP}
+
+
+def output_labels(spec):
+    return [label for name, params in spec for label in INDICATORS[name](*params).outputs]
+
+
+def compute(columns, spec):
+    """Indicator arrays over whole candle columns (no state kept)"""
+    result = {}
+    for name, params in spec:
+        result.update(INDICATORS[name](*params).batch(columns))
+    return result
+
+
+class IndicatorSeries:
+    """Indicator outputs for one (symbol, interval, spec), kept up to date
+    one bar at a time.
+
+    Everything up to `last_closed` is committed: its outputs are stored and
+    the indicators' state sits just after it. The still-forming last bar is
+    evaluated without committing, so each refresh costs O(1) per new bar
+    whatever the window length.
+    """
+
+    def __init__(self, spec, columns, start, interval_seconds, now, max_points):
+        self.spec = spec
+        self.interval_seconds = interval_seconds
+        self.max_points = max_points
+        self.indicators = [INDICATORS[name](*params) for name, params in spec]
+        self.labels = output_labels(spec)
+        self.start = start          # outputs cover every bar from here on
+
+        closed = self._closed_count(columns["timestamp"], now)
+        committed = {key: values[:closed] for key, values in columns.items()}
+        outputs = {}
+        for indicator in self.indicators:
+            outputs.update(indicator.batch(committed))
+        self.timestamps = committed["timestamp"].tolist()
+        self.outputs = {label: outputs[label].tolist() for label in self.labels}
+        self.last_closed = self.timestamps[-1] if self.timestamps else None
+        self.last_close = float(committed["close"][-1]) if closed else None
+        self.forming = self._preview(columns, closed)
+        self.batched_bars = closed
+        self.incremental_bars = 0
+
+    def _closed_count(self, timestamps, now):
+        n = len(timestamps)
+        if n and timestamps[-1] + self.interval_seconds > now:
+            return n - 1
+        return n
+
+    @staticmethod
+    def _bar(columns, i):
+        return {key: float(values[i]) for key, values in columns.items()}
+
+    def _preview(self, columns, closed):
+        """(timestamp, {label: value}) for an uncommitted forming bar"""
+        if closed >= len(columns["timestamp"]):
+            return None
+        bar = self._bar(columns, closed)
+        values = {}
+        for indicator in self.indicators:
+            values.update(indicator.update(bar, commit=False))
+        return int(bar["timestamp"]), values
+
+    def consistent_with(self, columns):
+        """Whether newly loaded candles continue this series (same bar at
+        the last committed timestamp); otherwise it has to be rebuilt"""
+        if self.last_closed is None:
+            return False
+        ts = columns["timestamp"]
+        i = int(np.searchsorted(ts, self.last_closed))
+        return i < len(ts) and int(ts[i]) == self.last_closed and float(columns["close"][i]) == self.last_close
+
+    def advance(self, columns, now):
+        """Commit bars after `last_closed` that have closed, preview the rest"""
+        ts = columns["timestamp"]
+        first = int(np.searchsorted(ts, self.last_closed, side="right"))
+        closed = self._closed_count(ts, now)
+        for i in range(first, closed):
+            bar = self._bar(columns, i)
+            values = {}
+            for indicator in self.indicators:
+                values.update(indicator.update(bar, commit=True))
+            self.timestamps.append(int(bar["timestamp"]))
+            for label in self.labels:
+                self.outputs[label].append(values[label])
+            self.last_closed = int(bar["timestamp"])
+            self.last_close = bar["close"]
+            self.incremental_bars += 1
+        self.forming = self._preview(columns, max(closed, first))
+        self._trim()
+
+    def _trim(self):
+        excess = len(self.timestamps) - self.max_points
+        if excess > self.max_points // 4:
+            del self.timestamps[:excess]
+            for values in self.outputs.values():
+                del values[:excess]
+            self.start = self.timestamps[0]
+
+    def window(self, since=None, start=None):
+        """Columns for timestamps > since (and >= start), forming bar last"""
+        timestamps = self.timestamps
+        lo = 0
+        if since is not None:
+            lo = int(np.searchsorted(timestamps, since, side="right"))
+        if start is not None:
+            lo = max(lo, int(np.searchsorted(timestamps, start)))
+        columns = {"timestamp": timestamps[lo:]}
+        for label in self.labels:
+            columns[label] = self.outputs[label][lo:]
+        if self.forming is not None and (since is None or self.forming[0] > since):
+            columns["timestamp"] = columns["timestamp"] + [self.forming[0]]
+            for label in self.labels:
+                columns[label] = columns[label] + [self.forming[1][label]]
+        # Not-yet-defined values (warm-up, no volume) go out as null
+        for label in self.labels:
+            columns[label] = [None if v != v else v for v in columns[label]]
+        return columns
+
+
+def _in_seconds(columns):
+    """Candle columns with epoch-second timestamps; the store hands back
+    milliseconds when that's what upstream sent"""
+    ts = columns["timestamp"]
+    if len(ts) and ts[-1] >= 10 ** 11:
+        columns = dict(columns, timestamp=ts // 1000)
+    return columns
+
+
+class IndicatorEngine:
+    """IndicatorSeries per (exchange, symbol, interval, spec), LRU-bounded"""
+
+    def __init__(self, max_series=512, max_points=20000):
+        self.max_series = max_series
+        self.max_points = max_points
+        self._series = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.updates = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def read(self, key, spec, interval_seconds, start, load, now, since=None):
+        """(columns, last_closed) for `key` from `start` (or after `since`).
+
+        The series is built from `load(from_ts)` on first use (or when it no
+        longer lines up with the candles) and afterwards advanced with only
+        the bars that arrived since. `load(from_ts)` returns candle columns
+        from that epoch second's day on, timestamped in seconds or ms.
+        """
+        with self._key_lock(key):
+            series = self._get(key, spec, interval_seconds, start, load, now)
+            return series.window(since=since, start=start), series.last_closed
+
+    def _get(self, key, spec, interval_seconds, start, load, now):
+        with self._lock:
+            series = self._series.get(key)
+            if series is not None:
+                self._series.move_to_end(key)
+
+        if series is not None and series.start <= start and series.last_closed is not None:
+            columns = _in_seconds(load(series.last_closed))
+            if series.consistent_with(columns):
+                series.advance(columns, now)
+                self.updates += 1
+                return series
+
+        series = IndicatorSeries(spec, _in_seconds(load(start)), start, interval_seconds, now, self.max_points)
+        self.builds += 1
+        with self._lock:
+            self._series[key] = series
+            while len(self._series) > self.max_series:
+                evicted, _ = self._series.popitem(last=False)
+                self._locks.pop(evicted, None)
+        return series
+
+    def stats(self):
+        with self._lock:
+            series = list(self._series.values())
+        return {
+            "series": len(series),
+            "builds": self.builds,
+            "updates": self.updates,
+            "batched_bars": sum(s.batched_bars for s in series),
+            "incremental_bars": sum(s.incremental_bars for s in series),
+        }
+
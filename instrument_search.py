@@ -0,0 +1,146 @@
+"""Prebuilt instrument search: symbol prefix trie + n-gram index on names."""
+from array import array
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _word_grams(text, n, cache):
+    """n-grams that don't cross a space; memoized per word since names share
+    most of their words ("LIMITED", "INDUSTRIES", ...)"""
+    grams = set()
+    for word in text.split():
+        word_grams = cache.get(word)
+        if word_grams is None:
+            word_grams = cache[word] = frozenset(_grams(word, n))
+        grams |= word_grams
+    return grams
+
+
+class SearchIndex:
+    """Ranked instrument lookup built once at startup.
+
+    Results are ordered exact symbol > symbol prefix > substring (symbol or
+    name). Inside a tier instruments come in a fixed (symbol length, symbol,
+    exchange) order, so the same query always returns the same list. Every
+    posting list is stored in that order, which lets a lookup stop as soon as
+    it has `limit` matches instead of collecting and sorting all of them.
+    """
+
+    def __init__(self, instruments):
+        # `instruments` is any sequence of instrument dicts (a list, or the
+        # InstrumentMaster, which builds each dict on demand); only the
+        # uppercased search text is kept, results are fetched from the source
+        self._source = instruments
+        keys = []
+        for position in range(len(instruments)):
+            item = instruments[position]
+            keys.append((item["symbol"].upper(), (item.get("name") or "").upper(), item["exchange"]))
+        self._order = array("I", sorted(
+            range(len(keys)),
+            key=lambda p: (len(keys[p][0]), keys[p][0], keys[p][2]),
+        ))
+        self._symbols = [keys[p][0] for p in self._order]
+        self._names = [keys[p][1] for p in self._order]
+        del keys
+        self._exact = {}
+        # Trie nodes are dicts of child char -> node; key None holds the ids of
+        # every symbol under that prefix
+        self._trie = {}
+        self._trigrams = {}
+        self._bigrams = {}
+        trigram_cache = {}
+        bigram_cache = {}
+
+        for i, (symbol, name) in enumerate(zip(self._symbols, self._names)):
+            self._exact.setdefault(symbol, []).append(i)
+
+            node = self._trie
+            for ch in symbol:
+                child = node.get(ch)
+                if child is None:
+                    child = node[ch] = {None: []}
+                child[None].append(i)
+                node = child
+
+            text = f"{symbol} {name}"
+            for gram in _word_grams(text, 3, trigram_cache):
+                self._trigrams.setdefault(gram, []).append(i)
+            for gram in _word_grams(text, 2, bigram_cache):
+                self._bigrams.setdefault(gram, []).append(i)
+
+        # Freeze posting lists into compact arrays
+        for postings in (self._trigrams, self._bigrams, self._exact):
+            for gram, ids in postings.items():
+                postings[gram] = array("I", ids)
+
+    def __len__(self):
+        return len(self._order)
+
+    def _item(self, i):
+        return self._source[self._order[i]]
+
+    def _prefix_ids(self, query):
+        node = self._trie
+        for ch in query:
+            node = node.get(ch)
+            if node is None:
+                return ()
+        return node[None]
+
+    def _substring_candidates(self, query):
+        """Smallest posting list among the query's n-grams (a superset of matches)"""
+        longest = max(len(word) for word in query.split())
+        if longest < 2:
+            return range(len(self._order))
+        postings, n = (self._trigrams, 3) if longest >= 3 else (self._bigrams, 2)
+        best = None
+        for gram in _word_grams(query, n, {}):
+            ids = postings.get(gram)
+            if ids is None:
+                return ()
+            if best is None or len(ids) < len(best):
+                best = ids
+        return best
+
+    def search(self, query, limit=20, sector=None, exchange=None):
+        """Return up to `limit` instrument dicts, best match first"""
+        query = query.strip().upper()
+        if not query or limit <= 0:
+            return []
+
+        def allowed(i):
+            if not (exchange or sector):
+                return True
+            item = self._item(i)
+            if exchange and item["exchange"] != exchange:
+                return False
+            if sector and item.get("sector") != sector:
+                return False
+            return True
+
+        seen = set()
+        results = []
+
+        def take(ids, verify=None):
+            for i in ids:
+                if i in seen or not allowed(i):
+                    continue
+                if verify is not None and not verify(i):
+                    continue
+                seen.add(i)
+                results.append(self._item(i))
+                if len(results) >= limit:
+                    return True
+            return False
+
+        if take(self._exact.get(query, ())):
+            return results
+        if take(self._prefix_ids(query)):
+            return results
+        take(
+            self._substring_candidates(query),
+            lambda i: query in self._symbols[i] or query in self._names[i],
+        )
+        return results
@@ -0,0 +1,333 @@
+"""Compact, columnar instrument master with an mmap-able on-disk cache."""
+import csv
+import hashlib
+import json
+import mmap
+import os
+from array import array
+
+MAGIC = b"GIMASTR1"
+STRING_COLUMNS = ("symbol", "name")
+CATEGORY_COLUMNS = ("exchange", "segment", "instrument_type", "sector")
+# Accepted CSV headers for each column, first match wins
+CSV_HEADERS = {
+    "symbol": ("trading_symbol", "symbol", "tradingsymbol"),
+    "name": ("name", "company_name"),
+    "exchange": ("exchange",),
+    "segment": ("segment",),
+    "instrument_type": ("instrument_type", "series"),
+    "sector": ("sector", "industry"),
+    "lot_size": ("lot_size",),
+}
+
+
+class _StringColumn:
+    """UTF-8 blob + offsets; decodes one value at a time"""
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def _encode_strings(values):
+    offsets = array("I", [0])
+    parts = []
+    total = 0
+    for value in values:
+        data = value.encode("utf-8")
+        parts.append(data)
+        total += len(data)
+        offsets.append(total)
+    return b"".join(parts), offsets
+
+
+def _group(codes, vocab_size):
+    """CSR-style group index: rows sorted by code plus per-code start offsets"""
+    counts = [0] * (vocab_size + 1)
+    for code in codes:
+        counts[code + 1] += 1
+    for i in range(vocab_size):
+        counts[i + 1] += counts[i]
+    offsets = array("I", counts)
+    rows = array("I", [0]) * len(codes)
+    cursor = list(counts[:-1])
+    for row, code in enumerate(codes):
+        rows[cursor[code]] = row
+        cursor[code] += 1
+    return rows, offsets
+
+
+class InstrumentMaster:
+    """The instrument universe stored column-wise instead of one dict per row.
+
+    Strings live in a single UTF-8 blob per column and low-cardinality fields
+    (exchange, segment, type, sector) are small integer codes, so a 100k row
+    master costs a few MB per worker. The same arrays can be written to a
+    cache file and mmapped back, making later startups near-instant and
+    letting workers share the pages through the OS page cache.
+    """
+
+    def __init__(self, strings, codes, vocab, lot_size, source=None):
+        self.strings = strings          # column -> _StringColumn
+        self.codes = codes              # column -> array('H')
+        self.vocab = vocab              # column -> [value, ...]
+        self.lot_size = lot_size
+        self.source = source or {}
+        self._code_of = {
+            column: {value: code for code, value in enumerate(values)}
+            for column, values in vocab.items()
+        }
+        self.key_order = None
+        self.groups = {}
+
+    # ----- building -----
+
+    @classmethod
+    def from_records(cls, records, sectors=None, source=None):
+        """Build from an iterable of dicts with symbol/name/exchange[/sector]"""
+        sectors = sectors or {}
+        columns = {column: [] for column in STRING_COLUMNS + CATEGORY_COLUMNS}
+        lot_size = array("i")
+        for record in records:
+            symbol = record["symbol"]
+            exchange = record.get("exchange", "NSE")
+            columns["symbol"].append(symbol)
+            columns["name"].append(record.get("name") or symbol)
+            columns["exchange"].append(exchange)
+            columns["segment"].append(record.get("segment") or "CASH")
+            columns["instrument_type"].append(record.get("instrument_type") or "EQ")
+            columns["sector"].append(
+                sectors.get(f"{exchange}_{symbol}") or record.get("sector") or ""
+            )
+            lot_size.append(int(float(record.get("lot_size") or 1)))
+
+        strings = {}
+        for column in STRING_COLUMNS:
+            blob, offsets = _encode_strings(columns[column])
+            strings[column] = _StringColumn(memoryview(blob), offsets)
+
+        codes = {}
+        vocab = {}
+        for column in CATEGORY_COLUMNS:
+            values = sorted(set(columns[column]))
+            lookup = {value: code for code, value in enumerate(values)}
+            vocab[column] = values
+            codes[column] = array("H", (lookup[value] for value in columns[column]))
+
+        master = cls(strings, codes, vocab, lot_size, source)
+        master._build_indexes()
+        return master
+
+    @classmethod
+    def from_csv(cls, path, sectors=None):
+        """Parse a broker instrument CSV (e.g. Groww's instrument.csv)"""
+        stat = os.stat(path)
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fields = set(reader.fieldnames or ())
+            mapping = {
+                column: next((h for h in headers if h in fields), None)
+                for column, headers in CSV_HEADERS.items()
+            }
+            if mapping["symbol"] is None or mapping["exchange"] is None:
+                raise ValueError(f"{path}: needs trading_symbol and exchange columns")
+
+            records = (
+                {
+                    column: row.get(header) if header else None
+                    for column, header in mapping.items()
+                }
+                for row in reader
+            )
+            return cls.from_records(
+                (r for r in records if r["symbol"]),
+                sectors=sectors,
+                source={"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime},
+            )
+
+    @classmethod
+    def load(cls, csv_path, cache_path=None, sectors=None):
+        """Load from the mmap cache when it matches the CSV, else parse + cache"""
+        cache_path = cache_path or csv_path + ".cache"
+        stat = os.stat(csv_path)
+        try:
+            master = cls.read_cache(cache_path)
+            source = master.source
+            if source.get("size") == stat.st_size and source.get("mtime") == stat.st_mtime \
+                    and source.get("sectors") == _sectors_digest(sectors):
+                return master
+        except (OSError, ValueError):
+            pass
+
+        master = cls.from_csv(csv_path, sectors=sectors)
+        master.source["sectors"] = _sectors_digest(sectors)
+        try:
+            master.write_cache(cache_path)
+        except OSError:
+            pass
+        return master
+
+    def _build_indexes(self):
+        symbols = self.strings["symbol"]
+        exchanges = self.vocab["exchange"]
+        exchange_codes = self.codes["exchange"]
+        self.key_order = array("I", sorted(
+            range(len(self)),
+            key=lambda i: (exchanges[exchange_codes[i]], symbols[i]),
+        ))
+        for column in ("exchange", "sector"):
+            self.groups[column] = _group(self.codes[column], len(self.vocab[column]))
+
+    # ----- on-disk cache -----
+
+    def _sections(self):
+        sections = {}
+        for column in STRING_COLUMNS:
+            sections[f"{column}.blob"] = self.strings[column].blob
+            sections[f"{column}.offsets"] = self.strings[column].offsets
+        for column in CATEGORY_COLUMNS:
+            sections[f"{column}.codes"] = self.codes[column]
+        sections["lot_size"] = self.lot_size
+        sections["key_order"] = self.key_order
+        for column, (rows, offsets) in self.groups.items():
+            sections[f"{column}.group_rows"] = rows
+            sections[f"{column}.group_offsets"] = offsets
+        return sections
+
+    def write_cache(self, path):
+        """Write every column as raw, 8-byte aligned arrays behind a JSON header"""
+        sections = self._sections()
+        layout = {}
+        position = 0
+        for name, data in sections.items():
+            typecode = getattr(data, "typecode", None) or "B"
+            nbytes = memoryview(data).nbytes
+            layout[name] = [position, nbytes, typecode]
+            position += (nbytes + 7) // 8 * 8
+
+        header = json.dumps({
+            "rows": len(self),
+            "vocab": self.vocab,
+            "source": self.source,
+            "sections": layout,
+            "itemsizes": {code: array(code).itemsize for code in "HIi"},
+        }).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            for name, data in sections.items():
+                raw = memoryview(data).cast("B")
+                f.write(raw)
+                f.write(b"\0" * (-len(raw) % 8))
+        os.replace(tmp, path)
+
+    @classmethod
+    def read_cache(cls, path):
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path}: not an instrument cache")
+        header_len = int.from_bytes(view[len(MAGIC):len(MAGIC) + 4], "little")
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(view[start:start + header_len]))
+        if header["itemsizes"] != {code: array(code).itemsize for code in "HIi"}:
+            raise ValueError(f"{path}: written on an incompatible platform")
+
+        base = start + header_len
+        sections = {}
+        for name, (offset, nbytes, typecode) in header["sections"].items():
+            section = view[base + offset:base + offset + nbytes]
+            sections[name] = section if typecode == "B" else section.cast(typecode)
+
+        strings = {
+            column: _StringColumn(sections[f"{column}.blob"], sections[f"{column}.offsets"])
+            for column in STRING_COLUMNS
+        }
+        codes = {column: sections[f"{column}.codes"] for column in CATEGORY_COLUMNS}
+        master = cls(strings, codes, header["vocab"], sections["lot_size"], header["source"])
+        master.key_order = sections["key_order"]
+        for column in ("exchange", "sector"):
+            master.groups[column] = (
+                sections[f"{column}.group_rows"],
+                sections[f"{column}.group_offsets"],
+            )
+        return master
+
+    # ----- lookups -----
+
+    def __len__(self):
+        return len(self.lot_size)
+
+    def __getitem__(self, i):
+        return self.record(i)
+
+    def value(self, column, i):
+        if column in self.strings:
+            return self.strings[column][i]
+        return self.vocab[column][self.codes[column][i]]
+
+    def record(self, i):
+        """Materialize one row as the dict shape the API returns"""
+        exchange = self.value("exchange", i)
+        record = {
+            "symbol": self.strings["symbol"][i],
+            "exchange": exchange,
+            "name": self.strings["name"][i],
+            "sector": self.value("sector", i) or "Other",
+        }
+        return record
+
+    def find(self, exchange, symbol):
+        """Row of exchange+symbol via binary search over the sorted key order"""
+        symbols = self.strings["symbol"]
+        exchanges = self.vocab["exchange"]
+        exchange_codes = self.codes["exchange"]
+        target = (exchange, symbol)
+        lo, hi = 0, len(self.key_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = self.key_order[mid]
+            if (exchanges[exchange_codes[row]], symbols[row]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.key_order):
+            row = self.key_order[lo]
+            if (exchanges[exchange_codes[row]], symbols[row]) == target:
+                return row
+        return None
+
+    def rows_for(self, column, value):
+        """Rows with a given exchange/sector, in master order"""
+        code = self._code_of[column].get(value)
+        if code is None:
+            return ()
+        rows, offsets = self.groups[column]
+        return rows[offsets[code]:offsets[code + 1]]
+
+    def values(self, column):
+        """Distinct non-empty values present in a category column"""
+        rows, offsets = self.groups[column]
+        return [
+            value for code, value in enumerate(self.vocab[column])
+            if value and offsets[code + 1] > offsets[code]
+        ]
+
+
+def _sectors_digest(sectors):
+    """Stable fingerprint of the sector overrides baked into a cache file"""
+    if not sectors:
+        return None
+    return hashlib.sha1(json.dumps(sorted(sectors.items())).encode("utf-8")).hexdigest()
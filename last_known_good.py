@@ -0,0 +1,126 @@
+"""Last-known-good responses served stale-while-revalidate during upstream blips."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LastKnownGood:
+    """Keeps the most recent real value per key in the shared cache.
+
+    Entries are shared by every worker on the host, so the value (and its
+    timestamp) is the same whichever worker answers. A value younger than
+    `fresh_for` seconds is served as is. An older one triggers a refresh,
+    and the caller waits at most `wait` seconds for it: a healthy upstream
+    answers in time and the caller gets fresh data, a slow or failing one
+    leaves the caller with the last good value (marked stale, with its age)
+    while the refresh carries on in the background.
+    Nothing older than `max_stale` is ever served; with no value inside that
+    bound the refresh's own error propagates, so callers get an honest
+    failure instead of made-up data.
+    With a `policy` (a MarketCalendar), a value stored after the last session
+    settled counts as fresh, and is kept, until the next one opens.
+    """
+
+    def __init__(self, store, namespace, fresh_for=2.0, max_stale=300.0, wait=0.5,
+                 executor=None, logger=None, policy=None):
+        self.store = store
+        self.namespace = namespace
+        self.fresh_for = fresh_for
+        self.max_stale = max_stale
+        self.wait = wait
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix=f"lkg-{namespace}"
+        )
+        self.logger = logger
+        self.policy = policy
+        self._refreshing = {}       # key -> Future, this process
+        self._errors = {}           # key -> (time, message) of the last failed refresh
+        self._lock = threading.Lock()
+        self.fresh = 0
+        self.stale = 0
+        self.failed_refreshes = 0
+
+    def _is_fresh(self, stored_at):
+        if self.policy is not None:
+            return self.policy.is_fresh(stored_at, self.fresh_for)
+        return time.time() - stored_at < self.fresh_for
+
+    def _refresh(self, key, loader):
+        """Start (or join) this process's refresh of `key`"""
+        with self._lock:
+            future = self._refreshing.get(key)
+            if future is None:
+                future = self._refreshing[key] = self.executor.submit(self._load, key, loader)
+            return future
+
+    def _load(self, key, loader):
+        try:
+            # One worker on the host refreshes a key; the others wait and then
+            # pick up what it stored
+            with self.store.lease(self.namespace, key):
+                entry = self.store.peek(self.namespace, key)
+                if entry is not None and self._is_fresh(entry[1]):
+                    return entry
+                value = loader()
+                ttl = self.policy.ttl(self.max_stale) if self.policy is not None else self.max_stale
+                stored_at = self.store.put(self.namespace, key, value, ttl)
+            with self._lock:
+                self._errors.pop(key, None)
+            return value, stored_at
+        except Exception as e:
+            self.failed_refreshes += 1
+            with self._lock:
+                self._errors[key] = (time.time(), str(e))
+            if self.logger is not None:
+                self.logger.warning(f"{self.namespace} refresh failed for {key}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def get(self, key, loader):
+        """Return (value, stored_at); raises only when nothing servable exists"""
+        entry = self.store.peek(self.namespace, key)
+        if entry is not None and self._is_fresh(entry[1]):
+            self.fresh += 1
+            return entry
+
+        future = self._refresh(key, loader)
+        if entry is None:
+            # Nothing to fall back on: wait for the real answer (or error)
+            result = future.result()
+            self.fresh += 1
+            return result
+        try:
+            result = future.result(timeout=self.wait)
+            self.fresh += 1
+            return result
+        except Exception:
+            # Timed out or failed: the refresh keeps going (or has logged
+            # its error) and the caller gets the last good value
+            self.stale += 1
+            return entry
+
+    def freshness(self, key, stored_at):
+        """Metadata describing how old a served value is"""
+        age = max(time.time() - stored_at, 0.0)
+        info = {
+            "as_of": int(stored_at * 1000),
+            "age_ms": int(age * 1000),
+            "stale": not self._is_fresh(stored_at),
+            "max_stale_ms": int(self.max_stale * 1000),
+        }
+        error = self._errors.get(key)
+        if error is not None and error[0] > stored_at:
+            info["refresh_error"] = error[1]
+        return info
+
+    def stats(self):
+        return {
+            "fresh": self.fresh,
+            "stale": self.stale,
+            "failed_refreshes": self.failed_refreshes,
+            "refreshing": len(self._refreshing),
+            "fresh_for": self.fresh_for,
+            "max_stale": self.max_stale,
+        }
@@ -0,0 +1,194 @@
+"""NSE/BSE trading sessions and holidays, and the cache lifetimes they imply."""
+import os
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+PRE_OPEN = "pre_open"
+OPEN = "open"
+POST_CLOSE = "post_close"
+CLOSED = "closed"
+# States in which prices can still change
+LIVE_STATES = (PRE_OPEN, OPEN, POST_CLOSE)
+
+
+def load_holidays(path):
+    """{date: name} from a file of 'YYYY-MM-DD  Name' lines ('#' comments)"""
+    holidays = {}
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            day, _, name = line.partition(" ")
+            holidays[date.fromisoformat(day)] = name.strip() or "Exchange holiday"
+    return holidays
+
+
+class MarketCalendar:
+    """When the cash market is trading, and how long data stays current.
+
+    A trading day is a weekday that isn't in the holidays file (re-read when
+    the file changes, so next year's list can be dropped in without a
+    restart). Each has a pre-open call auction, the regular session, and a
+    short `settle` window after the close while closing prices are
+    computed. Outside those, nothing moves until the next pre-open, so:
+
+    - `ttl(base)` stretches a cache lifetime to the next pre-open;
+    - `is_fresh(stored_at, base)` treats anything stored after the last
+      session settled as current;
+    - `closed_through()` is the last day whose candles are final.
+    """
+
+    def __init__(self, holidays_path=None, pre_open=dtime(9, 0), open=dtime(9, 15),
+                 close=dtime(15, 30), settle=900.0, clock=time.time, logger=None):
+        self.holidays_path = holidays_path
+        self.pre_open = pre_open
+        self.open = open
+        self.close = close
+        self.settle = settle
+        self.clock = clock
+        self.logger = logger
+        self._holidays = {}
+        self._holidays_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def holidays(self):
+        """Holiday table, reloaded at most once a minute if the file changed"""
+        if self.holidays_path is None:
+            return self._holidays
+        now = time.monotonic()
+        if now - self._checked_at < 60 and self._holidays_mtime is not None:
+            return self._holidays
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.holidays_path).st_mtime
+                if mtime != self._holidays_mtime:
+                    self._holidays = load_holidays(self.holidays_path)
+                    self._holidays_mtime = mtime
+                    self._check_coverage()
+            except (OSError, ValueError) as e:
+                if self.logger is not None:
+                    self.logger.warning(f"Market holidays not loaded from {self.holidays_path}: {e}")
+                self._holidays_mtime = 0
+        return self._holidays
+
+    def _check_coverage(self):
+        """Warn when the file has no dates for this year: every exchange
+        holiday would then count as a trading day"""
+        year = datetime.fromtimestamp(self.clock(), IST).year
+        if self.logger is not None and not any(day.year == year for day in self._holidays):
+            self.logger.warning(f"{self.holidays_path} lists no holidays for {year}; add the exchange's list")
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays()
+
+    def _closed_reason(self, day):
+        if day.weekday() >= 5:
+            return "weekend"
+        return self.holidays().get(day)
+
+    def next_trading_day(self, day):
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def previous_trading_day(self, day):
+        day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    def _at(self, day, when):
+        return datetime.combine(day, when, tzinfo=IST).timestamp()
+
+    def _settled_at(self, day):
+        return self._at(day, self.close) + self.settle
+
+    def _session(self, now):
+        """(state, trading day, next pre-open ts, settled-at ts of the last
+        finished session, reason the market is shut today or None)"""
+        today = datetime.fromtimestamp(now, IST).date()
+        if not self.is_trading_day(today):
+            last = self.previous_trading_day(today)
+            return (CLOSED, last, self._at(self.next_trading_day(today), self.pre_open),
+                    self._settled_at(last), self._closed_reason(today))
+
+        previous = self.previous_trading_day(today)
+        if now < self._at(today, self.pre_open):
+            return CLOSED, previous, self._at(today, self.pre_open), self._settled_at(previous), None
+        next_pre_open = self._at(self.next_trading_day(today), self.pre_open)
+        if now < self._at(today, self.open):
+            state = PRE_OPEN
+        elif now < self._at(today, self.close):
+            state = OPEN
+        elif now < self._settled_at(today):
+            state = POST_CLOSE
+        else:
+            return CLOSED, today, next_pre_open, self._settled_at(today), None
+        return state, today, next_pre_open, self._settled_at(previous), None
+
+    def state(self, now=None):
+        return self._session(self.clock() if now is None else now)[0]
+
+    def trading_day(self, now=None):
+        """Today once its session has begun, else the last trading day"""
+        return self._session(self.clock() if now is None else now)[1]
+
+    def is_live(self, now=None):
+        return self.state(now) in LIVE_STATES
+
+    def status(self, now=None):
+        """Session summary for API responses"""
+        now = self.clock() if now is None else now
+        state, day, next_pre_open, _, reason = self._session(now)
+        next_day = datetime.fromtimestamp(next_pre_open, IST).date()
+        status = {
+            "state": state,
+            "trading_day": day.isoformat(),
+            "next_open": int(self._at(next_day, self.open) * 1000),
+        }
+        if state in (PRE_OPEN, OPEN):
+            status["closes_at"] = int(self._at(day, self.close) * 1000)
+        if reason:
+            status["reason"] = reason
+        return status
+
+    def ttl(self, base, now=None):
+        """Cache lifetime for data fetched now: `base` while prices can move,
+        otherwise until the next pre-open"""
+        now = self.clock() if now is None else now
+        state, _, next_pre_open, _, _ = self._session(now)
+        if state in LIVE_STATES:
+            return base
+        return max(base, next_pre_open - now)
+
+    def is_fresh(self, stored_at, base, now=None):
+        """Whether a value stored at `stored_at` is still current"""
+        now = self.clock() if now is None else now
+        if now - stored_at < base:
+            return True
+        state, _, _, settled_at, _ = self._session(now)
+        return state not in LIVE_STATES and stored_at >= settled_at
+
+    def poll_interval(self, base, idle=300.0, now=None):
+        """How long a poller should sleep: `base` while live, otherwise up
+        to `idle` (but never past the next pre-open)"""
+        now = self.clock() if now is None else now
+        state, _, next_pre_open, _, _ = self._session(now)
+        if state in LIVE_STATES:
+            return base
+        return max(base, min(idle, next_pre_open - now))
+
+    def closed_through(self, now=None):
+        """Latest date whose candles can't change any more"""
+        now = self.clock() if now is None else now
+        today = datetime.fromtimestamp(now, IST).date()
+        if not self.is_trading_day(today) or now >= self._settled_at(today):
+            return today
+        return today - timedelta(days=1)
@@ -0,0 +1,494 @@
+"""Seeded, offline stand-in for GrowwAPI with production-like data volumes."""
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from greeks import bs_greeks, bs_price, time_to_expiry
+from market_calendar import IST
+from resample import INTERVAL_SECONDS, normalize_interval
+
+SESSION_OPEN = (9, 15)
+SESSION_MINUTES = 375                       # 09:15 - 15:30
+HISTORY_START = np.datetime64("2010-01-04")
+HISTORY_END = np.datetime64("2036-01-01")
+# Each symbol's daily walk passes through its base price on this day, so
+# history stays identical from one day (and one process) to the next
+PRICE_ANCHOR = np.datetime64("2026-01-01")
+
+INDEX_LEVELS = {
+    "NIFTY": 24000.0, "BANKNIFTY": 51000.0, "FINNIFTY": 23000.0,
+    "MIDCPNIFTY": 12000.0, "SENSEX": 80000.0, "BANKEX": 58000.0,
+}
+STRIKE_STEPS = {
+    "NIFTY": 50, "BANKNIFTY": 100, "FINNIFTY": 50,
+    "MIDCPNIFTY": 25, "SENSEX": 100, "BANKEX": 100,
+}
+MONTHS = "JAN FEB MAR APR MAY JUN JUL AUG SEP OCT NOV DEC".split()
+
+
+class SimulatedUpstreamError(Exception):
+    """Injected failure; `code` mimics GrowwAPIException so callers classify it"""
+
+    def __init__(self, msg, code):
+        super().__init__(msg)
+        self.msg = msg
+        self.code = code
+
+
+def parse_per_method(spec, default=0.0):
+    """'get_candles=200,*=30' or just '30' -> (default, {method: value})"""
+    per_method = {}
+    for item in filter(None, (part.strip() for part in str(spec).split(","))):
+        if "=" not in item:
+            default = float(item)
+            continue
+        name, _, value = item.partition("=")
+        if name.strip() == "*":
+            default = float(value)
+        else:
+            per_method[name.strip()] = float(value)
+    return default, per_method
+
+
+def _seed(*parts):
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def _unit(*parts):
+    """Deterministic float in [0, 1) for a tuple of values"""
+    return _seed(*parts) / 2 ** 64
+
+
+def _session_open_ts(day):
+    """Epoch seconds of 09:15 IST on a numpy datetime64[D]"""
+    d = day.astype(date)
+    return datetime(d.year, d.month, d.day, *SESSION_OPEN, tzinfo=IST).timestamp()
+
+
+def _ist_midnight_ts(day):
+    d = day.astype(date)
+    return datetime(d.year, d.month, d.day, tzinfo=IST).timestamp()
+
+
+def _parse_day(value):
+    return np.datetime64(str(value)[:10], "D")
+
+
+class _Path:
+    """One symbol's session: 376 minute-boundary prices plus wicks and volume"""
+    __slots__ = ("prices", "highs", "lows", "volumes", "run_high", "run_low", "prev_close")
+
+    def __init__(self, prices, highs, lows, volumes, prev_close):
+        self.prices = prices
+        self.highs = highs.astype(np.float32)
+        self.lows = lows.astype(np.float32)
+        self.volumes = volumes.astype(np.float32)
+        self.run_high = np.maximum.accumulate(self.highs)
+        self.run_low = np.minimum.accumulate(self.lows)
+        self.prev_close = prev_close
+
+
+class MarketSimulator:
+    """Deterministic market for any symbol, shaped like GrowwAPI's responses.
+
+    Every symbol gets a seeded daily random walk (a fixed anchor keeps it
+    identical across days and processes) and each session is a Brownian
+    bridge between that day's open and close, generated with NumPy in one
+    shot. Candles at every interval, LTP/OHLC/quotes and option chains are
+    all read from the same paths, so resampled candles, snapshots and
+    chains agree with each other. Option legs are priced from a volatility
+    smile with Black-Scholes, so locally computed IVs and Greeks match the
+    chain's.
+
+    `latency_ms`/`jitter_ms` and `error_rate`/`throttle_rate` inject delay
+    and failures (5xx / 429) per call, optionally per method.
+    """
+
+    SEGMENT_CASH = "CASH"
+    SEGMENT_FNO = "FNO"
+    EXCHANGE_NSE = "NSE"
+    EXCHANGE_BSE = "BSE"
+    TRANSACTION_TYPE_BUY = "BUY"
+    TRANSACTION_TYPE_SELL = "SELL"
+    ORDER_TYPE_MARKET = "MARKET"
+    ORDER_TYPE_LIMIT = "LIMIT"
+
+    def __init__(self, seed=42, latency_ms="0", jitter_ms="0", error_rate="0",
+                 throttle_rate="0", strikes_per_side=40, path_cache_size=4096, series_cache_size=256,
+                 clock=time.time):
+        self.seed = seed
+        self.latency_ms = parse_per_method(latency_ms)
+        self.jitter_ms = parse_per_method(jitter_ms)
+        self.error_rate = parse_per_method(error_rate)
+        self.throttle_rate = parse_per_method(throttle_rate)
+        self.strikes_per_side = strikes_per_side
+        self.clock = clock
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._daily = OrderedDict()
+        self._paths = OrderedDict()
+        self._path_cache_size = path_cache_size
+        self._series_cache_size = series_cache_size
+        self._cache_lock = threading.Lock()
+        self._orders = []
+        self._positions = {}
+        self._order_lock = threading.Lock()
+        self.calls = {}
+
+    # ----- latency / error injection -----
+
+    def _setting(self, setting, method):
+        default, per_method = setting
+        return per_method.get(method, default)
+
+    def _upstream(self, method):
+        with self._random_lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            roll = self._random.random()
+            jitter = self._random.gauss(0, 1)
+        latency = self._setting(self.latency_ms, method) + abs(jitter) * self._setting(self.jitter_ms, method)
+        if latency > 0:
+            time.sleep(latency / 1000.0)
+        throttle = self._setting(self.throttle_rate, method)
+        if roll < throttle:
+            raise SimulatedUpstreamError("Simulated rate limit", "429")
+        if roll < throttle + self._setting(self.error_rate, method):
+            raise SimulatedUpstreamError("Simulated upstream failure", "503")
+
+    # ----- price model -----
+
+    def _profile(self, symbol):
+        """(base price, annual vol) for a symbol; indices get index-like levels"""
+        name = symbol.split("_", 1)[-1]
+        if name in INDEX_LEVELS:
+            return INDEX_LEVELS[name], 0.12 + 0.08 * _unit(self.seed, name, "vol")
+        base = float(np.exp(np.log(50) + (np.log(5000) - np.log(50)) * _unit(self.seed, name, "base")))
+        return round(base, 1), 0.18 + 0.30 * _unit(self.seed, name, "vol")
+
+    def _daily_series(self, symbol):
+        """(log opens, log closes) for every trading day in the history window"""
+        with self._cache_lock:
+            series = self._daily.get(symbol)
+            if series is not None:
+                self._daily.move_to_end(symbol)
+                return series
+        base, vol = self._profile(symbol)
+        n = int(np.busday_count(HISTORY_START, HISTORY_END))
+        sigma = vol / np.sqrt(252)
+        rng = np.random.default_rng(_seed(self.seed, symbol, "daily"))
+        returns = rng.normal(0.0, sigma, n)
+        gaps = rng.normal(0.0, sigma * 0.3, n)
+        log_close = np.cumsum(returns)
+        anchor = int(np.busday_count(HISTORY_START, PRICE_ANCHOR))
+        log_close += np.log(base) - log_close[anchor]
+        log_open = np.empty(n)
+        log_open[0] = log_close[0] - returns[0]
+        log_open[1:] = log_close[:-1] + gaps[1:]
+        series = (log_open, log_close, sigma)
+        with self._cache_lock:
+            self._daily[symbol] = series
+            while len(self._daily) > self._series_cache_size:
+                self._daily.popitem(last=False)
+        return series
+
+    def _day_index(self, day):
+        return int(np.busday_count(HISTORY_START, day))
+
+    def _path(self, symbol, day):
+        key = (symbol, int(day.astype(int)))
+        with self._cache_lock:
+            path = self._paths.get(key)
+            if path is not None:
+                self._paths.move_to_end(key)
+                return path
+
+        log_open, log_close, sigma = self._daily_series(symbol)
+        i = self._day_index(day)
+        lo, lc = log_open[i], log_close[i]
+        rng = np.random.default_rng(_seed(self.seed, symbol, key[1]))
+        n = SESSION_MINUTES
+        steps = rng.standard_normal(n) * (sigma / np.sqrt(n))
+        walk = np.concatenate(([0.0], np.cumsum(steps)))
+        k = np.arange(n + 1) / n
+        # Brownian bridge pinned to the day's open and close
+        log_prices = lo + (lc - lo) * k + walk - k * walk[-1]
+        prices = np.exp(log_prices)
+
+        wick = np.abs(rng.standard_normal((2, n))) * (sigma / np.sqrt(n)) * 0.6
+        edges = np.maximum(prices[:-1], prices[1:])
+        lows_edge = np.minimum(prices[:-1], prices[1:])
+        highs = edges * (1 + wick[0])
+        lows = lows_edge * (1 - wick[1])
+        # U-shaped intraday volume
+        shape = 1.0 + 2.0 * (np.linspace(-1, 1, n) ** 2)
+        base_volume = 2e4 * (1 + 50 * _unit(self.seed, symbol, "liquidity"))
+        volumes = np.round(base_volume * shape * rng.lognormal(0, 0.4, n))
+
+        path = _Path(prices, highs, lows, volumes, float(np.exp(log_close[i - 1])))
+        with self._cache_lock:
+            self._paths[key] = path
+            while len(self._paths) > self._path_cache_size:
+                self._paths.popitem(last=False)
+        return path
+
+    def _session(self, now=None):
+        """(trading day, minutes into it as float) of the latest session at `now`;
+        a closed session reports SESSION_MINUTES"""
+        now = self.clock() if now is None else now
+        today = np.datetime64(datetime.fromtimestamp(now, IST).date(), "D")
+        if np.is_busday(today):
+            elapsed = (now - _session_open_ts(today)) / 60.0
+            if elapsed >= 0:
+                return today, min(elapsed, float(SESSION_MINUTES))
+        previous = np.busday_offset(today, -1, roll="forward")
+        return previous, float(SESSION_MINUTES)
+
+    def _price_at(self, symbol, day, minute):
+        path = self._path(symbol, day)
+        m = int(minute)
+        if m >= SESSION_MINUTES:
+            return float(path.prices[-1]), path, SESSION_MINUTES - 1
+        frac = minute - m
+        price = path.prices[m] + (path.prices[m + 1] - path.prices[m]) * frac
+        return float(price), path, m
+
+    def _live(self, symbol):
+        """(ltp, open, high, low, previous close, volume) right now"""
+        day, minute = self._session()
+        ltp, path, m = self._price_at(symbol, day, minute)
+        prev_close = path.prev_close
+        return (
+            round(ltp, 2),
+            round(float(path.prices[0]), 2),
+            round(max(float(path.run_high[m]), ltp), 2),
+            round(min(float(path.run_low[m]), ltp), 2),
+            round(prev_close, 2),
+            int(path.volumes[:m + 1].sum(dtype=np.float64)),
+        )
+
+    # ----- market data -----
+
+    def get_ltp(self, segment=None, exchange_trading_symbols=(), timeout=None):
+        self._upstream("get_ltp")
+        if isinstance(exchange_trading_symbols, str):
+            exchange_trading_symbols = (exchange_trading_symbols,)
+        return {symbol: self._live(symbol)[0] for symbol in exchange_trading_symbols}
+
+    def get_ohlc(self, segment=None, exchange_trading_symbols=(), timeout=None):
+        self._upstream("get_ohlc")
+        if isinstance(exchange_trading_symbols, str):
+            exchange_trading_symbols = (exchange_trading_symbols,)
+        data = {}
+        for symbol in exchange_trading_symbols:
+            _, open_, high, low, close, _ = self._live(symbol)
+            data[symbol] = {"open": open_, "high": high, "low": low, "close": close}
+        return data
+
+    def get_quote(self, exchange, segment, trading_symbol, timeout=None):
+        self._upstream("get_quote")
+        ltp, open_, high, low, close, volume = self._live(f"{exchange}_{trading_symbol}")
+        tick = max(round(ltp * 0.0002, 2), 0.05)
+        return {
+            "last_price": ltp,
+            "ohlc": {"open": open_, "high": high, "low": low, "close": close},
+            "day_change": round(ltp - close, 2),
+            "day_change_perc": round((ltp - close) / close * 100, 4) if close else 0,
+            "volume": volume,
+            "bid_price": round(ltp - tick, 2),
+            "offer_price": round(ltp + tick, 2),
+            "upper_circuit_limit": round(close * 1.2, 2),
+            "lower_circuit_limit": round(close * 0.8, 2),
+            "last_trade_time": int(self.clock() * 1000),
+        }
+
+    def get_candles(self, exchange, segment, trading_symbol, from_date, to_date, interval, timeout=None):
+        """Candles between two dates (inclusive) as upstream-shaped dicts"""
+        self._upstream("get_candles")
+        interval = normalize_interval(interval)
+        seconds = INTERVAL_SECONDS.get(interval)
+        if seconds is None:
+            raise SimulatedUpstreamError(f"Unsupported interval: {interval}", "400")
+        symbol = f"{exchange}_{trading_symbol}"
+        last_day, last_minute = self._session()
+        end = min(_parse_day(to_date), last_day) if to_date else last_day
+        if from_date:
+            start = _parse_day(from_date)
+        else:
+            start = end - np.timedelta64(365 if seconds >= 86400 else 30, "D")
+        # The first simulated day has no previous close, so history starts after it
+        start = max(start, HISTORY_START + 1)
+        if start > end:
+            return []
+
+        days = np.arange(start, end + 1, dtype="datetime64[D]")
+        days = days[np.is_busday(days)]
+        candles = []
+        step = seconds // 60
+        for day in days:
+            path = self._path(symbol, day)
+            minutes = SESSION_MINUTES if day != last_day else int(np.ceil(last_minute))
+            if minutes <= 0:
+                continue
+            opens = path.prices[:minutes]
+            closes = path.prices[1:minutes + 1]
+            highs, lows, volumes = path.highs[:minutes], path.lows[:minutes], path.volumes[:minutes]
+            if step >= SESSION_MINUTES:
+                starts = np.array([0])
+                stamp0 = _ist_midnight_ts(day)
+            else:
+                starts = np.arange(0, minutes, step)
+                stamp0 = _session_open_ts(day)
+            ends = np.minimum(starts + step, minutes) - 1
+            o = opens[starts]
+            c = closes[ends]
+            h = np.maximum.reduceat(highs, starts)
+            lo = np.minimum.reduceat(lows, starts)
+            v = np.add.reduceat(volumes, starts, dtype=np.float64)
+            stamps = stamp0 + (starts * 60 if step < SESSION_MINUTES else 0)
+            candles.extend(
+                {"timestamp": int(ts), "open": round(a, 2), "high": round(b, 2),
+                 "low": round(d, 2), "close": round(e, 2), "volume": int(f)}
+                for ts, a, b, d, e, f in zip(
+                    np.atleast_1d(stamps).tolist(), o.tolist(), h.tolist(),
+                    lo.tolist(), c.tolist(), v.tolist(),
+                )
+            )
+        return candles
+
+    # ----- derivatives -----
+
+    def get_expiry_dates(self, exchange, underlying, timeout=None):
+        """Next eight weekly expiries (Thursday on NSE, Friday on BSE)"""
+        self._upstream("get_expiry_dates")
+        weekday = 4 if exchange == "BSE" else 3
+        now = datetime.fromtimestamp(self.clock(), IST)
+        day = now.date()
+        if day.weekday() == weekday and (now.hour, now.minute) >= (15, 30):
+            day += timedelta(days=1)
+        day += timedelta(days=(weekday - day.weekday()) % 7)
+        return [(day + timedelta(weeks=i)).isoformat() for i in range(8)]
+
+    def _leg_symbol(self, underlying, expiry, strike, side):
+        return f"{underlying}{expiry.year % 100:02d}{MONTHS[expiry.month - 1]}{strike:g}{side}"
+
+    def _chain(self, exchange, underlying, expiry_date):
+        spot = self._live(f"{exchange}_{underlying}")[0]
+        _, vol = self._profile(underlying)
+        step = STRIKE_STEPS.get(underlying)
+        if step is None:
+            step = 10 ** max(int(np.floor(np.log10(spot * 0.01))), 0) * (5 if spot > 2000 else 1)
+        atm = round(spot / step) * step
+        strikes = atm + step * np.arange(-self.strikes_per_side, self.strikes_per_side + 1)
+        strikes = strikes[strikes > 0].astype(float)
+
+        expiry = datetime.strptime(str(expiry_date)[:10], "%Y-%m-%d").date()
+        t = max(time_to_expiry(expiry, datetime.fromtimestamp(self.clock(), IST)), 1e-6)
+        moneyness = np.log(strikes / spot)
+        # Skewed smile: puts below spot trade richer
+        iv = np.clip(vol * (1 - 0.8 * moneyness + 2.5 * moneyness ** 2), 0.05, 2.0)
+
+        chain_strikes = {}
+        day = self._session()[0]
+        rng = np.random.default_rng(_seed(self.seed, underlying, expiry.isoformat(), int(day.astype(int))))
+        oi_base = 1e6 * np.exp(-(moneyness / 0.04) ** 2) + 2e4
+        for side, is_call in (("CE", True), ("PE", False)):
+            prices = np.maximum(np.round(bs_price(spot, strikes, t, 0.065, iv, is_call) / 0.05) * 0.05, 0.05)
+            greeks = bs_greeks(spot, strikes, t, 0.065, iv, is_call)
+            oi = np.round(oi_base * rng.lognormal(0, 0.3, len(strikes)) / 25) * 25
+            volume = np.round(oi * rng.uniform(0.5, 3.0, len(strikes)))
+            columns = {name: values.tolist() for name, values in greeks.items()}
+            for i, strike in enumerate(strikes.tolist()):
+                payload = chain_strikes.setdefault(f"{strike:g}", {})
+                payload[side] = {
+                    "trading_symbol": self._leg_symbol(underlying, expiry, strike, side),
+                    "ltp": round(float(prices[i]), 2),
+                    "open_interest": int(oi[i]),
+                    "volume": int(volume[i]),
+                    "greeks": {
+                        "iv": round(float(iv[i]) * 100, 4),
+                        **{name: round(values[i], 6) for name, values in columns.items()},
+                    },
+                }
+        return {"underlying_ltp": spot, "expiry": expiry.isoformat(), "strikes": chain_strikes}
+
+    def get_option_chain(self, exchange, underlying, expiry_date, timeout=None):
+        self._upstream("get_option_chain")
+        return self._chain(exchange, underlying, expiry_date)
+
+    def get_greeks(self, exchange, underlying, trading_symbol, expiry, timeout=None):
+        self._upstream("get_greeks")
+        for payload in self._chain(exchange, underlying, expiry)["strikes"].values():
+            for leg in payload.values():
+                if leg["trading_symbol"] == trading_symbol:
+                    return leg["greeks"]
+        raise SimulatedUpstreamError(f"Unknown contract: {trading_symbol}", "404")
+
+    # ----- orders -----
+
+    def place_order(self, exchange, segment, trading_symbol, transaction_type, quantity,
+                    order_type="MARKET", product_type="DELIVERY", price=0, validity="DAY",
+                    order_reference_id=None, timeout=None, **kwargs):
+        self._upstream("place_order")
+        ltp = self._live(f"{exchange}_{trading_symbol}")[0]
+        buy = transaction_type == self.TRANSACTION_TYPE_BUY
+        marketable = order_type == self.ORDER_TYPE_MARKET or (price >= ltp if buy else price <= ltp)
+        fill = ltp if order_type == self.ORDER_TYPE_MARKET else price
+        with self._order_lock:
+            order_id = f"SIM{len(self._orders) + 1:010d}"
+            order = {
+                "groww_order_id": order_id,
+                "order_reference_id": order_reference_id or order_id,
+                "trading_symbol": trading_symbol,
+                "exchange": exchange,
+                "segment": segment,
+                "transaction_type": transaction_type,
+                "order_type": order_type,
+                "product": product_type,
+                "validity": validity,
+                "quantity": int(quantity),
+                "price": price,
+                "order_status": "EXECUTED" if marketable else "OPEN",
+                "filled_quantity": int(quantity) if marketable else 0,
+                "average_fill_price": fill if marketable else 0,
+                "created_at": datetime.fromtimestamp(self.clock(), IST).isoformat(),
+            }
+            self._orders.append(order)
+            if marketable:
+                key = (exchange, segment, trading_symbol, product_type)
+                position = self._positions.setdefault(key, {"quantity": 0, "value": 0.0})
+                signed = int(quantity) if buy else -int(quantity)
+                position["quantity"] += signed
+                position["value"] += signed * fill
+        return {"groww_order_id": order_id, "order_status": order["order_status"],
+                "order_reference_id": order["order_reference_id"]}
+
+    def get_orders(self, timeout=None, **kwargs):
+        self._upstream("get_orders")
+        with self._order_lock:
+            return {"order_list": [dict(order) for order in self._orders]}
+
+    def get_positions(self, timeout=None, **kwargs):
+        self._upstream("get_positions")
+        with self._order_lock:
+            items = list(self._positions.items())
+        positions = []
+        for (exchange, segment, symbol, product), position in items:
+            quantity = position["quantity"]
+            ltp = self._live(f"{exchange}_{symbol}")[0]
+            positions.append({
+                "trading_symbol": symbol,
+                "exchange": exchange,
+                "segment": segment,
+                "product": product,
+                "quantity": quantity,
+                "net_price": round(position["value"] / quantity, 2) if quantity else 0,
+                "ltp": ltp,
+                "pnl": round(quantity * ltp - position["value"], 2),
+            })
+        return {"positions": positions}
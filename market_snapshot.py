@@ -0,0 +1,199 @@
+"""Array-backed market snapshot refreshed by a background poller."""
+import os
+import threading
+import time
+from array import array
+from collections import deque
+
+FIELDS = ("ltp", "open", "high", "low", "close", "change", "change_perc")
+
+
+class SnapshotTable:
+    """One immutable version of the snapshot.
+
+    Every field is a contiguous array('d') column; `index` maps
+    exchange_trading_symbol -> row. Readers grab a table reference and never
+    see a half-written refresh because the poller swaps in whole tables.
+    """
+    __slots__ = ("keys", "index", "columns", "version", "timestamp")
+
+    def __init__(self, keys, index, columns, version, timestamp):
+        self.keys = keys
+        self.index = index
+        self.columns = columns
+        self.version = version
+        self.timestamp = timestamp
+
+    def row(self, key):
+        """Return {field: value} for one symbol, or None if not in the universe"""
+        i = self.index.get(key)
+        if i is None:
+            return None
+        return {field: self.columns[field][i] for field in FIELDS}
+
+
+def _empty_table(keys, index):
+    columns = {field: array("d", bytes(8 * len(keys))) for field in FIELDS}
+    return SnapshotTable(keys, index, columns, 0, 0)
+
+
+class MarketSnapshot:
+    """Keeps LTP/OHLC for a fixed symbol universe fresh on a fixed cadence.
+
+    `loader(keys)` must return ({key: {"ltp", "ohlc"}}, errors), the same
+    contract as the quote cache. Symbols missing from a refresh (failed chunk)
+    keep their previous values so a partial upstream failure never zeroes rows.
+
+    The rows whose LTP moved are remembered for the last `history` versions so
+    streaming clients can be sent (or resume from) deltas instead of full lists.
+
+    `pace()`, if given, returns the seconds to wait before the next poll
+    (e.g. longer while the market is shut); otherwise it's `interval`.
+    """
+
+    def __init__(self, keys, loader, interval=1.0, logger=None, history=300, pace=None):
+        # Identifies this process's version sequence (versions restart at 0)
+        self.epoch = f"{os.getpid():x}{int(time.time() * 1000):x}"
+        self.keys = tuple(dict.fromkeys(keys))
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.loader = loader
+        self.interval = interval
+        self.pace = pace
+        self.logger = logger
+        self.last_errors = []
+        self._table = _empty_table(self.keys, self.index)
+        self._changed = deque(maxlen=history)   # (version, changed row indices)
+        self._published = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self):
+        return self._table
+
+    def refresh(self):
+        """Poll upstream once and publish a new table version"""
+        with self._refresh_lock:
+            previous = self._table
+            quotes, errors = self.loader(self.keys)
+            if errors and not quotes:
+                # Nothing came back: keep serving the last table (or none,
+                # so routes answer 503) instead of publishing zeroed rows
+                with self._published:
+                    self.last_errors = errors
+                raise RuntimeError(f"No quotes loaded: {errors[0].get('error')}")
+
+            columns = {field: array("d", previous.columns[field]) for field in FIELDS}
+            ltp_col = columns["ltp"]
+            for key, quote in quotes.items():
+                i = self.index.get(key)
+                if i is None:
+                    continue
+                ohlc = quote.get("ohlc") or {}
+                ltp = quote.get("ltp") or 0
+                close = ohlc.get("close") or 0
+
+                ltp_col[i] = ltp
+                columns["open"][i] = ohlc.get("open") or 0
+                columns["high"][i] = ohlc.get("high") or 0
+                columns["low"][i] = ohlc.get("low") or 0
+                columns["close"][i] = close
+                if close and ltp:
+                    columns["change"][i] = ltp - close
+                    columns["change_perc"][i] = (ltp - close) / close * 100
+                else:
+                    columns["change"][i] = 0
+                    columns["change_perc"][i] = 0
+
+            previous_ltp = previous.columns["ltp"]
+            changed = tuple(
+                i for i in range(len(self.keys)) if ltp_col[i] != previous_ltp[i]
+            )
+            table = SnapshotTable(
+                self.keys,
+                self.index,
+                columns,
+                previous.version + 1,
+                int(time.time() * 1000),
+            )
+
+            with self._published:
+                self.last_errors = errors
+                self._changed.append((table.version, changed))
+                self._table = table
+                self._published.notify_all()
+            return table
+
+    def wait_for_update(self, version, timeout):
+        """Block until a table newer than `version` is published (or timeout)"""
+        with self._published:
+            self._published.wait_for(lambda: self._table.version > version, timeout)
+            return self._table
+
+    def changes_since(self, version):
+        """Row indices whose LTP changed after `version`.
+
+        Returns None when `version` is older than the retained history, in
+        which case the caller has to fall back to a full snapshot.
+        """
+        with self._published:
+            if version >= self._table.version:
+                return set()
+            history = list(self._changed)
+        if not history or history[0][0] > version + 1:
+            return None
+        rows = set()
+        for changed_version, changed in history:
+            if changed_version > version:
+                rows.update(changed)
+        return rows
+
+    def read(self):
+        """Return the latest table, starting the poller on first use"""
+        if self._thread is None:
+            self.start()
+        table = self._table
+        if table.version == 0:
+            # Nothing published yet (first request after boot): refresh inline
+            with self._start_lock:
+                if self._table.version == 0:
+                    self._safe_refresh()
+            table = self._table
+        return table
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="market-snapshot", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Snapshot refresh failed: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._safe_refresh()
+            self._stop.wait(self.pace() if self.pace is not None else self.interval)
+
+    def stats(self):
+        table = self._table
+        return {
+            "symbols": len(self.keys),
+            "version": table.version,
+            "timestamp": table.timestamp,
+            "interval": self.interval,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "last_errors": len(self.last_errors),
+        }
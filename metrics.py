@@ -0,0 +1,307 @@
+"""Prometheus metrics: per-thread recording, merged across gunicorn workers."""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# Files of dead workers are kept (their counters still count) for this long
+DEAD_WORKER_RETENTION = 3600
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs, extra=None):
+    pairs = list(pairs) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Metrics:
+    """Counters, gauges and histograms keyed by (name, labels).
+
+    Every thread records into its own shard, so the request path takes no
+    lock; shards are only summed when someone scrapes. Shards of finished
+    threads are folded into a base shard at scrape time.
+
+    Each worker writes its totals to METRICS_DIR/metrics-<pid>.json (every
+    `flush_interval` seconds and on every scrape), and /metrics merges all
+    the files: counters and histograms are summed over every worker that ran
+    recently, gauges over the live ones only.
+    """
+
+    def __init__(self, directory, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.definitions = {}       # name -> (kind, help, buckets)
+        self.collectors = []        # callables returning [(name, labels, value)]
+        self.derived = []           # (name, fn(merged) -> [(labels, value)])
+        self._local = threading.local()
+        self._shards = []           # [(thread, shard)]
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # A forked worker (gunicorn --preload) starts from zero with its own
+        # file; the parent's shards and flusher thread don't carry over
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    # ----- definitions -----
+
+    def counter(self, name, help_text):
+        self.definitions[name] = (COUNTER, help_text, None)
+
+    def gauge(self, name, help_text):
+        self.definitions[name] = (GAUGE, help_text, None)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.definitions[name] = (HISTOGRAM, help_text, tuple(buckets))
+
+    def ratio(self, name, help_text, numerator, denominator_names):
+        """Gauge computed after merging: numerator / sum(denominator_names),
+        per label set, e.g. a cache hit ratio from hit and miss counters"""
+        self.gauge(name, help_text)
+
+        def derive(merged):
+            totals = {}
+            for (series, labels), value in merged.items():
+                if series in denominator_names:
+                    hits, total = totals.get(labels, (0, 0))
+                    totals[labels] = (hits + (value if series == numerator else 0), total + value)
+            return [(labels, hits / total) for labels, (hits, total) in totals.items() if total]
+
+        self.derived.append((name, derive))
+
+    def register_collector(self, collect):
+        """`collect()` returns [(name, labels_dict, value)] of per-process
+        cumulative values (e.g. cache hit counts) read at flush time"""
+        self.collectors.append(collect)
+
+    # ----- recording (hot path, lock-free) -----
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._ensure_flusher()
+        return shard
+
+    def inc(self, name, labels=(), amount=1):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def dec(self, name, labels=(), amount=1):
+        self.inc(name, labels, -amount)
+
+    def observe(self, name, labels, value):
+        buckets = self.definitions[name][2]
+        shard = self._shard()
+        key = (name, labels)
+        series = shard.get(key)
+        if series is None:
+            # Per-bucket counts (non-cumulative), then +Inf, sum, count
+            series = shard[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+        series[bisect_left(buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    # ----- aggregation -----
+
+    @staticmethod
+    def _merge(into, key, value):
+        current = into.get(key)
+        if current is None:
+            into[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            for i, v in enumerate(value):
+                current[i] += v
+        else:
+            into[key] = current + value
+
+    def _local_totals(self):
+        totals = {}
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    for key, value in list(shard.items()):
+                        self._merge(self._retired, key, value)
+            self._shards = live
+            shards = [shard for _, shard in live] + [self._retired]
+            for shard in shards:
+                for key, value in list(shard.items()):
+                    self._merge(totals, key, value)
+        for collect in self.collectors:
+            for name, labels, value in collect():
+                self._merge(totals, (name, tuple(sorted(labels.items()))), value)
+        return totals
+
+    def flush(self):
+        """Write this worker's totals to its file in METRICS_DIR"""
+        series = [
+            [name, [list(pair) for pair in labels], value]
+            for (name, labels), value in self._local_totals().items()
+        ]
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"pid": os.getpid(), "series": series}, f)
+        os.replace(tmp, path)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def collect(self):
+        """{(name, labels): value} merged over every worker's file"""
+        self.flush()
+        merged = {}
+        now = time.time()
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                mtime = os.path.getmtime(path)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(data["pid"])
+            if not alive and now - mtime > DEAD_WORKER_RETENTION:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            for name, labels, value in data["series"]:
+                definition = self.definitions.get(name)
+                if definition is None or (definition[0] == GAUGE and not alive):
+                    continue
+                self._merge(merged, (name, tuple(tuple(pair) for pair in labels)), value)
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)"""
+        merged = self.collect()
+        by_name = {}
+        for (name, labels), value in merged.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name, derive in self.derived:
+            by_name[name] = derive(merged)
+
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text, buckets = self.definitions[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                if kind != HISTOGRAM:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels, ('le', _number(float(bound))))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedClient:
+    """Proxy around a GrowwAPI client that times every method call.
+
+    Constants (SEGMENT_CASH, EXCHANGE_NSE, ...) pass straight through; any
+    other callable is wrapped once and reused.
+    """
+
+    def __init__(self, client, metrics):
+        self._client = client
+        self._metrics = metrics
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+        attr = getattr(self._client, name)
+        if name.isupper() or name.startswith("_") or not callable(attr):
+            return attr
+
+        metrics = self._metrics
+        labels = (("method", name),)
+
+        def call(*args, **kwargs):
+            metrics.inc("groww_upstream_in_flight", labels)
+            started = time.perf_counter()
+            outcome = "ok"
+            try:
+                return attr(*args, **kwargs)
+            except Exception:
+                outcome = "error"
+                metrics.inc("groww_upstream_errors_total", labels)
+                raise
+            finally:
+                metrics.dec("groww_upstream_in_flight", labels)
+                metrics.observe(
+                    "groww_upstream_duration_seconds",
+                    labels + (("outcome", outcome),),
+                    time.perf_counter() - started,
+                )
+
+        call.__name__ = name
+        self._wrapped[name] = call
+        return call
@@ -0,0 +1,180 @@
+"""Versioned option-chain cache with per-strike change tracking."""
+import threading
+import time
+from datetime import datetime
+
+from market_calendar import IST
+
+
+def strike_items(chain):
+    """Yield (strike_key, strike_payload) for either chain shape we see:
+    {"strikes": {"24000": {"CE": .., "PE": ..}}} or {"strikes": [{"strikePrice": .., "ce", "pe"}]}"""
+    strikes = (chain or {}).get("strikes") or {}
+    if isinstance(strikes, dict):
+        yield from strikes.items()
+    else:
+        for strike in strikes:
+            yield str(strike.get("strikePrice", strike.get("strike_price"))), strike
+
+
+def with_strikes(chain, keys):
+    """Copy of `chain` keeping only the strikes in `keys`, same shape as input"""
+    strikes = chain.get("strikes") or {}
+    subset = dict(chain)
+    if isinstance(strikes, dict):
+        subset["strikes"] = {k: v for k, v in strikes.items() if k in keys}
+    else:
+        subset["strikes"] = [s for k, s in strike_items(chain) if k in keys]
+    return subset
+
+
+class _Entry:
+    __slots__ = ("chain", "version", "base_version", "fetched_at", "expires_at",
+                 "source_ms", "strikes", "strike_versions", "removed")
+
+    def __init__(self):
+        self.chain = None
+        self.version = 0
+        self.base_version = 0
+        self.fetched_at = 0.0
+        self.expires_at = 0.0
+        self.source_ms = 0          # when upstream produced this chain
+        self.strikes = {}           # strike -> last payload seen
+        self.strike_versions = {}   # strike -> version it last changed in
+        self.removed = {}           # strike -> version it disappeared in
+
+
+class OptionChainCache:
+    """Option chains keyed by (exchange, underlying, expiry) with a short TTL.
+
+    A refresh that changes anything gets a new, monotonically increasing
+    version (never below the chain's fetch time in ms, so versions keep
+    increasing across restarts). Each strike remembers the version it last
+    changed in, so a client sending `since_version` only receives the strikes
+    whose CE/PE data moved since then.
+
+    `loader()` returns (chain, fetched_at_ms). When workers share fetched
+    chains, they share fetch times too, so a version issued by one worker is
+    a meaningful cutoff in another: a worker that skipped an intermediate
+    chain records the change later, which only makes the delta a superset.
+    With a `policy` (a MarketCalendar), a chain fetched while the market is
+    shut is kept until the next session.
+    """
+
+    def __init__(self, ttl=2.0, max_size=500, policy=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.policy = policy
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def get(self, key, loader, since_version=None):
+        """Return (chain, version, delta, source_ms): delta is None for a full
+        chain or a dict of {"strikes": changed keys, "removed": removed keys},
+        source_ms is the loader's fetch time for the chain"""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry.expires_at:
+            # One refresh per key at a time; later arrivals reuse its result
+            with self._key_lock(key):
+                entry = self._entries.get(key)
+                if entry is None or time.monotonic() >= entry.expires_at:
+                    self.misses += 1
+                    entry = self._refresh(key, entry, *loader())
+                else:
+                    self.hits += 1
+        else:
+            self.hits += 1
+
+        return entry.chain, entry.version, self._delta(entry, since_version), entry.source_ms
+
+    def _refresh(self, key, entry, chain, fetched_at_ms):
+        # Build a new entry rather than mutating the old one, so concurrent
+        # readers always see a chain and version that belong together
+        fresh = _Entry()
+        if entry is not None:
+            fresh.version = entry.version
+            fresh.base_version = entry.base_version
+            fresh.strike_versions = dict(entry.strike_versions)
+            fresh.removed = dict(entry.removed)
+        previous = entry.strikes if entry is not None else {}
+        current = dict(strike_items(chain))
+
+        changed = [k for k, payload in current.items() if previous.get(k) != payload]
+        removed = [k for k in previous if k not in current]
+
+        if entry is None or changed or removed:
+            version = max(fresh.version + 1, fetched_at_ms)
+            for k in changed:
+                fresh.strike_versions[k] = version
+                fresh.removed.pop(k, None)
+            for k in removed:
+                fresh.strike_versions.pop(k, None)
+                fresh.removed[k] = version
+            if entry is None:
+                fresh.base_version = version
+            fresh.version = version
+
+        fresh.chain = chain
+        fresh.source_ms = fetched_at_ms
+        fresh.strikes = current
+        fresh.fetched_at = time.monotonic()
+        ttl = self.policy.ttl(self.ttl) if self.policy is not None else self.ttl
+        fresh.expires_at = fresh.fetched_at + ttl
+
+        with self._lock:
+            self._entries[key] = fresh
+            if len(self._entries) > self.max_size:
+                oldest = min(self._entries, key=lambda k: self._entries[k].fetched_at)
+                del self._entries[oldest]
+                self._locks.pop(oldest, None)
+        return fresh
+
+    def _delta(self, entry, since_version):
+        # Versions from before this entry existed can't be diffed against:
+        # send the full chain
+        if since_version is None or not entry.base_version <= since_version <= entry.version:
+            return None
+        return {
+            "strikes": {k for k, v in entry.strike_versions.items() if v > since_version},
+            "removed": sorted(k for k, v in entry.removed.items() if v > since_version),
+        }
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class EndOfDayCache:
+    """Values that don't change intraday (e.g. expiry lists), kept until
+    midnight IST whatever the server's timezone"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        today = datetime.now(IST).date()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == today:
+            return entry[1]
+        value = loader()
+        if value:
+            with self._lock:
+                for stale in [k for k, (day, _) in self._entries.items() if day != today]:
+                    del self._entries[stale]
+                self._entries[key] = (today, value)
+        return value
@@ -0,0 +1,183 @@
+"""Per-account orders/positions cache with write-through invalidation and change cursors."""
+import threading
+import time
+
+
+def _order_id(order):
+    return str(order.get("groww_order_id") or order.get("order_reference_id"))
+
+
+def _position_id(position):
+    return ":".join(str(position.get(field, "")) for field in
+                    ("exchange", "segment", "trading_symbol", "product"))
+
+
+# kind -> (list field in the upstream payload, item identity)
+KINDS = {
+    "orders": ("order_list", _order_id),
+    "positions": ("positions", _position_id),
+}
+
+
+def _items(payload, field):
+    if isinstance(payload, list):
+        return payload
+    return (payload or {}).get(field) or []
+
+
+class PortfolioCache:
+    """Orders and positions per account, shared by every worker on the host.
+
+    Each (account, kind) is one entry in the shared cache: the upstream list
+    plus, per item, the version it last changed in. A read younger than `ttl`
+    seconds is answered from this process's decoded copy (the shared entry's
+    timestamp tells it whether another worker stored something newer); an
+    older one refreshes under the entry's lease, so one worker on the host
+    polls Groww per account and kind. Versions work like the option-chain
+    cache's, so `since` returns only the items that changed after it.
+
+    `invalidate()` runs after a successful order placement: it re-fetches
+    both lists at once, and until Groww lists the new order (for up to
+    `pending_ttl` seconds) a copy built from the placement is served in its
+    place, so a client never sees its own order missing.
+    """
+
+    def __init__(self, store, fetch, ttl=2.0, pending_ttl=60.0, retain=86400.0, logger=None):
+        self.store = store
+        self.fetch = fetch              # fetch(kind) -> upstream payload
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.retain = retain
+        self.logger = logger
+        self._local = {}                # (account, kind) -> (stored_at, state)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    def _state(self, account, kind):
+        """(state, stored_at) from the shared entry, decoding it only when
+        another worker has stored a newer one; None if there isn't one"""
+        key = (account, kind)
+        stored_at = self.store.stamp("portfolio", [account, kind])
+        if stored_at is None:
+            return None
+        local = self._local.get(key)
+        if local is not None and local[0] == stored_at:
+            return local[1], stored_at
+        entry = self.store.peek("portfolio", [account, kind])
+        if entry is None:
+            return None
+        with self._lock:
+            self._local[key] = (entry[1], entry[0])
+        return entry
+
+    def _usable(self, entry):
+        return entry is not None and not entry[0].get("invalid") and time.time() - entry[1] < self.ttl
+
+    def get(self, account, kind, since=None):
+        """(items, version, delta) where delta is None for the full list or
+        {"items": changed ids, "removed": removed ids} after `since`"""
+        entry = self._state(account, kind)
+        if self._usable(entry):
+            self.hits += 1
+        else:
+            with self.store.lease("portfolio", [account, kind]):
+                # Whoever held the lease before us may have just refreshed
+                entry = self._state(account, kind)
+                if self._usable(entry):
+                    self.hits += 1
+                else:
+                    entry = self._refresh(account, kind, entry)
+        state = entry[0]
+        items = [item for _, item in state["items"]]
+        return items, state["version"], self._delta(state, since)
+
+    def _refresh(self, account, kind, entry, placed=None):
+        """Fetch `kind` and store the new state; call with the lease held"""
+        self.refreshes += 1
+        previous = entry[0] if entry is not None else None
+        state = self._track(kind, previous, self.fetch(kind), placed)
+        stored_at = self.store.put("portfolio", [account, kind], state, self.retain)
+        with self._lock:
+            self._local[(account, kind)] = (stored_at, state)
+        return state, stored_at
+
+    def _track(self, kind, previous, payload, placed=None):
+        field, identity = KINDS[kind]
+        now = time.time()
+        state = {
+            "items": [], "versions": {}, "removed": {}, "pending": {},
+            "version": 0, "base_version": 0,
+        }
+        if previous is not None:
+            for name in ("versions", "removed", "pending"):
+                state[name] = dict(previous[name])
+            state["version"] = previous["version"]
+            state["base_version"] = previous["base_version"]
+        if placed is not None:
+            state["pending"][_order_id(placed)] = [placed, now]
+
+        current = {identity(item): item for item in _items(payload, field)}
+        # Placed orders Groww doesn't list yet go in front, as it lists newest first
+        for order_id, (order, placed_at) in list(state["pending"].items()):
+            if order_id in current or now - placed_at >= self.pending_ttl:
+                del state["pending"][order_id]
+            else:
+                current = {order_id: order, **current}
+
+        old = dict(previous["items"]) if previous is not None else {}
+        changed = [k for k, item in current.items() if old.get(k) != item]
+        removed = [k for k in old if k not in current]
+        if previous is None or changed or removed:
+            version = max(state["version"] + 1, int(now * 1000))
+            for k in changed:
+                state["versions"][k] = version
+                state["removed"].pop(k, None)
+            for k in removed:
+                state["versions"].pop(k, None)
+                state["removed"][k] = version
+            if previous is None:
+                state["base_version"] = version
+            state["version"] = version
+        state["items"] = list(current.items())
+        return state
+
+    def _delta(self, state, since):
+        if since is None or not state["base_version"] <= since <= state["version"]:
+            return None
+        return {
+            "items": {k for k, v in state["versions"].items() if v > since},
+            "removed": sorted(k for k, v in state["removed"].items() if v > since),
+        }
+
+    def invalidate(self, account, placed=None):
+        """Re-fetch orders and positions now (after an order went through).
+
+        `placed` is the new order as far as we know it; it's listed until
+        Groww's order list catches up. A failed re-fetch leaves the entries
+        marked invalid, so the next read goes upstream.
+        """
+        self.invalidations += 1
+        for kind in KINDS:
+            with self.store.lease("portfolio", [account, kind]):
+                entry = self._state(account, kind)
+                try:
+                    self._refresh(account, kind, entry, placed if kind == "orders" else None)
+                except Exception as e:
+                    if self.logger is not None:
+                        self.logger.warning(f"Portfolio re-fetch of {kind} failed: {e}")
+                    state = dict(entry[0]) if entry is not None else self._track(kind, None, [])
+                    if kind == "orders" and placed is not None:
+                        state["pending"] = {**state["pending"], _order_id(placed): [placed, time.time()]}
+                    state["invalid"] = True
+                    self.store.put("portfolio", [account, kind], state, self.retain)
+
+    def stats(self):
+        return {
+            "accounts": len({account for account, _ in self._local}),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "invalidations": self.invalidations,
+        }
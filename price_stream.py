@@ -0,0 +1,102 @@
+"""Server-Sent Events stream of snapshot prices: one snapshot, then LTP deltas."""
+import json
+import time
+
+
+def sse_event(data, event=None, event_id=None):
+    """Format one SSE message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def event_id(snapshot, table):
+    return f"{snapshot.epoch}-{table.version}"
+
+
+def parse_event_id(value, epoch):
+    """Snapshot version from a Last-Event-ID issued by this process, else None"""
+    if not value:
+        return None
+    issued_by, _, version = value.rpartition("-")
+    if issued_by != epoch or not version.isdigit():
+        return None
+    return int(version)
+
+
+def stream_prices(snapshot, items, build_row, last_event_id=None,
+                  heartbeat=15.0, max_duration=300.0, retry_ms=3000):
+    """Yield SSE messages for the subscribed `items` (stock/index dicts).
+
+    The event id is "<snapshot epoch>-<version>". Versions only count within
+    one process, so a client reconnecting with Last-Event-ID gets the rows
+    changed since that version only when it lands on the same process (same
+    epoch) and the version is still in the snapshot history; a reconnect to
+    another worker, or after a restart, gets a fresh snapshot.
+
+    Each open stream occupies a worker (a whole process under gunicorn's
+    sync workers, one thread under gthread or the ASGI entry point) until it
+    closes after `max_duration` seconds; EventSource reconnects on its own.
+    """
+    table = snapshot.read()
+    rows = {table.index[key]: item for key, item in items}
+
+    yield f"retry: {retry_ms}\n\n"
+
+    version = None
+    last_version = parse_event_id(last_event_id, snapshot.epoch)
+    if last_version is not None:
+        changed = snapshot.changes_since(last_version)
+        if changed is not None:
+            delta = [build_row(table, rows[i]) for i in sorted(changed) if i in rows]
+            if delta:
+                yield sse_event(
+                    {"version": table.version, "timestamp": table.timestamp, "data": delta},
+                    event="delta",
+                    event_id=event_id(snapshot, table),
+                )
+            version = table.version
+
+    if version is None:
+        yield sse_event(
+            {
+                "version": table.version,
+                "timestamp": table.timestamp,
+                "data": [build_row(table, item) for item in rows.values()],
+            },
+            event="snapshot",
+            event_id=event_id(snapshot, table),
+        )
+        version = table.version
+
+    deadline = time.monotonic() + max_duration
+    while time.monotonic() < deadline:
+        table = snapshot.wait_for_update(version, heartbeat)
+        if table.version <= version:
+            yield ": heartbeat\n\n"
+            continue
+
+        changed = snapshot.changes_since(version)
+        if changed is None:
+            # Fell too far behind the poller: resync with a full snapshot
+            subset = list(rows)
+            event = "snapshot"
+        else:
+            subset = sorted(i for i in changed if i in rows)
+            event = "delta"
+        version = table.version
+
+        if subset:
+            yield sse_event(
+                {
+                    "version": table.version,
+                    "timestamp": table.timestamp,
+                    "data": [build_row(table, rows[i]) for i in subset],
+                },
+                event=event,
+                event_id=event_id(snapshot, table),
+            )
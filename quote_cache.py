@@ -0,0 +1,136 @@
+"""In-process TTL cache with single-flight loading for live market quotes."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """An upstream load in progress that other callers can wait on"""
+    __slots__ = ("event", "values", "errors", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.values = {}
+        self.errors = []
+        self.error = None
+
+
+class QuoteCache:
+    """TTL + LRU cache keyed by exchange_trading_symbol (e.g. "NSE_TCS").
+
+    Concurrent misses for the same keys are coalesced: the first caller runs
+    the loader, everyone else waits for its result instead of going upstream.
+    With a `policy` (a MarketCalendar), values loaded while the market is shut
+    stay cached until the next session instead of for `ttl`.
+    """
+
+    def __init__(self, ttl=1.0, max_size=5000, policy=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.policy = policy
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._inflight = {}             # key -> _Flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_many(self, keys, loader):
+        """Return ({key: value}, errors) for `keys`, loading misses via `loader`.
+
+        `loader` receives a tuple of keys and returns (values, errors); keys it
+        leaves out of `values` are not cached, and `errors` (partial failures)
+        are handed to every caller that waited on that load. Loader exceptions
+        propagate to every waiting caller.
+        """
+        now = time.monotonic()
+        found = {}
+        errors = []
+        to_load = []
+        waits = {}
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+                    self.hits += 1
+                    continue
+
+                flight = self._inflight.get(key)
+                if flight is not None:
+                    waits.setdefault(flight, []).append(key)
+                    self.coalesced += 1
+                    continue
+
+                to_load.append(key)
+                self.misses += 1
+
+            own = None
+            if to_load:
+                own = _Flight()
+                for key in to_load:
+                    self._inflight[key] = own
+
+        if own is not None:
+            try:
+                own.values, own.errors = loader(tuple(to_load))
+            except Exception as e:
+                own.error = e
+            finally:
+                self._store(to_load, own)
+                own.event.set()
+
+            if own.error is not None:
+                raise own.error
+            errors.extend(own.errors)
+            for key in to_load:
+                if key in own.values:
+                    found[key] = own.values[key]
+
+        for flight, flight_keys in waits.items():
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            errors.extend(e for e in flight.errors if e not in errors)
+            for key in flight_keys:
+                if key in flight.values:
+                    found[key] = flight.values[key]
+
+        return found, errors
+
+    def _store(self, keys, flight):
+        ttl = self.policy.ttl(self.ttl) if self.policy is not None else self.ttl
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key in keys:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                if key in flight.values:
+                    self._entries[key] = (expires_at, flight.values[key])
+                    self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "inflight": len(self._inflight),
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,159 @@
+"""Vectorized OHLCV resampling and chart point reduction (LTTB, min/max)."""
+import numpy as np
+
+INTERVAL_SECONDS = {
+    "1minute": 60,
+    "2minute": 120,
+    "3minute": 180,
+    "5minute": 300,
+    "10minute": 600,
+    "15minute": 900,
+    "30minute": 1800,
+    "1hour": 3600,
+    "4hour": 14400,
+    "1day": 86400,
+}
+
+# Short forms accepted by /api/historical
+INTERVAL_ALIASES = {
+    "1m": "1minute",
+    "5m": "5minute",
+    "15m": "15minute",
+    "30m": "30minute",
+    "1h": "1hour",
+    "4h": "4hour",
+    "1d": "1day",
+}
+
+# Intraday bars are aligned to the 09:15 IST open, daily bars to IST midnight
+SESSION_ANCHOR = 3 * 3600 + 45 * 60
+DAY_ANCHOR = -(5 * 3600 + 30 * 60)
+
+FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def normalize_interval(interval):
+    return INTERVAL_ALIASES.get(interval, interval)
+
+
+def finer_intervals(interval):
+    """Intervals that evenly divide `interval`, coarsest first"""
+    target = INTERVAL_SECONDS.get(normalize_interval(interval))
+    if not target:
+        return []
+    candidates = [
+        (seconds, name) for name, seconds in INTERVAL_SECONDS.items()
+        if seconds < target and target % seconds == 0
+    ]
+    return [name for seconds, name in sorted(candidates, reverse=True)]
+
+
+def to_columns(candles):
+    """List of candle dicts -> dict of NumPy columns"""
+    n = len(candles)
+    columns = {"timestamp": np.fromiter((c.get("timestamp") or 0 for c in candles), np.int64, n)}
+    for field in FIELDS[1:]:
+        columns[field] = np.fromiter((c.get(field) or 0 for c in candles), np.float64, n)
+    return columns
+
+
+def to_candles(columns, time_key="timestamp"):
+    """Dict of NumPy columns -> list of candle dicts (for JSON)"""
+    ts = columns["timestamp"].tolist()
+    o, h, l, c, v = (columns[field].tolist() for field in FIELDS[1:])
+    return [
+        {time_key: ts[i], "open": o[i], "high": h[i], "low": l[i], "close": c[i], "volume": v[i]}
+        for i in range(len(ts))
+    ]
+
+
+def resample(columns, interval):
+    """Aggregate finer OHLCV bars into `interval` bars.
+
+    Bars must be sorted by timestamp (seconds or milliseconds, preserved).
+    """
+    bucket = INTERVAL_SECONDS[normalize_interval(interval)]
+    ts = columns["timestamp"]
+    if len(ts) == 0:
+        return {field: columns[field][:0] for field in FIELDS}
+
+    scale = 1000 if ts[-1] >= 10 ** 11 else 1
+    anchor = DAY_ANCHOR if bucket >= 86400 else SESSION_ANCHOR
+    ids = (ts // scale - anchor) // bucket
+
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1
+
+    return {
+        "timestamp": (ids[starts] * bucket + anchor) * scale,
+        "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][ends],
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of `n_out` visually salient points"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # Average point of each bucket, used as the third triangle vertex
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(high, low, n_out):
+    """Keep the max(high) and min(low) bar of each bucket, in time order"""
+    n = len(high)
+    buckets = n_out // 2
+    if n_out >= n or buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    pad = size * buckets - n
+    padded_high = np.concatenate((high, np.full(pad, -np.inf))).reshape(buckets, size)
+    padded_low = np.concatenate((low, np.full(pad, np.inf))).reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+
+    picks = np.concatenate((
+        offsets + padded_high.argmax(axis=1),
+        offsets + padded_low.argmin(axis=1),
+    ))
+    return np.unique(picks[picks < n])
+
+
+def reduce_points(columns, max_points, method="lttb"):
+    """Thin a candle series down to at most `max_points` bars"""
+    n = len(columns["timestamp"])
+    if not max_points or n <= max_points:
+        return columns
+
+    if method == "minmax":
+        keep = minmax_indices(columns["high"], columns["low"], max_points)
+    else:
+        keep = lttb_indices(columns["timestamp"], columns["close"], max_points)
+    return {field: values[keep] for field, values in columns.items()}
@@ -0,0 +1,113 @@
+"""Row, columnar JSON, MessagePack and Arrow encodings of column data."""
+import numpy as np
+from flask import current_app, jsonify
+
+from response_pipeline import orjson
+
+try:
+    import msgpack
+except ImportError:  # format=msgpack unavailable
+    msgpack = None
+
+# Optional, not in requirements.txt: `pip install pyarrow` enables
+# format=arrow (it's a large install most deployments don't need)
+try:
+    import pyarrow
+except ImportError:  # format=arrow unavailable
+    pyarrow = None
+
+ROWS = "rows"
+COLUMNAR = "columnar"
+MSGPACK = "msgpack"
+ARROW = "arrow"
+
+MSGPACK_MIMETYPE = "application/x-msgpack"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+
+def available_formats():
+    formats = [ROWS, COLUMNAR]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    if pyarrow is not None:
+        formats.append(ARROW)
+    return formats
+
+
+def parse_format(value):
+    """Validate ?format=; raises ValueError for unknown or uninstalled ones"""
+    value = (value or ROWS).lower()
+    if value not in available_formats():
+        raise ValueError(f"Unsupported format: {value} (available: {', '.join(available_formats())})")
+    return value
+
+
+def _json_column(values):
+    # orjson writes contiguous NumPy arrays directly; otherwise go via lists
+    if isinstance(values, np.ndarray):
+        if orjson is not None and values.dtype.kind in "fiub":
+            return np.ascontiguousarray(values)
+        return values.tolist()
+    return list(values)
+
+
+def _typed(values):
+    """Column -> msgpack-friendly value: numeric arrays become a raw
+    little-endian buffer plus its dtype, anything else a plain list"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiub":
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+        return {"dtype": values.dtype.str, "length": len(values), "data": values.tobytes()}
+    return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+
+def columns_response(columns, format, meta=None, names=None):
+    """Response carrying `columns` ({field: NumPy array or list}) in a
+    non-row format; `names` renames fields on the way out.
+
+    Nothing here builds a per-row object: columnar JSON is one array per
+    field, MessagePack packs numeric columns as typed binary buffers, and
+    Arrow writes a single record batch.
+    """
+    names = names or {}
+    fields = {names.get(field, field): values for field, values in columns.items()}
+    meta = dict(meta or {})
+
+    if format == COLUMNAR:
+        return jsonify({
+            **meta,
+            "format": COLUMNAR,
+            "data": {field: _json_column(values) for field, values in fields.items()},
+        })
+
+    if format == MSGPACK:
+        body = msgpack.packb({
+            **meta,
+            "format": MSGPACK,
+            "fields": list(fields),
+            "data": {field: _typed(values) for field, values in fields.items()},
+        }, use_bin_type=True, default=_msgpack_default)
+        return current_app.response_class(body, mimetype=MSGPACK_MIMETYPE)
+
+    if format == ARROW:
+        batch = pyarrow.record_batch(
+            [pyarrow.array(values) for values in fields.values()],
+            names=list(fields),
+        )
+        # Scalars that don't belong in a column ride along as schema metadata
+        schema = batch.schema.with_metadata({
+            key: current_app.json.dumps(value) for key, value in meta.items()
+        })
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, schema) as writer:
+            writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+        return current_app.response_class(sink.getvalue().to_pybytes(), mimetype=ARROW_MIMETYPE)
+
+    raise ValueError(f"Not a columnar format: {format}")
+
+
+def _msgpack_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return _typed(value)
+    raise TypeError(f"Cannot pack {type(value).__name__}")
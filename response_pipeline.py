@@ -0,0 +1,188 @@
+"""JSON encoding, ETag/304 handling and gzip/brotli compression for responses."""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+# Optional, not in requirements.txt: `pip install brotli` adds
+# Content-Encoding: br for clients that accept it
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "text/plain", "text/html", "text/csv",
+    "application/x-msgpack", "application/vnd.apache.arrow.stream",
+)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson when it's installed.
+
+    orjson writes bytes straight into the response (no str round trip) and
+    handles NumPy scalars and arrays natively. Anything it can't encode goes
+    through Flask's usual `default` hook, so behaviour matches the stdlib
+    provider apart from key order (keys are not sorted) and NaN (null).
+    """
+
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self.OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def make_etag(*parts):
+    """Strong ETag for a response built from `parts` (a data version plus
+    whatever else selects the representation, e.g. the query string)"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def _variants(etag):
+    return (etag, f"{etag}-gzip", f"{etag}-br")
+
+
+def not_modified(etag):
+    """A 304 for the current request if the client already has `etag`
+    (in any encoding), else None. Call before building the body."""
+    tags = request.if_none_match
+    if not tags:
+        return None
+    if tags.star_tag or any(tag in tags for tag in _variants(etag)):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    return response
+
+
+class ResponseCompressor:
+    """after_request hook: gzip/brotli for text responses above `min_size`.
+
+    Encoding follows the client's Accept-Encoding (brotli preferred when the
+    module is available). A compressed response gets the encoding appended
+    to its ETag, so each encoding has its own strong validator, and the
+    compressed bytes are kept in a small LRU keyed by that ETag so every
+    client polling an unchanged chart or chain doesn't cost a recompression.
+    Responses without an ETag of their own get one from a hash of the body,
+    and If-None-Match is honoured for them too.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4, cache_bytes=32 * 1024 * 1024):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _encoding(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def _compress(self, body, encoding):
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _cached(self, key, body, encoding):
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return data
+        data = self._compress(body, encoding)
+        if len(data) <= self.cache_bytes // 16:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = data
+                    self._cached_bytes += len(data)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted)
+        return data
+
+    def __call__(self, response):
+        if (
+            request.method not in ("GET", "POST")
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+        ):
+            return response
+
+        body = response.get_data()
+        etag, weak = response.get_etag()
+        if etag is None and request.method == "GET":
+            etag = make_etag(body)
+            response.set_etag(etag)
+            cached = not_modified(etag)
+            if cached is not None:
+                return cached
+
+        if len(body) < self.min_size:
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = self._encoding()
+        if encoding is None:
+            return response
+
+        if etag is not None and not weak:
+            data = self._cached((request.path, etag, encoding), body, encoding)
+            response.set_etag(f"{etag}-{encoding}")
+        else:
+            data = self._compress(body, encoding)
+        self.compressed += 1
+        self.bytes_in += len(body)
+        self.bytes_out += len(data)
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def stats(self):
+        return {
+            "encoder": "orjson" if orjson is not None else "json",
+            "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+            "min_size": self.min_size,
+            "compressed": self.compressed,
+            "cache_hits": self.cache_hits,
+            "cached_entries": len(self._cache),
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+        }
@@ -0,0 +1,131 @@
+"""Top movers and per-sector aggregates over the market snapshot columns."""
+import numpy as np
+
+# metric -> description; every metric is a percentage
+METRICS = {
+    "change_perc": "LTP vs previous close",
+    "range_perc": "Day's high - low vs previous close",
+    "gap_perc": "Open vs previous close",
+    "from_open_perc": "LTP vs today's open",
+}
+
+
+def _top_k(values, k, largest):
+    """Positions of the k largest/smallest values, best first.
+
+    argpartition selects the k in O(n); only those k get sorted.
+    """
+    n = len(values)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+    keyed = -values if largest else values
+    if k < n:
+        picked = np.argpartition(keyed, k - 1)[:k]
+    else:
+        picked = np.arange(n)
+    return picked[np.argsort(keyed[picked], kind="stable")]
+
+
+class Screener:
+    """Ranks the snapshot universe in one vectorized pass per request.
+
+    Sector membership is fixed with the snapshot's rows, so it's encoded
+    once as an integer code per row; per-sector aggregates are then a few
+    `np.bincount` calls over the same arrays the rankings use.
+    """
+
+    def __init__(self, index, items, key):
+        self.sectors = sorted({item.get('sector') or 'Other' for item in items})
+        codes = {sector: i for i, sector in enumerate(self.sectors)}
+        size = len(index)
+        self.sector_codes = np.full(size, -1, dtype=np.intp)
+        self.items = [None] * size
+        for item in items:
+            row = index.get(key(item))
+            if row is None:
+                continue
+            self.sector_codes[row] = codes[item.get('sector') or 'Other']
+            self.items[row] = item
+        self.in_universe = self.sector_codes >= 0
+
+    def sector_mask(self, sectors):
+        """Rows in any of `sectors` (case-insensitive); unknown names match nothing"""
+        wanted = {s.strip().lower() for s in sectors if s.strip()}
+        codes = [i for i, sector in enumerate(self.sectors) if sector.lower() in wanted]
+        return np.isin(self.sector_codes, codes)
+
+    def metrics(self, table):
+        """{metric: array over every row} plus a validity mask"""
+        col = {field: np.frombuffer(table.columns[field], dtype=np.float64)
+               for field in ("ltp", "open", "high", "low", "close", "change_perc")}
+        close, open_ = col["close"], col["open"]
+        valid = self.in_universe & (col["ltp"] > 0) & (close > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = {
+                "change_perc": col["change_perc"],
+                "range_perc": (col["high"] - col["low"]) / close * 100,
+                "gap_perc": (open_ - close) / close * 100,
+                "from_open_perc": np.where(open_ > 0, (col["ltp"] - open_) / open_ * 100, 0.0),
+            }
+        return col, values, valid
+
+    def movers(self, table, rank_by, k, sectors=None):
+        """Top and bottom k rows for each metric in `rank_by`, plus sector
+        aggregates, all over the same filtered arrays"""
+        col, values, valid = self.metrics(table)
+        if sectors:
+            valid &= self.sector_mask(sectors)
+        rows = np.flatnonzero(valid)
+
+        def describe(row_positions):
+            out = []
+            for row in rows[row_positions].tolist():
+                item = self.items[row]
+                out.append({
+                    "symbol": item['symbol'],
+                    "exchange": item['exchange'],
+                    "name": item['name'],
+                    "sector": item.get('sector') or 'Other',
+                    "ltp": col["ltp"][row].item(),
+                    **{metric: round(values[metric][row].item(), 4) for metric in METRICS},
+                })
+            return out
+
+        rankings = {}
+        for metric in rank_by:
+            metric_values = values[metric][rows]
+            rankings[metric] = {
+                "top": describe(_top_k(metric_values, k, largest=True)),
+                "bottom": describe(_top_k(metric_values, k, largest=False)),
+            }
+        return {
+            "rankings": rankings,
+            "sectors": self.aggregates(rows, values),
+            "universe": int(len(rows)),
+        }
+
+    def aggregates(self, rows, values):
+        """Per-sector average change/range and breadth via bincount"""
+        codes = self.sector_codes[rows]
+        change = values["change_perc"][rows]
+        n = len(self.sectors)
+        count = np.bincount(codes, minlength=n)
+        change_sum = np.bincount(codes, weights=change, minlength=n)
+        range_sum = np.bincount(codes, weights=values["range_perc"][rows], minlength=n)
+        advancing = np.bincount(codes, weights=change > 0, minlength=n)
+        declining = np.bincount(codes, weights=change < 0, minlength=n)
+
+        sectors = []
+        for i in np.flatnonzero(count).tolist():
+            sectors.append({
+                "sector": self.sectors[i],
+                "count": int(count[i]),
+                "avg_change_perc": round(change_sum[i] / count[i], 4),
+                "avg_range_perc": round(range_sum[i] / count[i], 4),
+                "advancing": int(advancing[i]),
+                "declining": int(declining[i]),
+                # Advancers minus decliners as a share of the sector, -1..1
+                "breadth": round((advancing[i] - declining[i]) / count[i], 4),
+            })
+        sectors.sort(key=lambda s: s["avg_change_perc"], reverse=True)
+        return sectors
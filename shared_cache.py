@@ -0,0 +1,258 @@
+"""Host-wide cache in a SQLite file, shared by every worker process."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    name TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Purge expired rows every this many writes
+PURGE_EVERY = 500
+# Grace period before an expired entry is deleted
+PURGE_GRACE = 60.0
+
+
+class SharedCache:
+    """TTL cache whose entries live in one SQLite file per host.
+
+    Workers each keep their own in-process caches in front of this one; on a
+    local miss they come here, so N gunicorn workers cost one upstream call
+    per key per TTL instead of N. Refreshes are single-flight across
+    processes through lease rows: the worker that claims a key's lease loads
+    it, the others poll until the value lands (or the lease expires because
+    its owner died, in which case they claim it themselves).
+    """
+
+    def __init__(self, path, lease_ttl=15.0):
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self.owner = f"{os.getpid()}:{id(self)}"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.loads = 0
+        self.waits = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _name(namespace, key):
+        return f"{namespace}:{key if isinstance(key, str) else json.dumps(key)}"
+
+    def _claim(self, names):
+        """In one write transaction: read fresh entries, lease the rest that
+        nobody else holds. Returns ({name: (value, stored_at)}, [leased names])"""
+        now = time.time()
+        conn = self._conn()
+        fresh = {}
+        leased = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name in names:
+                row = conn.execute(
+                    "SELECT value, stored_at FROM entries WHERE name=? AND expires_at>?",
+                    (name, now),
+                ).fetchone()
+                if row is not None:
+                    fresh[name] = (json.loads(row[0]), row[1])
+                    continue
+                lease = conn.execute(
+                    "SELECT owner, expires_at FROM leases WHERE name=?", (name,)
+                ).fetchone()
+                if lease is None or lease[1] <= now:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                        (name, self.owner, now + self.lease_ttl),
+                    )
+                    leased.append(name)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return fresh, leased
+
+    def _store(self, values, leased, ttl):
+        """Write loaded values and drop our leases in one transaction"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (name, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                [(name, json.dumps(value), now, now + ttl) for name, value in values.items()],
+            )
+            conn.executemany(
+                "DELETE FROM leases WHERE name=? AND owner=?",
+                [(name, self.owner) for name in leased],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._writes += len(values)
+            purge = self._writes >= PURGE_EVERY
+            if purge:
+                self._writes = 0
+        if purge:
+            conn.execute("DELETE FROM entries WHERE expires_at<?", (now - PURGE_GRACE,))
+            conn.execute("DELETE FROM leases WHERE expires_at<?", (now,))
+        return now
+
+    def get_many_stamped(self, namespace, keys, ttl, loader):
+        """Like get_many, but values come back as (value, stored_at) where
+        stored_at (epoch seconds) is the same in every worker for one load"""
+        pending = {self._name(namespace, key): key for key in dict.fromkeys(keys)}
+        found = {}
+        errors = []
+        delay = 0.005
+        waited = False
+
+        while pending:
+            fresh, leased = self._claim(list(pending))
+            for name, stamped in fresh.items():
+                found[pending.pop(name)] = stamped
+            if waited:
+                self.waits += len(fresh)
+            else:
+                self.hits += len(fresh)
+
+            if leased:
+                own = {name: pending.pop(name) for name in leased}
+                self.loads += len(own)
+                values = {}
+                try:
+                    values, load_errors = loader(tuple(own.values()))
+                    errors.extend(load_errors)
+                finally:
+                    names = {name for name, key in own.items() if key in values}
+                    stored_at = self._store(
+                        {name: values[own[name]] for name in names}, leased, ttl
+                    )
+                for name in names:
+                    found[own[name]] = (values[own[name]], stored_at)
+                continue
+
+            if pending:
+                # Another worker holds the lease: wait for its result
+                waited = True
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+
+        return found, errors
+
+    def get_many(self, namespace, keys, ttl, loader):
+        """Return ({key: value}, errors), loading misses via `loader`.
+
+        Same loader contract as QuoteCache.get_many: it gets a tuple of keys
+        and returns (values, errors); keys missing from `values` aren't cached.
+        Values must be JSON-serializable.
+        """
+        found, errors = self.get_many_stamped(namespace, keys, ttl, loader)
+        return {key: value for key, (value, _) in found.items()}, errors
+
+    def get(self, namespace, key, ttl, loader):
+        """(value, stored_at) for one key; `loader()` takes no arguments"""
+        found, _ = self.get_many_stamped(
+            namespace, (key,), ttl, lambda keys: ({key: loader()}, [])
+        )
+        return found[key]
+
+    def peek(self, namespace, key):
+        """(value, stored_at) if an unexpired entry exists, else None; never loads"""
+        row = self._conn().execute(
+            "SELECT value, stored_at FROM entries WHERE name=? AND expires_at>?",
+            (self._name(namespace, key), time.time()),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row is not None else None
+
+    def stamp(self, namespace, key):
+        """stored_at of an unexpired entry, else None; cheaper than peek when
+        the caller already holds a decoded copy"""
+        row = self._conn().execute(
+            "SELECT stored_at FROM entries WHERE name=? AND expires_at>?",
+            (self._name(namespace, key), time.time()),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, namespace, key, value, ttl):
+        """Store a value directly; returns its stored_at"""
+        return self._store({self._name(namespace, key): value}, (), ttl)
+
+    @contextmanager
+    def lease(self, namespace, key):
+        """Hold `key`'s lease for the duration of the block, waiting for it if
+        another worker has it. For work that writes its own shared state
+        (e.g. the candle store) and just needs to run once at a time."""
+        name = self._name(namespace, key)
+        delay = 0.005
+        while True:
+            conn = self._conn()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                lease = conn.execute(
+                    "SELECT owner, expires_at FROM leases WHERE name=?", (name,)
+                ).fetchone()
+                acquired = lease is None or lease[1] <= now
+                if acquired:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                        (name, self.owner, now + self.lease_ttl),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            if acquired:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        try:
+            yield
+        finally:
+            self._conn().execute(
+                "DELETE FROM leases WHERE name=? AND owner=?", (name, self.owner)
+            )
+
+    def stats(self):
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM entries WHERE expires_at>?", (time.time(),)).fetchone()[0]
+        leases = conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+        return {
+            "path": self.path,
+            "entries": entries,
+            "leases": leases,
+            "hits": self.hits,
+            "loads": self.loads,
+            "waits": self.waits,
+        }
@@ -0,0 +1,63 @@
+import numpy as np
+
+from indicators import IndicatorEngine, parse_indicators
+
+IST_OFFSET = 19800
+DAY = 86400
+INTERVAL = 300
+
+
+def _session_candles(days, bars_per_day=75, scale=1):
+    """5-minute bars from 09:15 IST on consecutive days, timestamps * scale"""
+    rng = np.random.default_rng(7)
+    ts = []
+    for day in range(days):
+        open_ts = 1_790_000_000 // DAY * DAY + day * DAY - IST_OFFSET + 9 * 3600 + 15 * 60
+        ts.extend(open_ts + i * INTERVAL for i in range(bars_per_day))
+    ts = np.array(ts, dtype=np.int64)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, len(ts)))
+    return {
+        "timestamp": ts * scale,
+        "open": close,
+        "high": close + 0.5,
+        "low": close - 0.5,
+        "close": close,
+        "volume": rng.uniform(1_000, 5_000, len(ts)),
+    }
+
+
+def _read(engine, candles, now, start):
+    def load(from_ts):
+        # from_ts is always epoch seconds, whatever unit the candles carry
+        assert from_ts < 10 ** 11
+        scale = 1000 if candles["timestamp"][-1] >= 10 ** 11 else 1
+        keep = candles["timestamp"] >= (from_ts // DAY * DAY) * scale
+        return {field: values[keep] for field, values in candles.items()}
+
+    spec = parse_indicators("sma:10,vwap")
+    return engine.read(("NSE", "TCS", "5minute", spec), spec, INTERVAL, start, load, now)
+
+
+def test_millisecond_candles_match_seconds():
+    seconds = _session_candles(3)
+    millis = _session_candles(3, scale=1000)
+    # Mid-bar, so the last bar is still forming
+    now = int(seconds["timestamp"][-1]) + INTERVAL // 2
+    start = int(seconds["timestamp"][0])
+
+    expected, last_closed = _read(IndicatorEngine(), seconds, now, start)
+    engine = IndicatorEngine()
+    got, got_last_closed = _read(engine, millis, now, start)
+
+    assert got_last_closed == last_closed == int(seconds["timestamp"][-2])
+    assert got["timestamp"] == expected["timestamp"]
+    np.testing.assert_allclose(
+        np.array(got["vwap"], dtype=float), np.array(expected["vwap"], dtype=float)
+    )
+    # VWAP accumulates over the session instead of restarting every bar
+    assert got["vwap"][5] != seconds["close"][5]
+
+    # A later refresh advances the same series rather than failing or rebuilding
+    got, got_last_closed = _read(engine, millis, now + INTERVAL, start)
+    assert got_last_closed == int(seconds["timestamp"][-1])
+    assert engine.builds == 1 and engine.updates == 1
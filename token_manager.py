@@ -0,0 +1,293 @@
+"""Groww access tokens cached on disk, refreshed ahead of expiry, and a lazy client."""
+import base64
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import pyotp
+except ImportError:  # only needed when USER_TOTP holds a TOTP seed
+    pyotp = None
+
+from market_calendar import IST
+
+# Groww access tokens lapse every morning at 06:00 IST
+DAILY_EXPIRY_HOUR = 6
+# Retry a failed exchange this soon instead of waiting for the next expiry
+RETRY_AFTER_FAILURE = 60
+
+
+def _jwt_expiry(token):
+    """The `exp` claim of a JWT, or None if the token isn't one"""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _next_daily_expiry(now=None):
+    now = datetime.fromtimestamp(now or time.time(), IST)
+    expiry = now.replace(hour=DAILY_EXPIRY_HOUR, minute=0, second=0, microsecond=0)
+    if expiry <= now:
+        expiry += timedelta(days=1)
+    return expiry.timestamp()
+
+
+class TokenManager:
+    """One access token per host, shared through a 0600 file on local disk.
+
+    Nothing here touches the network at import or construction. The first
+    call to `token()` reads the cached file (written by any worker, or by a
+    previous run), and only exchanges the API key when no unexpired token is
+    there. Exchanges happen under an exclusive file lock, and whoever gets
+    the lock second re-reads the file first, so a fleet of booting workers
+    costs one exchange. A daemon thread refreshes `refresh_margin` seconds
+    before expiry so requests never wait on it.
+    """
+
+    def __init__(self, path, static_token=None, api_key=None, secret=None, totp=None,
+                 refresh_margin=600.0, logger=None):
+        self.path = path
+        self.static_token = static_token
+        self.api_key = api_key
+        self.secret = secret
+        self.totp = totp
+        self.refresh_margin = refresh_margin
+        self.logger = logger
+        self.listeners = []         # called with each new token
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher = None
+        self.exchanges = 0
+        self.last_error = None
+
+    @property
+    def configured(self):
+        return bool(self.static_token or self.api_key)
+
+    @property
+    def can_refresh(self):
+        return bool(self.api_key and (self.secret or self.totp))
+
+    @property
+    def account_id(self):
+        """Stable, non-secret id for the account these credentials belong to"""
+        return self._fingerprint()[:16]
+
+    def _fingerprint(self):
+        """Ties a cached token to the credentials that produced it"""
+        source = self.static_token or self.api_key or ""
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    # ----- disk cache -----
+
+    def _read_cache(self):
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return None
+        with os.fdopen(fd) as f:
+            st = os.fstat(f.fileno())
+            if st.st_uid != os.getuid() or st.st_mode & 0o077:
+                if self.logger is not None:
+                    self.logger.warning(f"Ignoring {self.path}: must be private to this user (0600)")
+                return None
+            try:
+                data = json.load(f)
+            except ValueError:
+                return None
+        if data.get("fingerprint") != self._fingerprint():
+            return None
+        return data.get("token"), float(data.get("expires_at") or 0)
+
+    def _write_cache(self, token, expires_at):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "token": token,
+                "expires_at": expires_at,
+                "fingerprint": self._fingerprint(),
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    # ----- exchange -----
+
+    def _totp_code(self):
+        # USER_TOTP may be a one-off code or the authenticator seed; only a
+        # seed can produce fresh codes for later refreshes
+        if self.totp and pyotp is not None and len(self.totp) >= 16:
+            return pyotp.TOTP(self.totp).now()
+        return self.totp
+
+    def _exchange(self):
+        from growwapi import GrowwAPI
+
+        self.exchanges += 1
+        if self.totp:
+            return GrowwAPI.get_access_token(api_key=self.api_key, totp=self._totp_code())
+        return GrowwAPI.get_access_token(api_key=self.api_key, secret=self.secret)
+
+    def _obtain(self, force=False):
+        """Fresh (token, expires_at) from disk or a new exchange, under the
+        host-wide lock so only one worker exchanges at a time"""
+        if self.static_token and not self.can_refresh:
+            token = self.static_token
+            return token, _jwt_expiry(token) or _next_daily_expiry()
+
+        lock_path = f"{self.path}.lock"
+        directory = os.path.dirname(lock_path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                cached = self._read_cache()
+                now = time.time()
+                if cached and cached[0] and cached[1] - self.refresh_margin > now and \
+                        not (force and cached[0] == self._token):
+                    return cached
+
+                if self.static_token and not force:
+                    # A configured token is used until it's close to expiring
+                    expires_at = _jwt_expiry(self.static_token) or _next_daily_expiry()
+                    if expires_at - self.refresh_margin > now:
+                        return self.static_token, expires_at
+
+                try:
+                    token = self._exchange()
+                except Exception as e:
+                    self.last_error = str(e)
+                    if self.logger is not None:
+                        self.logger.exception("Failed to exchange API key for access token")
+                    # Same fallback as before: try the key itself, retry soon
+                    fallback = self.static_token or self.api_key
+                    return fallback, now + RETRY_AFTER_FAILURE
+
+                self.last_error = None
+                expires_at = _jwt_expiry(token) or _next_daily_expiry(now)
+                self._write_cache(token, expires_at)
+                return token, expires_at
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _set(self, token, expires_at):
+        changed = token != self._token
+        self._token, self._expires_at = token, expires_at
+        if changed:
+            for listener in self.listeners:
+                listener(token)
+
+    def token(self):
+        """Current access token; only blocks when none is cached anywhere"""
+        token = self._token
+        if token is not None and time.time() < self._expires_at:
+            return token
+        with self._lock:
+            if self._token is None or time.time() >= self._expires_at:
+                self._set(*self._obtain())
+            self._ensure_refresher()
+            return self._token
+
+    def refresh(self, force=False):
+        """Replace the token now (e.g. after Groww rejected it)"""
+        with self._lock:
+            self._set(*self._obtain(force=force))
+            return self._token
+
+    def _ensure_refresher(self):
+        if not self.can_refresh:
+            return
+        if self._refresher is None or not self._refresher.is_alive():
+            self._refresher = threading.Thread(target=self._refresh_loop, name="groww-token", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            delay = self._expires_at - self.refresh_margin - time.time()
+            time.sleep(max(delay, 5.0))
+            if time.time() >= self._expires_at - self.refresh_margin:
+                try:
+                    self.refresh()
+                except Exception:
+                    if self.logger is not None:
+                        self.logger.exception("Background token refresh failed")
+
+    def stats(self):
+        return {
+            "configured": self.configured,
+            "can_refresh": self.can_refresh,
+            "has_token": self._token is not None,
+            "expires_in": round(self._expires_at - time.time(), 1) if self._token else None,
+            "exchanges": self.exchanges,
+            "last_error": self.last_error,
+        }
+
+
+class LazyGrowwClient:
+    """Stands in for GrowwAPI until the first real call needs it.
+
+    Constants (SEGMENT_CASH, EXCHANGE_NSE, ...) come straight from the class,
+    so nothing is built while modules configure themselves. The client is
+    built on the first method call (GrowwAPI's constructor does network
+    I/O) and keeps the same object afterwards, with its token swapped in
+    place whenever the manager refreshes. A call rejected for auth triggers
+    one forced refresh and a retry.
+    """
+
+    def __init__(self, manager, client_class=None):
+        if client_class is None:
+            from growwapi import GrowwAPI as client_class
+        self._manager = manager
+        self._client_class = client_class
+        self._client = None
+        self._lock = threading.Lock()
+        manager.listeners.append(self._on_token)
+
+    def _on_token(self, token):
+        if self._client is not None:
+            self._client.token = token
+
+    def _get_client(self):
+        if self._client is None:
+            token = self._manager.token()
+            with self._lock:
+                if self._client is None:
+                    self._client = self._client_class(token)
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client_class, name, None)
+        if attr is not None and not callable(attr):
+            return attr
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            client = self._get_client()
+            self._manager.token()   # swaps in a refreshed token if one is due
+            try:
+                return getattr(client, name)(*args, **kwargs)
+            except Exception as e:
+                if getattr(e, "code", None) != "401" or not self._manager.can_refresh:
+                    raise
+                self._manager.refresh(force=True)
+                return getattr(client, name)(*args, **kwargs)
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,338 @@
+"""Host-wide rate limiting, priority lanes and circuit breaking for GrowwAPI calls."""
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS breakers (
+    method TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    failures INTEGER NOT NULL,
+    opened_until REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+TOTAL = "*"
+CRITICAL = "critical"
+NORMAL = "normal"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RateLimited(Exception):
+    """No token became available within the lane's wait budget"""
+
+
+class CircuitOpen(Exception):
+    """Upstream is considered unhealthy for this method; call not attempted"""
+
+
+def is_upstream_failure(exc):
+    """Throttles, timeouts, 5xx and network errors count against the breaker;
+    4xx-style errors mean Groww is up and answering, so they don't"""
+    code = str(getattr(exc, "code", "") or "")
+    if code:
+        return code == "429" or code.startswith("5") or code == "408"
+    return isinstance(exc, (OSError, TimeoutError))
+
+
+def is_throttle(exc):
+    return str(getattr(exc, "code", "") or "") == "429"
+
+
+def parse_limits(spec):
+    """'get_ltp=10,place_order=5:10,*=40' -> {method: (rate/s, burst)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        limits[name.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+class UpstreamGuard:
+    """Token buckets, priority lanes and circuit breakers in one SQLite file.
+
+    Every worker on the host shares the same buckets, so the limits hold for
+    the host as a whole rather than per process. Each method has its own
+    bucket and every call also takes a token from the host total; the last
+    `reserve` share of the total only goes to the critical lane, so order
+    placement always finds a token however hard market-data polling pushes.
+
+    A 429 from Groww empties the method's bucket for `throttle_penalty`
+    seconds on every worker at once, instead of each worker retrying into
+    the throttle on its own. Breakers are per method and shared too: after
+    `failure_threshold` consecutive upstream failures calls fail fast with
+    CircuitOpen for `cooldown` seconds, then a single probe decides whether
+    to close again.
+    """
+
+    def __init__(self, path, limits=None, default_limit=(20.0, 20.0), lanes=None,
+                 reserve=0.25, max_wait=None, failure_threshold=5, cooldown=10.0,
+                 throttle_penalty=1.0):
+        self.path = path
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.lanes = dict(lanes or {})
+        self.reserve = reserve
+        self.max_wait = {CRITICAL: 10.0, NORMAL: 2.0, **(max_wait or {})}
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.throttle_penalty = throttle_penalty
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.counters = {}          # (method, event) -> count, this process
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, method, event):
+        key = (method, event)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def lane(self, method):
+        return self.lanes.get(method, NORMAL)
+
+    def _limit(self, name):
+        if name == TOTAL:
+            return self.limits.get(TOTAL)
+        return self.limits.get(name, self.default_limit)
+
+    # ----- token buckets -----
+
+    def _try_take(self, method, lane):
+        """Take a token from the method's bucket and the host total, or
+        return how long to wait before one is likely to be there"""
+        now = time.time()
+        conn = self._conn()
+        names = [method] + ([TOTAL] if self._limit(TOTAL) else [])
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = {}
+            wait = 0.0
+            for name in names:
+                rate, burst = self._limit(name)
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE name=?", (name,)
+                ).fetchone()
+                if row is None:
+                    tokens = burst
+                else:
+                    # updated_at may be in the future after a throttle penalty
+                    tokens = min(burst, row[0] + max(now - row[1], 0) * rate)
+                    if row[1] > now:
+                        wait = max(wait, row[1] - now)
+                        tokens = row[0]
+                needed = 1.0
+                if name == TOTAL and lane != CRITICAL:
+                    needed += self.reserve * burst
+                if tokens < needed:
+                    wait = max(wait, (needed - tokens) / rate)
+                levels[name] = tokens
+
+            if wait == 0.0:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    [(name, tokens - 1.0, now) for name, tokens in levels.items()],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, method):
+        lane = self.lane(method)
+        deadline = time.monotonic() + self.max_wait[lane]
+        waited = False
+        while True:
+            wait = self._try_take(method, lane)
+            if wait == 0.0:
+                if waited:
+                    self._count(method, "delayed")
+                return
+            if time.monotonic() + wait > deadline:
+                self._count(method, "rate_limited")
+                raise RateLimited(f"{method}: upstream rate limit, try again shortly")
+            waited = True
+            # Critical calls re-check sooner so they win the next free token
+            time.sleep(min(wait, 0.01 if lane == CRITICAL else 0.1))
+
+    def _penalize(self, method):
+        """Throttled by Groww: drain the method's bucket host-wide for a while"""
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, 0, ?)",
+            (method, time.time() + self.throttle_penalty),
+        )
+
+    # ----- circuit breaker -----
+
+    def _admit(self, method):
+        """Raise CircuitOpen unless the breaker lets this call through"""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT state, opened_until FROM breakers WHERE method=?", (method,)
+        ).fetchone()
+        if row is None or row[0] == CLOSED:
+            return
+        now = time.time()
+        if row[1] > now:
+            self._count(method, "short_circuited")
+            raise CircuitOpen(f"{method}: upstream unhealthy, failing fast for {row[1] - now:.1f}s")
+
+        # Cooldown over: exactly one caller on the host gets to probe
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state, opened_until = conn.execute(
+                "SELECT state, opened_until FROM breakers WHERE method=?", (method,)
+            ).fetchone()
+            probe = state != CLOSED and opened_until <= now
+            if probe:
+                conn.execute(
+                    "UPDATE breakers SET state=?, opened_until=? WHERE method=?",
+                    (HALF_OPEN, now + self.cooldown, method),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if state != CLOSED and not probe:
+            self._count(method, "short_circuited")
+            raise CircuitOpen(f"{method}: upstream unhealthy, probe in progress")
+
+    def _record(self, method, failed):
+        conn = self._conn()
+        if not failed:
+            row = conn.execute(
+                "SELECT state, failures FROM breakers WHERE method=?", (method,)
+            ).fetchone()
+            # Only write when there's something to reset
+            if row is not None and (row[0] != CLOSED or row[1]):
+                conn.execute(
+                    "UPDATE breakers SET state=?, failures=0, opened_until=0 WHERE method=?",
+                    (CLOSED, method),
+                )
+            return
+
+        self._count(method, "failures")
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state, failures FROM breakers WHERE method=?", (method,)
+            ).fetchone()
+            state, failures = row if row is not None else (CLOSED, 0)
+            failures += 1
+            if state == HALF_OPEN or failures >= self.failure_threshold:
+                if state != OPEN:
+                    self._count(method, "opened")
+                state, opened_until = OPEN, now + self.cooldown
+            else:
+                opened_until = 0
+            conn.execute(
+                "INSERT OR REPLACE INTO breakers (method, state, failures, opened_until) VALUES (?, ?, ?, ?)",
+                (method, state, failures, opened_until),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ----- calls -----
+
+    def call(self, method, fn, *args, **kwargs):
+        self._admit(method)
+        self.acquire(method)
+        self._count(method, "calls")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            failed = is_upstream_failure(e)
+            if is_throttle(e):
+                self._count(method, "throttled")
+                self._penalize(method)
+            self._record(method, failed)
+            raise
+        self._record(method, False)
+        return result
+
+    def stats(self):
+        conn = self._conn()
+        now = time.time()
+        buckets = {}
+        for name, tokens, updated_at in conn.execute("SELECT name, tokens, updated_at FROM buckets"):
+            limit = self._limit(name)
+            if limit is None:
+                continue
+            rate, burst = limit
+            level = tokens if updated_at > now else min(burst, tokens + (now - updated_at) * rate)
+            buckets[name] = {"tokens": round(level, 2), "rate": rate, "burst": burst}
+        breakers = {
+            method: {
+                "state": state,
+                "failures": failures,
+                "retry_in": round(max(opened_until - now, 0), 2),
+            }
+            for method, state, failures, opened_until in conn.execute(
+                "SELECT method, state, failures, opened_until FROM breakers"
+            )
+        }
+        with self._lock:
+            counters = {}
+            for (method, event), count in self.counters.items():
+                counters.setdefault(method, {})[event] = count
+        return {
+            "buckets": buckets,
+            "breakers": breakers,
+            "lanes": {"critical": sorted(m for m, lane in self.lanes.items() if lane == CRITICAL),
+                      "reserve": self.reserve},
+            "process": counters,
+        }
+
+
+class GuardedClient:
+    """Proxy that sends every GrowwAPI method call through an UpstreamGuard"""
+
+    def __init__(self, client, guard):
+        self._client = client
+        self._guard = guard
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+        attr = getattr(self._client, name)
+        if name.isupper() or name.startswith("_") or not callable(attr):
+            return attr
+
+        guard = self._guard
+
+        def call(*args, **kwargs):
+            return guard.call(name, attr, *args, **kwargs)
+
+        call.__name__ = name
+        self._wrapped[name] = call
+        return call